@@ -81,6 +81,7 @@ if os.path.exists(CONFIG_FILE):
     NOTIF_POS = config.get(NOTIF_POS_KEY, NOTIF_POS_DEFAULT)
 
     DESKTOP_WIDGETS = config.get("bar_desktop_widgets_visible", True)
+    NOTCH_PREWARM = config.get("notch_prewarm", True)
     WEATHER_FORMAT = config.get("widgets_weather_format", "C")
     WEATHER_LOCATION = config.get("widgets_weather_location", "")
     QUOTE_TYPE = config.get("widgets_quotetype", "stoic")
@@ -141,6 +142,7 @@ else:
     PANEL_POSITION = PANEL_POSITION_DEFAULT
     DESKTOP_WIDGETS = True
     NOTIF_POS = NOTIF_POS_DEFAULT
+    NOTCH_PREWARM = True
 
     DESKTOP_WIDGETS = True
     WEATHER_FORMAT = "C"
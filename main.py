@@ -1,5 +1,8 @@
 import os
 import subprocess
+
+from utils.profiling import import_profiler, timeline
+
 import setproctitle
 from fabric import Application
 from fabric.utils import exec_shell_command_async, get_relative_path
@@ -21,6 +24,8 @@ from modules.notch import Notch
 from modules.deskwidgets import Deskwidgets
 from modules.notifications import NotificationPopup
 
+timeline.mark("imports")
+
 fonts_updated_file = f"{CACHE_DIR}/fonts_updated"
 hyprconf = get_relative_path("config.json")
 
@@ -62,14 +67,20 @@ if __name__ == "__main__":
     if UPDATER:
         run_updater()
 
-    corners = Corners()
-    bar = Bar()
-    notch = Notch()
-    dock = Dock()
+    with timeline.span("Corners"):
+        corners = Corners()
+    with timeline.span("Bar"):
+        bar = Bar()
+    with timeline.span("Notch"):
+        notch = Notch()
+    with timeline.span("Dock"):
+        dock = Dock()
     bar.notch = notch
     notch.bar = bar
-    notification = NotificationPopup(widgets=notch.dashboard.widgets)
-    widgets = Deskwidgets()
+    with timeline.span("NotificationPopup"):
+        notification = NotificationPopup(widgets=notch.dashboard.widgets)
+    with timeline.span("Deskwidgets"):
+        widgets = Deskwidgets()
     # Set corners visibility based on config
 
     widgetsvisible = DESKTOP_WIDGETS
@@ -81,13 +92,18 @@ if __name__ == "__main__":
         f"{APP_NAME}", bar, notch, dock, notification, corners, widgets
     )  # Make sure corners is added to the app
 
-    def set_css():
-        app.set_stylesheet_from_file(
-            get_relative_path("main.css"),
-        )
+    from utils.stylesheet import Stylesheet
+
+    # `app.set_css()` stays the reload entry point for fabric-cli and the
+    # keybind; it only reparses the parts of the stylesheet that changed.
+    stylesheet = Stylesheet(get_relative_path("main.css"))
+    app.set_css = stylesheet.reload
 
-    app.set_css = set_css
+    with timeline.span("stylesheet"):
+        app.set_css()
 
-    app.set_css()
+    timeline.report_on_first_frame(bar)
+    import_profiler.report_on_first_frame(bar)
+    notch.schedule_prewarm()
 
     app.run()
@@ -1,17 +1,28 @@
 import configparser
 import ctypes
 import os
-import re
 import signal
-import struct
 import subprocess
-from math import pi
+from math import ceil, floor, pi
 
+import cairo
 from fabric.utils.helpers import get_relative_path
 from fabric.widgets.overlay import Overlay
 from gi.repository import Gdk, GLib, Gtk
 from loguru import logger
 
+from config.data import APP_NAME
+from utils.deferred import deferred_import
+
+# Frames are decoded with numpy; imported once the first frame arrives.
+np = deferred_import("numpy")
+
+# How long cava keeps running after the last spectrum was hidden, so that
+# flipping between views does not restart it.
+STOP_DELAY_MS = 3000
+
+# Used until the theme's `primary` color can be looked up.
+DEFAULT_COLOR = Gdk.RGBA(red=0xA5 / 255, green=0xC8 / 255, blue=1.0, alpha=1.0)
 
 
 def get_bars(file_path):
@@ -46,12 +57,17 @@ class Cava:
     RESTARTING = 2
     CLOSING = 3
 
-    def __init__(self, mainapp):
+    def __init__(self, data_handler, bars=bars):
         self.bars = bars
-        self.path = "/tmp/cava.fifo"
-
-        self.cava_config_file = CAVA_CONFIG
-        self.data_handler = mainapp.draw.update
+        # Private to this process and bar count, so several instances (or
+        # shells) never read each other's frames.
+        runtime_dir = GLib.get_user_runtime_dir()
+        name = f"{APP_NAME}-cava-{os.getpid()}-{bars}"
+        self.path = os.path.join(runtime_dir, f"{name}.fifo")
+
+        self.cava_config_file = os.path.join(runtime_dir, f"{name}.ini")
+        self.data_handler = data_handler
+        self.process = None
         self.command = ["cava", "-p", self.cava_config_file]
         self.state = self.NONE
 
@@ -60,16 +76,28 @@ class Cava:
 
         is_16bit = True
         self.byte_type, self.byte_size, self.byte_norm = (
-            ("H", 2, 65535) if is_16bit else ("B", 1, 255)
+            ("<u2", 2, 65535) if is_16bit else ("u1", 1, 255)
         )
-
-        if not os.path.exists(self.path):
-            os.mkfifo(self.path)
+        self.frame_size = self.byte_size * self.bars
+        # Bytes read past the last complete frame
+        self._pending = bytearray()
+        # Decoded into the same array every frame; consumers must copy
+        # whatever they keep beyond the callback.
+        self.sample = None
 
         self.fifo_fd = None
         self.fifo_dummy_fd = None
         self.io_watch_id = None
 
+    def _write_config(self):
+        """cava.ini with this instance's bar count and FIFO path."""
+        config = configparser.ConfigParser()
+        config.read(CAVA_CONFIG)
+        config["general"]["bars"] = str(self.bars)
+        config["output"]["raw_target"] = self.path
+        with open(self.cava_config_file, "w") as f:
+            config.write(f)
+
     def _run_process(self):
         logger.debug("Launching cava process...")
         try:
@@ -96,23 +124,34 @@ class Cava:
         )
 
     def _io_callback(self, source, condition):
-        chunk = self.byte_size * self.bars  # number of bytes for given format
-        try:
-            data = os.read(self.fifo_fd, chunk)
-        except OSError as e:
-            # logger.error("Error reading FIFO: {}".format(e))
-            return False
-
-        # When no data is read, do not remove the IO watch immediately.
-        if len(data) < chunk:
-            # Instead of closing the FIFO, we log a warning and continue.
-            # logger.warning("Incomplete data packet received (expected {} bytes, got {}). Waiting for more data...".format(chunk, len(data)))
-            # Returning True keeps the IO watch active. A real EOF will only occur when the writer closes.
+        # Drain everything cava wrote since the last wakeup and keep only
+        # the newest complete frame; older frames would never be shown.
+        while True:
+            try:
+                data = os.read(self.fifo_fd, 64 * self.frame_size)
+            except BlockingIOError:
+                break
+            except OSError:
+                # logger.error("Error reading FIFO: {}".format(e))
+                return False
+            if not data:
+                break
+            self._pending += data
+            if len(data) < 64 * self.frame_size:
+                break
+
+        complete = len(self._pending) - len(self._pending) % self.frame_size
+        if complete == 0:
+            # Only part of a frame so far; the rest comes with the next wakeup.
             return True
-
-        fmt = self.byte_type * self.bars  # format string for struct.unpack
-        sample = [i / self.byte_norm for i in struct.unpack(fmt, data)]
-        GLib.idle_add(self.data_handler, sample)
+        frame = bytes(self._pending[complete - self.frame_size : complete])
+        del self._pending[:complete]
+
+        if self.sample is None:
+            self.sample = np.zeros(self.bars, dtype=np.float32)
+        values = np.frombuffer(frame, dtype=self.byte_type)
+        np.multiply(values, 1 / self.byte_norm, out=self.sample)
+        self.data_handler(self.sample)
         return True
 
     def _on_stop(self):
@@ -126,6 +165,9 @@ class Cava:
 
     def start(self):
         """Launch cava"""
+        self._write_config()
+        if not os.path.exists(self.path):
+            os.mkfifo(self.path)
         self._start_io_reader()
         self._run_process()
 
@@ -143,16 +185,22 @@ class Cava:
     def close(self):
         """Stop cava process"""
         self.state = self.CLOSING
-        if self.process.poll() is None:
+        if self.process is not None and self.process.poll() is None:
             self.process.kill()
+            self.process.wait()
         if self.io_watch_id:
             GLib.source_remove(self.io_watch_id)
+            self.io_watch_id = None
         if self.fifo_fd:
             os.close(self.fifo_fd)
+            self.fifo_fd = None
         if self.fifo_dummy_fd:
             os.close(self.fifo_dummy_fd)
-        if os.path.exists(self.path):
-            os.remove(self.path)
+            self.fifo_dummy_fd = None
+        self._pending.clear()
+        for path in (self.path, self.cava_config_file):
+            if os.path.exists(path):
+                os.remove(path)
 
 
 class AttributeDict(dict):
@@ -166,15 +214,38 @@ class AttributeDict(dict):
 
 
 class Spectrum:
-    """Spectrum drawing"""
+    """
+    Spectrum drawing.
 
-    def __init__(self):
+    Bar positions are computed once per allocation in `size_update`, and the
+    rounded-cap outline of every bar is built once per (half-pixel) height
+    it reaches and then appended as is. A frame only queues a redraw of
+    the span between the first and last bar whose height changed, and the
+    silent (all-zero) frame is painted from a cached surface.
+    """
+
+    def __init__(self, bars=bars):
+        self.bars = bars
         self.silence_value = 0
         self.audio_sample = []
-        self.color = None
+        self.color = DEFAULT_COLOR
+        self._latest = None
+        self._tick_id = None
+
+        # Geometry of the current allocation, filled in by `size_update`.
+        self._bar_x: list[float] = []
+        self._bar_width = 0.0
+        self._center_y = 0.0
+        self._heights: list[float] = []
+        # (bar, half height) -> outline; heights are capped at `max_height`,
+        # so there are at most a few dozen per bar.
+        self._paths: dict[tuple[int, float], cairo.Path] = {}
+        self._silent = False
+        self._silence_surface = None
 
         self.area = Gtk.DrawingArea()
         self.area.connect("draw", self.redraw)
+        self.area.connect("style-updated", self.color_update)
         self.area.add_events(Gdk.EventMask.BUTTON_PRESS_MASK)
 
         self.sizes = AttributeDict()
@@ -193,43 +264,109 @@ class Spectrum:
         return self.silence_value > self.silence
 
     def update(self, data):
+        """Receive a frame; it is processed on the next frame clock tick."""
+        self._latest = data
+        if self._tick_id is None:
+            self._tick_id = self.area.add_tick_callback(self._on_tick)
+
+    def _on_tick(self, widget, frame_clock):
+        # However many frames cava delivered since the last paint, only the
+        # newest one is drawn, once per frame of the display.
+        self._tick_id = None
+        if self._latest is not None:
+            self.process(self._latest.tolist())
+            self._latest = None
+        return GLib.SOURCE_REMOVE
+
+    def process(self, data):
         """Audio data processing"""
-        self.color_update()
         self.audio_sample = data
         if not self.is_silence(self.audio_sample[0]):
-            self.area.queue_draw()
+            self._silent = False
+            self._set_heights([self._bar_height(value) for value in data])
         elif self.silence_value == (self.silence + 1):
             self.audio_sample = [0] * self.sizes.number
+            self._silent = True
+            self._heights = [self._bar_height(0)] * len(self._bar_x)
             self.area.queue_draw()
 
-    def redraw(self, widget, cr):
-        """Draw spectrum graph"""
-        cr.set_source_rgba(*self.color)
-        dx = 3
-
-        center_y = self.sizes.area.height / 2  # center vertical of the drawing area
-        for i, value in enumerate(self.audio_sample):
-            width = self.sizes.area.width / self.sizes.number - self.sizes.padding
-            radius = width / 2
-            height = max(self.sizes.bar.height * min(value, 1), self.sizes.zero) / 2
-            if height == self.sizes.zero / 2 + 1:
-                height *= 0.5
-
-            height = min(height, self.max_height)
-
-            # Draw rectangle and arcs for rounded ends
-            cr.rectangle(dx, center_y - height, width, height * 2)
-            cr.arc(dx + radius, center_y - height, radius, 0, 2 * pi)
-            cr.arc(dx + radius, center_y + height, radius, 0, 2 * pi)
+    def _bar_height(self, value):
+        """Half the height of a bar, rounded to half a pixel."""
+        height = max(self.sizes.bar.height * min(value, 1), self.sizes.zero) / 2
+        if height == self.sizes.zero / 2 + 1:
+            height *= 0.5
+        return round(min(height, self.max_height) * 2) / 2
+
+    def _set_heights(self, heights):
+        """Queue a redraw of the span of bars whose height changed."""
+        previous = self._heights
+        if len(previous) != len(heights) or len(heights) != len(self._bar_x):
+            self._heights = heights[: len(self._bar_x)]
+            self.area.queue_draw()
+            return
+        changed = [i for i, (old, new) in enumerate(zip(previous, heights)) if old != new]
+        if not changed:
+            return
+        self._heights = heights
+        # A pixel of margin for the antialiased edges.
+        left = floor(self._bar_x[changed[0]]) - 1
+        right = ceil(self._bar_x[changed[-1]] + self._bar_width) + 1
+        self.area.queue_draw_area(left, 0, right - left, self.area.get_allocated_height())
+
+    def _bar_path(self, cr, index, height):
+        """Outline of bar `index` at `height` (replaces the current path)."""
+        x = self._bar_x[index]
+        radius = self._bar_width / 2
+        cr.new_path()
+        cr.rectangle(x, self._center_y - height, self._bar_width, height * 2)
+        cr.arc(x + radius, self._center_y - height, radius, 0, 2 * pi)
+        cr.arc(x + radius, self._center_y + height, radius, 0, 2 * pi)
+        cr.close_path()
+        self._paths[index, height] = cr.copy_path()
+        cr.new_path()
+
+    def _draw_bars(self, cr, first, last):
+        paths = self._paths
+        keys = list(zip(range(first, last), self._heights[first:last]))
+        for index, height in keys:
+            if (index, height) not in paths:
+                self._bar_path(cr, index, height)
 
-            cr.close_path()
-            dx += width + self.sizes.padding
+        cr.set_source_rgba(*self.color)
+        for key in keys:
+            cr.append_path(paths[key])
         cr.fill()
 
+    def redraw(self, widget, cr):
+        """Draw spectrum graph"""
+        if not self._bar_x:
+            self.size_update()
+        if not self._heights:
+            return
+
+        if self._silent:
+            if self._silence_surface is None:
+                self._silence_surface = widget.get_window().create_similar_surface(
+                    cairo.CONTENT_COLOR_ALPHA,
+                    widget.get_allocated_width(),
+                    widget.get_allocated_height(),
+                )
+                self._draw_bars(cairo.Context(self._silence_surface), 0, len(self._heights))
+            cr.set_source_surface(self._silence_surface, 0, 0)
+            cr.paint()
+            return
+
+        # Only the bars overlapping the damaged area are drawn.
+        left, _, right, _ = cr.clip_extents()
+        step = self._bar_width + self.sizes.padding
+        first = max(int((left - self._bar_x[0] - self._bar_width) // step), 0)
+        last = min(int((right - self._bar_x[0]) // step) + 1, len(self._heights))
+        self._draw_bars(cr, first, last)
+
     def size_update(self, *args):
         """Update drawing geometry"""
-        self.sizes.number = bars
-        self.sizes.padding = 100 / bars
+        self.sizes.number = self.bars
+        self.sizes.padding = 100 / self.bars
         self.sizes.zero = 0
 
         self.sizes.area.width = self.area.get_allocated_width()
@@ -239,21 +376,110 @@ class Spectrum:
         self.sizes.bar.width = max(int(tw / self.sizes.number), 1)
         self.sizes.bar.height = self.sizes.area.height
 
-    def color_update(self):
-        """Set drawing color according to current settings by reading primary color from CSS"""
-        color = "#a5c8ff"  # default value
-        try:
-            with open(get_relative_path("../styles/colors.css"), "r") as f:
-                content = f.read()
-                m = re.search(r"--primary:\s*(#[0-9a-fA-F]{6})", content)
-                if m:
-                    color = m.group(1)
-        except Exception as e:
-            logger.error("Failed to read primary color: {}".format(e))
-        red = int(color[1:3], 16) / 255
-        green = int(color[3:5], 16) / 255
-        blue = int(color[5:7], 16) / 255
-        self.color = Gdk.RGBA(red=red, green=green, blue=blue, alpha=1.0)
+        width = self.sizes.area.width / self.sizes.number - self.sizes.padding
+        bar_x = [3 + i * (width + self.sizes.padding) for i in range(self.sizes.number)]
+        center_y = self.sizes.area.height / 2
+        if (bar_x, width, center_y) == (self._bar_x, self._bar_width, self._center_y):
+            return
+        self._bar_x = bar_x
+        self._bar_width = width
+        self._center_y = center_y
+        self._paths.clear()
+        self._silence_surface = None
+        self._heights = [self._bar_height(value) for value in self.audio_sample][: len(bar_x)]
+        if len(self._heights) < len(bar_x):
+            self._heights += [self._bar_height(0)] * (len(bar_x) - len(self._heights))
+
+    def color_update(self, *args):
+        """
+        Take the drawing color from the theme's `primary` named color. GTK
+        caches it, and `style-updated` fires when colors.css is reloaded.
+        """
+        found, color = self.area.get_style_context().lookup_color("primary")
+        self.color = color if found else DEFAULT_COLOR
+        self._silence_surface = None
+        self.area.queue_draw()
+
+
+class SpectrumHub:
+    """
+    Runs one cava process per bar count and fans its frames out to every
+    registered `Spectrum` of that size.
+
+    Consumers are reference counted by visibility: cava starts when the
+    first spectrum of its size is mapped and is stopped `STOP_DELAY_MS`
+    after the last one is unmapped (or destroyed), then started again the
+    next time one is shown.
+    """
+
+    instance = None
+
+    @staticmethod
+    def get_initial():
+        if SpectrumHub.instance is None:
+            SpectrumHub.instance = SpectrumHub()
+
+        return SpectrumHub.instance
+
+    def __init__(self):
+        self._consumers: dict[int, list[Spectrum]] = {}
+        self._visible: dict[int, set[Spectrum]] = {}
+        self._cavas: dict[int, Cava] = {}
+        self._stop_ids: dict[int, int] = {}
+
+    def register(self, spectrum: Spectrum):
+        size = spectrum.bars
+        self._consumers.setdefault(size, []).append(spectrum)
+        self._visible.setdefault(size, set())
+        area = spectrum.area
+        area.connect("map", lambda *_: self._set_visible(spectrum, True))
+        area.connect("unmap", lambda *_: self._set_visible(spectrum, False))
+        area.connect("destroy", lambda *_: self.unregister(spectrum))
+        if area.get_mapped():
+            self._set_visible(spectrum, True)
+
+    def unregister(self, spectrum: Spectrum):
+        size = spectrum.bars
+        if spectrum in self._consumers.get(size, []):
+            self._consumers[size].remove(spectrum)
+        self._set_visible(spectrum, False)
+
+    def _set_visible(self, spectrum: Spectrum, visible: bool):
+        size = spectrum.bars
+        viewers = self._visible[size]
+        if visible:
+            viewers.add(spectrum)
+            self._start(size)
+        else:
+            viewers.discard(spectrum)
+            if not viewers:
+                self._schedule_stop(size)
+
+    def _broadcast(self, size: int, sample):
+        for spectrum in self._consumers.get(size, ()):
+            spectrum.update(sample)
+
+    def _start(self, size: int):
+        stop_id = self._stop_ids.pop(size, None)
+        if stop_id is not None:
+            GLib.source_remove(stop_id)
+        if size in self._cavas:
+            return
+        cava = Cava(lambda sample: self._broadcast(size, sample), bars=size)
+        self._cavas[size] = cava
+        cava.start()
+
+    def _schedule_stop(self, size: int):
+        if size in self._cavas and size not in self._stop_ids:
+            self._stop_ids[size] = GLib.timeout_add(STOP_DELAY_MS, self._stop, size)
+
+    def _stop(self, size: int):
+        self._stop_ids.pop(size, None)
+        cava = self._cavas.pop(size, None)
+        if cava is not None:
+            logger.debug(f"Stopping cava ({size} bars): no spectrum is visible")
+            cava.close()
+        return False
 
 
 class SpectrumRender:
@@ -262,8 +488,7 @@ class SpectrumRender:
         self.mode = mode
 
         self.draw = Spectrum()
-        self.cava = Cava(self)
-        self.cava.start()
+        SpectrumHub.get_initial().register(self.draw)
 
     def get_spectrum_box(self):
         # Get the spectrum box
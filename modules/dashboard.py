@@ -1,3 +1,4 @@
+import importlib
 import random
 
 import gi
@@ -14,10 +15,15 @@ gi.require_version('GdkPixbuf', '2.0')
 from gi.repository import Gdk, GdkPixbuf, GLib, Gtk
 
 import modules.icons as icons
-from modules.kanban import Kanban
-from modules.pins import Pins
-from modules.wallpapers import WallpaperSelector
 from modules.widgets import Widgets
+from utils.profiling import timeline
+
+# Sections imported and built the first time they are shown: name -> (module, class)
+LAZY_SECTIONS = {
+    "pins": ("modules.pins", "Pins"),
+    "kanban": ("modules.kanban", "Kanban"),
+    "wallpapers": ("modules.wallpapers", "WallpaperSelector"),
+}
 
 
 class Dashboard(Box):
@@ -36,9 +42,19 @@ class Dashboard(Box):
         self.notch = kwargs["notch"]
         
         self.widgets = Widgets(notch=self.notch)
-        self.pins = Pins()
-        self.kanban = Kanban()
-        self.wallpapers = WallpaperSelector()
+
+        # Stack pages for the lazy sections; the real widget is added on first show.
+        self._sections = {}
+        self.section_boxes = {
+            name: Box(
+                name=f"{name}-section",
+                h_expand=True,
+                v_expand=True,
+                h_align="fill",
+                v_align="fill",
+            )
+            for name in LAZY_SECTIONS
+        }
 
         self.stack = Stack(
             name="stack",
@@ -103,9 +119,11 @@ class Dashboard(Box):
         )
 
         self.stack.add_titled(self.widgets, "widgets", "Widgets")
-        self.stack.add_titled(self.pins, "pins", "Pins")
-        self.stack.add_titled(self.kanban, "kanban", "Kanban")
-        self.stack.add_titled(self.wallpapers, "wallpapers", "Wallpapers")
+        self.stack.add_titled(self.section_boxes["pins"], "pins", "Pins")
+        self.stack.add_titled(self.section_boxes["kanban"], "kanban", "Kanban")
+        self.stack.add_titled(
+            self.section_boxes["wallpapers"], "wallpapers", "Wallpapers"
+        )
         self.stack.add_titled(self.coming_soon, "coming-soon", "Coming soon...")
 
         self.switcher.set_stack(self.stack)
@@ -123,6 +141,27 @@ class Dashboard(Box):
 
         self.show_all()
 
+    pins = property(lambda self: self.get_section("pins"))
+    kanban = property(lambda self: self.get_section("kanban"))
+    wallpapers = property(lambda self: self.get_section("wallpapers"))
+
+    def is_built(self, name):
+        return name in self._sections
+
+    def get_section(self, name):
+        """Return the section widget called `name`, importing and building it if needed."""
+        section = self._sections.get(name)
+        if section is not None:
+            return section
+
+        module_name, class_name = LAZY_SECTIONS[name]
+        with timeline.span(f"dashboard section '{name}'"):
+            section = getattr(importlib.import_module(module_name), class_name)()
+            self._sections[name] = section
+            self.section_boxes[name].add(section)
+            section.show_all()
+        return section
+
     def _setup_switcher_icons(self):
         icon_details_map = {
             "Widgets": {"icon": icons.widgets, "name": "widgets"},
@@ -176,7 +215,10 @@ class Dashboard(Box):
 
     def on_visible_child_changed(self, stack, param):
         visible = stack.get_visible_child()
-        if visible == self.wallpapers:
+        for name, box in self.section_boxes.items():
+            if visible == box:
+                self.get_section(name)
+        if visible == self.section_boxes["wallpapers"]:
             self.wallpapers.search_entry.set_text("")
             self.wallpapers.search_entry.grab_focus()
         if visible == self.coming_soon:
@@ -210,11 +252,7 @@ class Dashboard(Box):
         """Navigate to a specific section in the dashboard."""
         if section_name == "widgets":
             self.stack.set_visible_child(self.widgets)
-        elif section_name == "pins":
-            self.stack.set_visible_child(self.pins)
-        elif section_name == "kanban":
-            self.stack.set_visible_child(self.kanban)
-        elif section_name == "wallpapers":
-            self.stack.set_visible_child(self.wallpapers)
+        elif section_name in self.section_boxes:
+            self.stack.set_visible_child(self.section_boxes[section_name])
         elif section_name == "coming-soon":
             self.stack.set_visible_child(self.coming_soon)
@@ -1,12 +1,9 @@
-import psutil
 from fabric.widgets.box import Box
 from fabric.widgets.label import Label
 from fabric.widgets.overlay import Overlay
 from fabric.widgets.datetime import DateTime
 from fabric.widgets.circularprogressbar import CircularProgressBar
 from fabric.widgets.wayland import WaylandWindow as Window
-from fabric.utils import invoke_repeater
-import requests
 import urllib.parse
 import datetime
 from gi.repository import GLib
@@ -14,8 +11,13 @@ from concurrent.futures import ThreadPoolExecutor
 import time
 import config.data as data
 from config.data import load_config
+from modules.metrics import shared_provider
+from utils.deferred import deferred_import
 import subprocess
 
+# Only the weather and quote widgets go online.
+requests = deferred_import("requests")
+
 executor = ThreadPoolExecutor(max_workers=4)
 
 
@@ -197,7 +199,9 @@ class Sysinfo(Box):
         )
 
         self.update_status()
-        invoke_repeater(1000, self.update_status)
+        shared_provider.subscribe(
+            lambda *_: self.update_status(), ["cpu", "mem", "battery"]
+        )
 
         self.add(
             Box(
@@ -210,23 +214,19 @@ class Sysinfo(Box):
         self.show_all()
 
     def update_status(self):
-        """Update system info asynchronously to prevent UI lag."""
-
-        def update():
-            cpu = psutil.cpu_percent()
-            ram = psutil.virtual_memory().percent
-            battery = (
-                psutil.sensors_battery().percent if psutil.sensors_battery() else 80
-            )
-            GLib.idle_add(self.cpu_progress.set_value, cpu)
-            GLib.idle_add(self.ram_progress.set_value, ram)
-            GLib.idle_add(self.bat_circular.set_value, battery)
-
-            GLib.idle_add(self.cpu_progress.set_tooltip_text, f"{str(round(cpu))}%")
-            GLib.idle_add(self.ram_progress.set_tooltip_text, f"{str(round(ram))}%")
-            GLib.idle_add(self.bat_circular.set_tooltip_text, f"{str(round(battery))}%")
-
-        executor.submit(update)
+        """Update system info from the shared metrics sampler."""
+        cpu, ram, _, _ = shared_provider.get_metrics()
+        battery, charging = shared_provider.get_battery()
+        if charging is None:
+            battery = 80
+
+        self.cpu_progress.set_value(cpu)
+        self.ram_progress.set_value(ram)
+        self.bat_circular.set_value(battery)
+
+        self.cpu_progress.set_tooltip_text(f"{str(round(cpu))}%")
+        self.ram_progress.set_tooltip_text(f"{str(round(ram))}%")
+        self.bat_circular.set_tooltip_text(f"{str(round(battery))}%")
         return True
 
 
@@ -1,11 +1,9 @@
 import json
-import logging
 
 import cairo
 from fabric.hyprland.widgets import get_hyprland_connection
 from fabric.utils import (exec_shell_command, exec_shell_command_async,
-                          get_relative_path, idle_add, remove_handler)
-from fabric.utils.helpers import get_desktop_applications
+                          idle_add, remove_handler)
 from fabric.widgets.box import Box
 from fabric.widgets.button import Button
 from fabric.widgets.eventbox import EventBox
@@ -16,42 +14,14 @@ from gi.repository import Gdk, GLib, Gtk
 
 import config.data as data
 from modules.corners import MyCorner
+from services.desktop_catalog import DesktopCatalog
+from services.dock_config import DockConfig
+from services.hyprland_state import HyprlandStateStore
 from utils.icon_resolver import IconResolver
-from utils.occlusion import check_occlusion
+from utils.occlusion import OcclusionEngine
+from utils.window_matcher import WindowMatcher, app_data, normalize_window_class
 
 
-def read_config():
-    """Read and return the full configuration from the JSON file, handling missing file."""
-    config_path = get_relative_path("../config/dock.json")
-    try:
-        with open(config_path, "r") as file:
-            config_data = json.load(file)
-            
-        if "pinned_apps" in config_data and config_data["pinned_apps"] and isinstance(config_data["pinned_apps"][0], str):
-            all_apps = get_desktop_applications()
-            app_map = {app.name: app for app in all_apps if app.name}
-            
-            old_pinned = config_data["pinned_apps"]
-            config_data["pinned_apps"] = []
-            
-            for app_id in old_pinned:
-                app = app_map.get(app_id)
-                if app:
-                    app_data_obj = {
-                        "name": app.name,
-                        "display_name": app.display_name,
-                        "window_class": app.window_class,
-                        "executable": app.executable,
-                        "command_line": app.command_line
-                    }
-                    config_data["pinned_apps"].append(app_data_obj)
-                else:
-                    config_data["pinned_apps"].append({"name": app_id})
-                
-    except (FileNotFoundError, json.JSONDecodeError):
-        config_data = {"pinned_apps": []}
-    return config_data
-
 def createSurfaceFromWidget(widget: Gtk.Widget) -> cairo.ImageSurface:
     alloc = widget.get_allocation()
     surface = cairo.ImageSurface(
@@ -127,14 +97,21 @@ class Dock(Window):
             main_box_orientation_val = Gtk.Orientation.VERTICAL
             main_box_h_align_val = "center"
 
-        self.config = read_config()
+        self.dock_config = DockConfig.get_initial()
+        self.config = self.dock_config.get_config()
         self.conn = get_hyprland_connection()
-        self.icon_resolver = IconResolver() 
+        self.hypr_state = HyprlandStateStore.get_initial()
+        self.icon_resolver = IconResolver.get_initial()
         self.pinned = self.config.get("pinned_apps", [])
-        self.config_path = get_relative_path("../config/dock.json")
+        self.config_path = self.dock_config.path
         self.app_map = {}
-        self._all_apps = get_desktop_applications()
-        self.app_identifiers = self._build_app_identifiers_map()
+        self.catalog = DesktopCatalog.get_initial()
+        self._all_apps = self.catalog.get_apps()
+        self.app_identifiers = self.catalog.identifiers
+        self.matcher = WindowMatcher(self.catalog)
+        # Buttons by ("pinned" | "open", identifier, occurrence), reused across updates
+        self._buttons: dict[tuple, Button] = {}
+        self._separator = None
         
         self.hide_id = None
         self._arranger_handler = None
@@ -268,39 +245,38 @@ class Dock(Window):
         self.view.connect("drag-begin", self.on_drag_begin)
         self.view.connect("drag-end", self.on_drag_end)
 
-        if self.conn.ready:
+        self._occluded_by_window = False
+        if not self.integrated_mode:
+            occlusion_side = "bottom" if self.actual_dock_is_horizontal else "right"
+            self._occlusion_handle = OcclusionEngine.get_initial().subscribe(
+                occlusion_side, self.effective_occlusion_size, self._on_occlusion_changed
+            )
+
+        if self.hypr_state.is_ready:
             self.update_dock()
-            if not self.integrated_mode: GLib.timeout_add(250, self.check_occlusion_state)
         else:
-            self.conn.connect("event::ready", self.update_dock)
-            if not self.integrated_mode: self.conn.connect("event::ready", lambda *args: GLib.timeout_add(250, self.check_occlusion_state))
+            self.hypr_state.connect("ready", self.update_dock)
 
-        for ev in ("activewindow", "openwindow", "closewindow", "changefloatingmode"):
-            self.conn.connect(f"event::{ev}", self.update_dock)
-        
-        if not self.integrated_mode:
-            self.conn.connect("event::workspace", self.check_hide)
-        
-        GLib.timeout_add_seconds(1, self.check_config_change)
+        self.hypr_state.subscribe(
+            "dock",
+            ("activewindowv2", "openwindow", "closewindow", "changefloatingmode", "workspacev2"),
+            self._on_hyprland_changed,
+        )
+        self.catalog.connect("changed", self._on_catalog_changed)
+        self.dock_config.connect("changed", self._on_config_changed)
             
-    def _build_app_identifiers_map(self):
-        identifiers = {}
-        for app in self._all_apps:
-            if app.name: identifiers[app.name.lower()] = app
-            if app.display_name: identifiers[app.display_name.lower()] = app
-            if app.window_class: identifiers[app.window_class.lower()] = app
-            if app.executable: identifiers[app.executable.split('/')[-1].lower()] = app
-            if app.command_line: identifiers[app.command_line.split()[0].split('/')[-1].lower()] = app
-        return identifiers
+    def _on_occlusion_changed(self, occluded):
+        self._occluded_by_window = occluded
+        self.check_occlusion_state()
+
+    def _on_hyprland_changed(self, events):
+        if events & {"activewindowv2", "openwindow", "closewindow", "changefloatingmode"}:
+            self.update_dock()
+        if "workspacev2" in events and not self.integrated_mode:
+            self.check_hide()
 
     def _normalize_window_class(self, class_name):
-        if not class_name: return ""
-        normalized = class_name.lower()
-        suffixes = [".bin", ".exe", ".so", "-bin", "-gtk"]
-        for suffix in suffixes:
-            if normalized.endswith(suffix):
-                normalized = normalized[:-len(suffix)]
-        return normalized
+        return normalize_window_class(class_name)
         
     def _classes_match(self, class1, class2):
         if not class1 or not class2: return False
@@ -351,40 +327,28 @@ class Dock(Window):
         return True
 
     def find_app(self, app_identifier):
-        if not app_identifier: return None
-        if isinstance(app_identifier, dict):
-            for key in ["window_class", "executable", "command_line", "name", "display_name"]:
-                if key in app_identifier and app_identifier[key]:
-                    app = self.find_app_by_key(app_identifier[key])
-                    if app: return app
-            return None
-        return self.find_app_by_key(app_identifier)
+        return self.matcher.find_app(app_identifier)
     
     def find_app_by_key(self, key_value):
-        if not key_value: return None
-        normalized_id = str(key_value).lower()
-        if normalized_id in self.app_identifiers:
-            return self.app_identifiers[normalized_id]
-        for app in self._all_apps:
-            if app.name and normalized_id in app.name.lower(): return app
-            if app.display_name and normalized_id in app.display_name.lower(): return app
-            if app.window_class and normalized_id in app.window_class.lower(): return app
-            if app.executable and normalized_id in app.executable.lower(): return app
-            if app.command_line and normalized_id in app.command_line.lower(): return app
-        return None
+        return self.matcher.find_app_by_key(key_value)
 
     def update_app_map(self):
-        self._all_apps = get_desktop_applications()
+        self._all_apps = self.catalog.get_apps()
         self.app_map = {app.name: app for app in self._all_apps if app.name}
-        self.app_identifiers = self._build_app_identifiers_map()
+        self.app_identifiers = self.catalog.identifiers
+        self.matcher.invalidate()
+
+    def _on_catalog_changed(self, *_):
+        self.update_app_map()
+        self.update_dock()
 
-    def create_button(self, app_identifier, instances):
-        desktop_app = self.find_app(app_identifier)
+    def create_button(self, app_identifier, instances, desktop_app=None):
+        if desktop_app is None: desktop_app = self.find_app(app_identifier)
         icon_img = None
         display_name = None
         
         if desktop_app:
-            icon_img = desktop_app.get_icon_pixbuf(size=self.icon_size) 
+            icon_img = self.icon_resolver.get_app_pixbuf(desktop_app, self.icon_size)
             display_name = desktop_app.display_name or desktop_app.name
         
         id_value = app_identifier["name"] if isinstance(app_identifier, dict) else app_identifier
@@ -398,19 +362,16 @@ class Dock(Window):
                 icon_img = self.icon_resolver.get_icon_pixbuf("image-missing", self.icon_size) 
                 
         items = [Image(pixbuf=icon_img)]
-        tooltip = display_name or (id_value if isinstance(id_value, str) else "Unknown")
-        if not display_name and instances and instances[0].get("title"):
-            tooltip = instances[0]["title"]
 
         button = Button(
             child= Box(name="dock-icon", orientation="v", h_align="center", children=items), 
-            on_clicked=lambda *a: self.handle_app(app_identifier, instances, desktop_app),
-            tooltip_text=tooltip, name="dock-app-button",
+            on_clicked=lambda *a: self.handle_app(button.app_identifier, button.instances, button.desktop_app),
+            name="dock-app-button",
         )
         button.app_identifier = app_identifier
         button.desktop_app = desktop_app
-        button.instances = instances
-        if instances: button.add_style_class("instance")
+        button.display_name = display_name
+        self.update_button_instances(button, instances)
 
         button.drag_source_set(
             Gdk.ModifierType.BUTTON1_MASK,
@@ -429,6 +390,17 @@ class Dock(Window):
         button.connect("enter-notify-event", self._on_child_enter)
         return button
 
+    def update_button_instances(self, button, instances):
+        """Refresh what depends on the windows of a button: its tooltip and instance dot."""
+        button.instances = instances
+        id_value = button.app_identifier["name"] if isinstance(button.app_identifier, dict) else button.app_identifier
+        tooltip = button.display_name or (id_value if isinstance(id_value, str) else "Unknown")
+        if not button.display_name and instances and instances[0].get("title"):
+            tooltip = instances[0]["title"]
+        if button.get_tooltip_text() != tooltip: button.set_tooltip_text(tooltip)
+        if instances: button.add_style_class("instance")
+        else: button.remove_style_class("instance")
+
     def handle_app(self, app_identifier, instances, desktop_app=None):
         if not instances:
             if not desktop_app: desktop_app = self.find_app(app_identifier)
@@ -463,6 +435,8 @@ class Dock(Window):
         if self.integrated_mode: return 
         if self.hide_id:
             GLib.source_remove(self.hide_id)
+        # A window may have been resized or dragged under the dock meanwhile.
+        OcclusionEngine.get_initial().resync()
         self.hide_id = GLib.timeout_add(250, self.hide_dock_if_not_hovered)
 
     def hide_dock_if_not_hovered(self):
@@ -473,9 +447,7 @@ class Dock(Window):
             if self.always_occluded:
                 self.dock_revealer.set_reveal_child(False)
             else:
-
-                occlusion_region = ("bottom", self.effective_occlusion_size) if self.actual_dock_is_horizontal else ("right", self.effective_occlusion_size)
-                if check_occlusion(occlusion_region) or not self.view.get_children():
+                if self._occluded_by_window or not self.view.get_children():
                     self.dock_revealer.set_reveal_child(False)
         return False
 
@@ -485,9 +457,7 @@ class Dock(Window):
         if self.is_mouse_over_dock_area or self._drag_in_progress or self._prevent_occlusion:
             return
 
-        clients = self.get_clients()
-        current_ws = self.get_workspace()
-        ws_clients = [w for w in clients if w["workspace"]["id"] == current_ws]
+        ws_clients = self.hypr_state.get_workspace_clients(self.get_workspace())
 
         if not self.always_occluded:
             if not ws_clients:
@@ -505,101 +475,63 @@ class Dock(Window):
                 self.dock_revealer.set_reveal_child(False)
             self.dock_full.add_style_class("occluded")
 
+    def _button_key(self, kind, identifier, used_keys):
+        base = json.dumps(identifier, sort_keys=True) if isinstance(identifier, dict) else identifier
+        occurrence = 0
+        while (kind, base, occurrence) in used_keys: occurrence += 1
+        return (kind, base, occurrence)
+
+    def _reuse_button(self, key, identifier, app, instances):
+        button = self._buttons.get(key)
+        if button is None or button.desktop_app is not app or button.app_identifier != identifier:
+            return self.create_button(identifier, instances, app)
+        self.update_button_instances(button, instances)
+        return button
+
     def update_dock(self, *args):
-        self.update_app_map()
         arranger_handler = getattr(self, "_arranger_handler", None)
         if arranger_handler: remove_handler(arranger_handler)
-        clients = self.get_clients()
-        
-        running_windows = {}
-        for c in clients:
-            window_id = None
-            if class_name := c.get("initialClass", "").lower(): window_id = class_name
-            elif class_name := c.get("class", "").lower(): window_id = class_name
-            elif title := c.get("title", "").lower():
-                possible_name = title.split(" - ")[0].strip()
-                if possible_name and len(possible_name) > 1: window_id = possible_name
-                else: window_id = title
-            if not window_id: window_id = "unknown-app"
-            running_windows.setdefault(window_id, []).append(c)
-            normalized_id = self._normalize_window_class(window_id)
-            if normalized_id != window_id:
-                running_windows.setdefault(normalized_id, []).extend(running_windows[window_id])
-        
+
+        self.matcher.compile(self.pinned)
+        pinned, unpinned = self.matcher.match(self.get_clients())
+
+        buttons = {}
         pinned_buttons = []
-        used_window_classes = set()
-        
-        for app_data_item in self.pinned:
-            app = self.find_app(app_data_item)
-            instances = []
-            matched_class = None
-            possible_identifiers = []
-            
-            if isinstance(app_data_item, dict):
-                for key in ["window_class", "executable", "command_line", "name", "display_name"]:
-                    if key in app_data_item and app_data_item[key]: possible_identifiers.append(app_data_item[key].lower())
-            elif isinstance(app_data_item, str): possible_identifiers.append(app_data_item.lower())
-            
-            if app:
-                if app.window_class: possible_identifiers.append(app.window_class.lower())
-                if app.executable: possible_identifiers.append(app.executable.split('/')[-1].lower())
-                if app.command_line:
-                    cmd_parts = app.command_line.split()
-                    if cmd_parts: possible_identifiers.append(cmd_parts[0].split('/')[-1].lower())
-                if app.name: possible_identifiers.append(app.name.lower())
-                if app.display_name: possible_identifiers.append(app.display_name.lower())
-            
-            possible_identifiers = list(set(possible_identifiers)) 
-            
-            for identifier in possible_identifiers:
-                if identifier in running_windows:
-                    instances = running_windows[identifier]; matched_class = identifier; break
-                normalized = self._normalize_window_class(identifier)
-                if normalized in running_windows:
-                    instances = running_windows[normalized]; matched_class = normalized; break
-                for window_class_key in running_windows: 
-                    if len(identifier) >= 3 and identifier in window_class_key:
-                        instances = running_windows[window_class_key]; matched_class = window_class_key
-                        break
-                if matched_class: break
-            
-            if matched_class:
-                used_window_classes.add(matched_class)
-                used_window_classes.add(self._normalize_window_class(matched_class))
-            
-            pinned_buttons.append(self.create_button(app_data_item, instances))
-        
+        for app_data_item, app, instances in pinned:
+            key = self._button_key("pinned", app_data_item, buttons)
+            buttons[key] = self._reuse_button(key, app_data_item, app, instances)
+            pinned_buttons.append(buttons[key])
+
         open_buttons = []
-        for class_name, instances in running_windows.items():
-            if class_name not in used_window_classes:
-                app = None
-                app = self.app_identifiers.get(class_name)
-                if not app:
-                    norm_class = self._normalize_window_class(class_name)
-                    app = self.app_identifiers.get(norm_class)
-                if not app: app = self.find_app_by_key(class_name)
-                if not app and instances and instances[0].get("title"):
-                    title = instances[0].get("title", "")
-                    potential_name = title.split(" - ")[0].strip()
-                    if len(potential_name) > 2: app = self.find_app_by_key(potential_name)
-                
-                if app:
-                    app_data_obj = {
-                        "name": app.name, "display_name": app.display_name,
-                        "window_class": app.window_class, "executable": app.executable,
-                        "command_line": app.command_line
-                    }
-                    identifier = app_data_obj
-                else: identifier = class_name
-                open_buttons.append(self.create_button(identifier, instances))
+        for class_name, instances in unpinned:
+            title = instances[0].get("title", "") if instances else ""
+            app = self.matcher.app_for_class(class_name, title)
+            identifier = app_data(app) if app else class_name
+            key = self._button_key("open", class_name, buttons)
+            buttons[key] = self._reuse_button(key, identifier, app, instances)
+            open_buttons.append(buttons[key])
 
         children = pinned_buttons
-        separator_orientation = Gtk.Orientation.VERTICAL if self.view.get_orientation() == Gtk.Orientation.HORIZONTAL else Gtk.Orientation.HORIZONTAL
         if pinned_buttons and open_buttons:
-            children += [Box(orientation=separator_orientation, v_expand=False, h_expand=False, h_align="center", v_align="center", name="dock-separator")]
+            if self._separator is None:
+                separator_orientation = Gtk.Orientation.VERTICAL if self.view.get_orientation() == Gtk.Orientation.HORIZONTAL else Gtk.Orientation.HORIZONTAL
+                self._separator = Box(orientation=separator_orientation, v_expand=False, h_expand=False, h_align="center", v_align="center", name="dock-separator")
+            children += [self._separator]
         children += open_buttons
-        
-        self.view.children = children
+
+        # Only touch the view when buttons were added, removed or reordered.
+        current = self.view.get_children()
+        if current != children:
+            for child in current:
+                if child not in children: self.view.remove(child)
+            for index, child in enumerate(children):
+                if child.get_parent() is None: self.view.add(child)
+                self.view.reorder_child(child, index)
+        kept = set(buttons.values())
+        for button in self._buttons.values():
+            if button not in kept: button.destroy()
+        self._buttons = buttons
+
         if not self.integrated_mode:
             idle_add(self._update_size)
         self._drag_in_progress = False
@@ -613,16 +545,13 @@ class Dock(Window):
         return False
 
     def get_clients(self):
-        try: return json.loads(self.conn.send_command("j/clients").reply.decode())
-        except json.JSONDecodeError: return []
+        return self.hypr_state.get_clients()
 
     def get_focused(self):
-        try: return json.loads(self.conn.send_command("j/activewindow").reply.decode()).get("address", "")
-        except json.JSONDecodeError: return ""
+        return self.hypr_state.active_address
 
     def get_workspace(self):
-        try: return json.loads(self.conn.send_command("j/activeworkspace").reply.decode()).get("id", 0)
-        except json.JSONDecodeError: return 0
+        return self.hypr_state.active_workspace_id
 
     def check_occlusion_state(self):
         if self.integrated_mode:
@@ -633,16 +562,15 @@ class Dock(Window):
                 self.dock_revealer.set_reveal_child(True)
             if not self.always_occluded:
                  self.dock_full.remove_style_class("occluded")
-            return True
+            return False
 
         if self.always_occluded:
             if self.dock_revealer.get_reveal_child():
                 self.dock_revealer.set_reveal_child(False)
             self.dock_full.add_style_class("occluded")
-            return True
+            return False
 
-        occlusion_region = ("bottom", self.effective_occlusion_size) if self.actual_dock_is_horizontal else ("right", self.effective_occlusion_size)
-        is_occluded_by_window = check_occlusion(occlusion_region)
+        is_occluded_by_window = self._occluded_by_window
         is_empty = not self.view.get_children()
 
         if is_occluded_by_window or is_empty:
@@ -654,7 +582,7 @@ class Dock(Window):
                 self.dock_revealer.set_reveal_child(True)
             self.dock_full.remove_style_class("occluded")
         
-        return True
+        return False
 
     def _find_drag_target(self, widget):
         children = self.view.get_children()
@@ -733,30 +661,21 @@ class Dock(Window):
 
         GLib.idle_add(process_drag_end)
 
-    def check_config_change(self):
-        new_config = read_config()
+    def _on_config_changed(self, *_):
         if not self.integrated_mode:
             new_always_occluded = data.DOCK_ALWAYS_OCCLUDED 
             if self.always_occluded != new_always_occluded:
                 self.always_occluded = new_always_occluded
                 self.check_occlusion_state() 
 
+        new_config = self.dock_config.get_config()
         if new_config.get("pinned_apps", []) != self.config.get("pinned_apps", []):
             self.config = new_config
             self.pinned = self.config.get("pinned_apps", [])
-            self.update_app_map()
             self.update_dock()
-        return True 
 
     def update_pinned_apps_file(self):
-        config_path = get_relative_path("../config/dock.json")
-        try:
-            with open(config_path, "w") as file:
-                json.dump(self.config, file, indent=4)
-            return True
-        except Exception as e:
-            logging.error(f"Failed to write dock config: {e}")
-            return False
+        return self.dock_config.save(self.config)
 
     def update_pinned_apps(self, skip_update=False):
         pinned_children_data = [] 
@@ -782,25 +701,7 @@ class Dock(Window):
 
     @staticmethod
     def notify_config_change():
-        for dock_instance in Dock._instances: 
-             GLib.idle_add(dock_instance.check_config_change_immediate)
-
-    def check_config_change_immediate(self): 
-        new_config = read_config()
-        
-        if not self.integrated_mode:
-            previous_always_occluded = self.always_occluded
-            self.always_occluded = data.DOCK_ALWAYS_OCCLUDED 
-            
-            if previous_always_occluded != self.always_occluded:
-                self.check_occlusion_state() 
-        
-        if new_config.get("pinned_apps", []) != self.config.get("pinned_apps", []):
-            self.config = new_config
-            self.pinned = self.config.get("pinned_apps", [])
-            self.update_app_map()
-            self.update_dock()
-        return False 
+        DockConfig.get_initial().reload()
 
     @staticmethod
     def update_visibility(visible):
@@ -1,7 +1,7 @@
 import os
 import subprocess
+from collections import OrderedDict
 
-import ijson
 from fabric.utils import remove_handler
 from fabric.utils.helpers import get_relative_path
 from fabric.widgets.box import Box
@@ -9,16 +9,21 @@ from fabric.widgets.button import Button
 from fabric.widgets.entry import Entry
 from fabric.widgets.label import Label
 from fabric.widgets.stack import Stack
-from gi.repository import Gdk
+from gi.repository import Gdk, Gtk
 
 import config.data as data
 import modules.icons as icons
+from utils.emoji_index import EmojiIndex
 
 vertical_mode = data.PANEL_THEME == "Panel" and (data.BAR_POSITION in ["Left", "Right"] or data.PANEL_POSITION in ["Start", "End"])
 
 emoji_rows = 3 if not vertical_mode else 9
 emoji_columns = 9 if not vertical_mode else 5
 
+# Decoded pages kept around: the current one and its neighbours, plus a few
+# from the previous queries while typing.
+PAGE_CACHE_SIZE = 8
+
 class EmojiPicker(Box):
     def __init__(self, **kwargs):
         super().__init__(
@@ -36,7 +41,12 @@ class EmojiPicker(Box):
         self.total_pages = 0
 
         self._arranger_handler: int = 0
-        self._all_emojis = self._load_emoji_data()
+        # Mapped on first open
+        self._emoji_index: EmojiIndex | None = None
+        self._query = ""
+        # (query, page) -> [(emoji_char, emoji_info)], least recently used first
+        self._page_cache: OrderedDict[tuple[str, int], list] = OrderedDict()
+        self._shown_page: tuple[str, int] | None = None
 
         self.stack = Stack(
             name="viewport",
@@ -45,6 +55,12 @@ class EmojiPicker(Box):
             transition_type="slide-up-down",
             transition_duration=200,
         )
+        # Two grids of slots, built once: a page is bound into the one not
+        # on screen and the stack slides over to it.
+        self._grids = [self.bake_emoji_grid(i) for i in range(2)]
+        self._shown_grid = 0
+        for i, grid in enumerate(self._grids):
+            self.stack.add_named(grid, f"grid-{i}")
         self.search_entry = Entry(
             name="search-entry",
             placeholder="Search Emojis...",
@@ -84,21 +100,21 @@ class EmojiPicker(Box):
 
         self.add(self.picker_box)
         self.show_all()
+        for grid in self._grids:
+            self.bind_emoji_grid(grid, [])
 
-    def _load_emoji_data(self):
-        emoji_data = {}
-        emoji_file_path = get_relative_path("../assets/emoji.json")
-        if not os.path.exists(emoji_file_path):
-            print(f"Emoji JSON file not found at: {emoji_file_path}")
-            return {}
-
-        with open(emoji_file_path, 'r') as f:
-            for emoji_char, emoji_info in ijson.kvitems(f, ''):
-                emoji_data[emoji_char] = emoji_info
-        return emoji_data
+    def _get_emoji_index(self) -> EmojiIndex:
+        if self._emoji_index is None:
+            emoji_file_path = get_relative_path("../assets/emoji.json")
+            if not os.path.exists(emoji_file_path):
+                print(f"Emoji JSON file not found at: {emoji_file_path}")
+            self._emoji_index = EmojiIndex.get_initial(emoji_file_path)
+        return self._emoji_index
 
     def close_picker(self):
-        self.stack.children = []
+        for grid in self._grids:
+            self.bind_emoji_grid(grid, [])
+        self._shown_page = None
         self.selected_index = -1
         self.notch.close_notch()
 
@@ -110,15 +126,12 @@ class EmojiPicker(Box):
 
     def arrange_viewport(self, query: str = ""):
         remove_handler(self._arranger_handler) if self._arranger_handler else None
-        self.stack.children = []
-        self.selected_index = -1
+        self.update_selection(-1)
         self.current_page_index = 0
 
-        self.filtered_emojis = [
-            (emoji_char, emoji_info)
-            for emoji_char, emoji_info in self._all_emojis.items()
-            if query.casefold() in (emoji_info.get("name", "") + " " + emoji_info.get("group", "")).casefold()
-        ]
+        # Numbers into the emoji index; entries are decoded per page.
+        self._query = query
+        self.filtered_emojis = self._get_emoji_index().search(query)
         self.total_pages = (len(self.filtered_emojis) + self.emojis_per_page - 1) // self.emojis_per_page if self.filtered_emojis else 0
 
         self.load_page(self.current_page_index)
@@ -130,26 +143,43 @@ class EmojiPicker(Box):
         if query.strip() != "" and self.get_all_emoji_buttons():
             self.update_selection(0)
 
-    def load_page(self, page_index):
-        self.update_selection(-1)
-        page_box = Box(name=f"page-box-{page_index}", orientation="v", spacing=4)
+    def _get_page(self, page_index: int) -> list:
+        key = (self._query, page_index)
+        page = self._page_cache.get(key)
+        if page is not None:
+            self._page_cache.move_to_end(key)
+            return page
         start_index = page_index * self.emojis_per_page
         end_index = min((page_index + 1) * self.emojis_per_page, len(self.filtered_emojis))
-        page_emojis = self.filtered_emojis[start_index:end_index]
-
-        grid_box = Box(name="emoji-grid-box", orientation="v", spacing=2)
+        emoji_index = self._get_emoji_index()
+        page = [emoji_index.entry(number) for number in self.filtered_emojis[start_index:end_index]]
+        self._page_cache[key] = page
+        if len(self._page_cache) > PAGE_CACHE_SIZE:
+            self._page_cache.popitem(last=False)
+        return page
 
-        row_box = None
-        for i, (emoji_char, emoji_info) in enumerate(page_emojis):
-            if i % emoji_columns == 0:
-                row_box = Box(name="emoji-row-box", orientation="h", spacing=2)
-                grid_box.add(row_box)
-            if row_box is not None:
-                row_box.add(self.bake_emoji_slot(emoji_char, emoji_info))
-        page_box.add(grid_box)
-        self.stack.add_named(page_box, f"page-{page_index}")
-        self.stack.set_visible_child_name(f"page-{page_index}")
-        page_box.show_all()
+    def load_page(self, page_index):
+        self.update_selection(-1)
+        page_emojis = self._get_page(page_index)
+        for neighbour in (page_index + 1, page_index - 1):
+            if 0 <= neighbour < self.total_pages:
+                self._get_page(neighbour)
+        # Get the current page back to the most recently used end.
+        self._get_page(page_index)
+
+        if self._shown_page is not None and self._shown_page[0] == self._query:
+            transition = (
+                Gtk.StackTransitionType.SLIDE_UP
+                if page_index > self._shown_page[1]
+                else Gtk.StackTransitionType.SLIDE_DOWN
+            )
+        else:
+            transition = Gtk.StackTransitionType.NONE
+        self._shown_page = (self._query, page_index)
+        self._shown_grid ^= 1
+        page_box = self._grids[self._shown_grid]
+        self.bind_emoji_grid(page_box, page_emojis)
+        self.stack.set_visible_child_full(f"grid-{self._shown_grid}", transition)
 
 
         buttons = self.get_all_emoji_buttons()
@@ -164,7 +194,52 @@ class EmojiPicker(Box):
     def resize_viewport(self):
         return False
 
-    def bake_emoji_slot(self, emoji_char: str, emoji_info: dict, **kwargs) -> Button:
+    def bake_emoji_grid(self, grid_index: int) -> Box:
+        page_box = Box(name=f"page-box-{grid_index}", orientation="v", spacing=4)
+        grid_box = Box(name="emoji-grid-box", orientation="v", spacing=2)
+        for _ in range(emoji_rows):
+            row_box = Box(name="emoji-row-box", orientation="h", spacing=2)
+            for _ in range(emoji_columns):
+                row_box.add(self.bake_emoji_slot())
+            grid_box.add(row_box)
+        page_box.add(grid_box)
+        return page_box
+
+    def bind_emoji_grid(self, page_box: Box, page_emojis: list):
+        """Show `page_emojis` in the slots of `page_box`, hiding the rest."""
+        slots = iter(page_emojis)
+        for row_box in page_box.get_children()[0].get_children():
+            row_visible = False
+            for button in row_box.get_children():
+                button.get_style_context().remove_class("selected")
+                emoji = next(slots, None)
+                if emoji is None:
+                    button.emoji_char = None
+                    button.set_visible(False)
+                    continue
+                emoji_char, emoji_info = emoji
+                if button.emoji_char != emoji_char:
+                    button.emoji_char = emoji_char
+                    button.char_label.set_label(emoji_char)
+                    button.set_tooltip_text(emoji_info.get("name", "Unknown"))
+                button.set_visible(True)
+                row_visible = True
+            row_box.set_visible(row_visible)
+
+    def on_emoji_slot_clicked(self, button: Button):
+        if button.emoji_char is not None:
+            self.copy_emoji_to_clipboard(button.emoji_char)
+            self.close_picker()
+
+    def bake_emoji_slot(self, **kwargs) -> Button:
+        char_label = Label(
+            name="emoji-char-label",
+            label="",
+            use_markup=True,
+            v_align="center",
+            h_align="center",
+            css_name="emoji-char-label"
+        )
         button = Button(
             name="emoji-slot-button",
             child=Box(
@@ -172,21 +247,14 @@ class EmojiPicker(Box):
                 orientation="horizontal",
                 halign="center",
                 valign="center",
-                children=[
-                    Label(
-                        name="emoji-char-label",
-                        label=emoji_char,
-                        use_markup=True,
-                        v_align="center",
-                        h_align="center",
-                        css_name="emoji-char-label"
-                    ),
-                ],
+                children=[char_label],
             ),
-            tooltip_text=emoji_info.get("name", "Unknown"),
-            on_clicked=lambda *_: (self.copy_emoji_to_clipboard(emoji_char), self.close_picker()),
+            on_clicked=self.on_emoji_slot_clicked,
             **kwargs,
         )
+        # Set by `bind_emoji_grid`; None while the slot is unused.
+        button.emoji_char = None
+        button.char_label = char_label
         return button
 
     def update_selection(self, new_index: int):
@@ -215,7 +283,7 @@ class EmojiPicker(Box):
         if current_page and current_page.get_children():
             if current_page.get_children()[0].get_children():
                 for row_box in current_page.get_children()[0].get_children():
-                    buttons.extend(row_box.get_children())
+                    buttons.extend(button for button in row_box.get_children() if button.emoji_char is not None)
         return buttons
 
 
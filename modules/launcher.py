@@ -1,14 +1,10 @@
 import json
 import math
-import operator
 import os
 import re
 import subprocess
-from collections.abc import Iterator
 
-import numpy as np
-from fabric.utils import (DesktopApp, exec_shell_command_async,
-                          get_desktop_applications, idle_add, remove_handler)
+from fabric.utils import DesktopApp, exec_shell_command_async
 from fabric.utils.helpers import get_relative_path
 from fabric.widgets.box import Box
 from fabric.widgets.button import Button
@@ -20,7 +16,169 @@ from gi.repository import Gdk, GLib
 
 import config.data as data
 import modules.icons as icons
-from modules.dock import Dock
+from services.desktop_catalog import DesktopCatalog
+from services.dock_config import DockConfig
+from utils.app_search import AppSearchIndex, FrecencyStore
+from utils.deferred import deferred_import
+from utils.icon_resolver import IconResolver
+
+# Only the calculator needs numpy.
+np = deferred_import("numpy")
+
+# Height of a result row (#slot-button min-height) plus the list spacing; the
+# real value is measured from the first row once it is allocated.
+ROW_STRIDE_DEFAULT = 56
+ROW_SPACING = 4
+# Rows kept bound above and below the visible ones.
+ROW_OVERSCAN = 2
+ICON_SIZE = 24
+
+
+class AppSlot(Button):
+    """Launcher row that is rebound to another application instead of rebuilt."""
+
+    def __init__(self, on_activate, **kwargs):
+        self.icon = Image(name="app-icon", h_align="start")
+        self.name_label = Label(
+            name="app-label",
+            label="",
+            ellipsization="end",
+            v_align="center",
+            h_align="center",
+        )
+        self.desc_label = Label(
+            name="app-desc",
+            label="",
+            ellipsization="end",
+            v_align="center",
+            h_align="start",
+            h_expand=True,
+        )
+        super().__init__(
+            name="slot-button",
+            child=Box(
+                name="slot-box",
+                orientation="h",
+                spacing=10,
+                children=[self.icon, self.name_label, self.desc_label],
+            ),
+            **kwargs,
+        )
+        self.app = None
+        self.connect(
+            "clicked", lambda *_: self.app is not None and on_activate(self.app)
+        )
+
+    def bind(self, app: DesktopApp, pixbuf):
+        if app is self.app:
+            return
+        self.app = app
+        self.icon.set_from_pixbuf(pixbuf)
+        self.name_label.set_label(app.display_name or "Unknown")
+        self.desc_label.set_label(app.description or "")
+        self.set_tooltip_text(app.description)
+
+
+class VirtualAppList(Box):
+    """
+    List of applications backed by a small pool of `AppSlot`s. Only the rows
+    in view are bound; spacers stand in for the rest, and scrolling rebinds
+    the pool instead of creating widgets.
+    """
+
+    def __init__(self, scrolled_window: ScrolledWindow, on_activate, **kwargs):
+        super().__init__(orientation="v", spacing=ROW_SPACING, **kwargs)
+        self.apps: list[DesktopApp] = []
+        self.selected_index = -1
+        self._stride = ROW_STRIDE_DEFAULT
+        self._on_activate = on_activate
+        self._slots: list[AppSlot] = []
+        self._icon_resolver = IconResolver.get_initial()
+
+        self.top_spacer = Box(name="launcher-spacer")
+        self.bottom_spacer = Box(name="launcher-spacer")
+        self.add(self.top_spacer)
+        self.add(self.bottom_spacer)
+        self.top_spacer.set_no_show_all(True)
+        self.bottom_spacer.set_no_show_all(True)
+
+        self.adjustment = scrolled_window.get_vadjustment()
+        self.adjustment.connect("value-changed", lambda *_: self.refresh())
+        self.adjustment.connect("notify::page-size", lambda *_: self.refresh())
+
+    def set_apps(self, apps: list[DesktopApp]):
+        self.apps = apps
+        self.selected_index = -1
+        self.adjustment.set_value(0)
+        self.refresh()
+
+    def _icon(self, app: DesktopApp):
+        return self._icon_resolver.get_app_pixbuf(
+            app, ICON_SIZE
+        ) or self._icon_resolver.load_icon("image-missing", ICON_SIZE)
+
+    def _ensure_pool(self, count: int):
+        while len(self._slots) < count:
+            slot = AppSlot(self._on_activate)
+            if not self._slots:
+                slot.connect("size-allocate", self._on_row_allocated)
+            self._slots.append(slot)
+            self.add(slot)
+            self.reorder_child(self.bottom_spacer, -1)
+
+    def _on_row_allocated(self, _, allocation):
+        stride = allocation.height + ROW_SPACING
+        if allocation.height > 1 and stride != self._stride:
+            self._stride = stride
+            GLib.idle_add(self.refresh)
+
+    def _set_spacer(self, spacer: Box, rows: int):
+        if rows <= 0:
+            spacer.hide()
+            return
+        spacer.set_size_request(-1, rows * self._stride - ROW_SPACING)
+        spacer.show()
+
+    def refresh(self):
+        total = len(self.apps)
+        page = self.adjustment.get_page_size() or self._stride * 12
+        count = min(total, int(page // self._stride) + 1 + 2 * ROW_OVERSCAN)
+        first = int(self.adjustment.get_value() // self._stride) - ROW_OVERSCAN
+        first = max(0, min(first, total - count))
+
+        self._ensure_pool(count)
+        for i, slot in enumerate(self._slots):
+            if i >= count:
+                slot.hide()
+                continue
+            index = first + i
+            slot.bind(self.apps[index], self._icon(self.apps[index]))
+            if index == self.selected_index:
+                slot.get_style_context().add_class("selected")
+            else:
+                slot.get_style_context().remove_class("selected")
+            slot.show_all()
+
+        self._set_spacer(self.top_spacer, first)
+        self._set_spacer(self.bottom_spacer, total - first - count)
+        return False
+
+    def select(self, index: int):
+        self.selected_index = index
+        if index != -1:
+            top = index * self._stride
+            value = self.adjustment.get_value()
+            page = self.adjustment.get_page_size()
+            if top < value:
+                self.adjustment.set_value(top)
+            elif top + self._stride > value + page:
+                self.adjustment.set_value(top + self._stride - page)
+        self.refresh()
+
+    def selected_app(self) -> DesktopApp | None:
+        if 0 <= self.selected_index < len(self.apps):
+            return self.apps[self.selected_index]
+        return None
 
 
 class AppLauncher(Box):
@@ -35,8 +193,12 @@ class AppLauncher(Box):
         self.notch = kwargs["notch"]
         self.selected_index = -1
 
-        self._arranger_handler: int = 0
-        self._all_apps = get_desktop_applications()
+        self._search_index = AppSearchIndex(
+            FrecencyStore(f"{data.CACHE_DIR}/launcher_frecency.json")
+        )
+        self.catalog = DesktopCatalog.get_initial()
+        self._all_apps = self.catalog.get_apps()
+        self._search_index.rebuild(self._all_apps)
 
         self.calc_history_path = f"{data.CACHE_DIR}/calc.json"
         if os.path.exists(self.calc_history_path):
@@ -45,6 +207,7 @@ class AppLauncher(Box):
         else:
             self.calc_history = []
 
+        # Calculator history rows; application results live in `app_list`.
         self.viewport = Box(name="viewport", spacing=4, orientation="v")
         self.search_entry = Entry(
             name="search-entry",
@@ -63,10 +226,14 @@ class AppLauncher(Box):
             v_expand=True,
             h_align="fill",
             v_align="fill",
-            child=self.viewport,
             propagate_width=False,
             propagate_height=False,
         )
+        self.app_list = VirtualAppList(self.scrolled_window, self.launch_app)
+        self.results_box = Box(
+            orientation="v", children=[self.app_list, self.viewport]
+        )
+        self.scrolled_window.add(self.results_box)
 
         self.header_box = Box(
             name="header_box",
@@ -106,11 +273,13 @@ class AppLauncher(Box):
 
     def close_launcher(self):
         self.viewport.children = []
+        self.app_list.set_apps([])
         self.selected_index = -1
         self.notch.close_notch()
 
     def open_launcher(self):
-        self._all_apps = get_desktop_applications()
+        self._all_apps = self.catalog.get_apps()
+        self._search_index.rebuild(self._all_apps)
         self.arrange_viewport()
         
 
@@ -130,7 +299,8 @@ class AppLauncher(Box):
         """Make sure the launcher is initialized with apps list before opening"""
         if not hasattr(self, '_initialized'):
 
-            self._all_apps = get_desktop_applications()
+            self._all_apps = self.catalog.get_apps()
+            self._search_index.rebuild(self._all_apps)
             self._initialized = True
             return True
         return False
@@ -140,86 +310,38 @@ class AppLauncher(Box):
 
             self.update_calculator_viewport()
             return
-        remove_handler(self._arranger_handler) if self._arranger_handler else None
         self.viewport.children = []
         self.selected_index = -1
 
-        filtered_apps_iter = iter(
-            sorted(
-                [
-                    app
-                    for app in self._all_apps
-                    if query.casefold()
-                    in (
-                        (app.display_name or "")
-                        + (" " + app.name + " ")
-                        + (app.generic_name or "")
-                    ).casefold()
-                ],
-                key=lambda app: (app.display_name or "").casefold(),
-            )
-        )
-        should_resize = operator.length_hint(filtered_apps_iter) == len(self._all_apps)
-
-        self._arranger_handler = idle_add(
-            lambda apps_iter: self.add_next_application(apps_iter) or self.handle_arrange_complete(should_resize, query),
-            filtered_apps_iter,
-            pin=True,
-        )
+        filtered_apps = self._search_index.search(query)
+        self.app_list.set_apps(filtered_apps)
 
-    def handle_arrange_complete(self, should_resize, query):
-        if should_resize:
+        if len(filtered_apps) == len(self._all_apps):
             self.resize_viewport()
-
-        if query.strip() != "" and self.viewport.get_children():
+        if query.strip() != "" and filtered_apps:
             self.update_selection(0)
-        return False
-
-    def add_next_application(self, apps_iter: Iterator[DesktopApp]):
-        if not (app := next(apps_iter, None)):
-            return False
-        self.viewport.add(self.bake_application_slot(app))
-        return True
 
     def resize_viewport(self):
         self.scrolled_window.set_min_content_width(
-            self.viewport.get_allocation().width
+            self.results_box.get_allocation().width
         )
         return False
 
-    def bake_application_slot(self, app: DesktopApp, **kwargs) -> Button:
-        button = Button(
-            name="slot-button",
-            child=Box(
-                name="slot-box",
-                orientation="h",
-                spacing=10,
-                children=[
-                    Image(name="app-icon", pixbuf=app.get_icon_pixbuf(size=24), h_align="start"),
-                    Label(
-                        name="app-label",
-                        label=app.display_name or "Unknown",
-                        ellipsization="end",
-                        v_align="center",
-                        h_align="center",
-                    ),
-                    Label(
-                        name="app-desc",
-                        label=app.description or "",
-                        ellipsization="end",
-                        v_align="center",
-                        h_align="start",
-                        h_expand=True,
-                    ),
-                ],
-            ),
-            tooltip_text=app.description,
-            on_clicked=lambda *_: (app.launch(), self.close_launcher()),
-            **kwargs,
-        )
-        return button
+    def launch_app(self, app: DesktopApp):
+        app.launch()
+        self._search_index.record_launch(app)
+        self.close_launcher()
+
+    def _in_calculator(self) -> bool:
+        return self.search_entry.get_text().startswith("=")
 
     def update_selection(self, new_index: int):
+        if not self._in_calculator():
+            if not 0 <= new_index < len(self.app_list.apps):
+                new_index = -1
+            self.selected_index = new_index
+            self.app_list.select(new_index)
+            return
 
         if self.selected_index != -1 and self.selected_index < len(self.viewport.get_children()):
             current_button = self.viewport.get_children()[self.selected_index]
@@ -273,14 +395,14 @@ class AppLauncher(Box):
             case ":p":
                 self.notch.open_notch("power")
             case _:
-                children = self.viewport.get_children()
-                if children:
+                apps = self.app_list.apps
+                if apps:
 
                     if text.strip() == "" and self.selected_index == -1:
                         return
                     selected_index = self.selected_index if self.selected_index != -1 else 0
-                    if 0 <= selected_index < len(children):
-                        children[selected_index].clicked()
+                    if 0 <= selected_index < len(apps):
+                        self.launch_app(apps[selected_index])
 
     def on_search_entry_key_press(self, widget, event):
         text = widget.get_text()
@@ -344,13 +466,7 @@ class AppLauncher(Box):
 
     def add_selected_app_to_dock(self):
         """Adds the currently selected application to the dock.json file with comprehensive metadata."""
-        children = self.viewport.get_children()
-        if not children or self.selected_index == -1 or self.selected_index >= len(children):
-            return
-
-        selected_button = children[self.selected_index]
-
-        selected_app = next((app for app in self._all_apps if app.display_name == selected_button.get_child().get_children()[1].props.label), None)
+        selected_app = self.app_list.selected_app()
         if not selected_app:
             return
 
@@ -363,12 +479,8 @@ class AppLauncher(Box):
             "icon_name": selected_app.icon_name
         }.items() if v is not None}
 
-        config_path = get_relative_path("../config/dock.json")
-        try:
-            with open(config_path, "r") as file:
-                data = json.load(file)
-        except (FileNotFoundError, json.JSONDecodeError):
-            data = {"pinned_apps": []}
+        dock_config = DockConfig.get_initial()
+        data = dock_config.get_config()
 
         already_pinned = False
         for pinned_app in data.get("pinned_apps", []):
@@ -388,22 +500,21 @@ class AppLauncher(Box):
             data.setdefault("pinned_apps", []).append(app_data)
         
 
-        with open(config_path, "w") as file:
-            json.dump(data, file, indent=4)
-            
-
-        Dock.notify_config_change()
+        dock_config.save(data)
 
     def move_selection(self, delta: int):
-        children = self.viewport.get_children()
-        if not children:
+        if self._in_calculator():
+            count = len(self.viewport.get_children())
+        else:
+            count = len(self.app_list.apps)
+        if not count:
             return
 
         if self.selected_index == -1 and delta == 1:
             new_index = 0
         else:
             new_index = self.selected_index + delta
-        new_index = max(0, min(new_index, len(children) - 1))
+        new_index = max(0, min(new_index, count - 1))
         self.update_selection(new_index)
 
     def save_calc_history(self):
@@ -485,6 +596,7 @@ class AppLauncher(Box):
         self.update_calculator_viewport()
 
     def update_calculator_viewport(self):
+        self.app_list.set_apps([])
         self.viewport.children = []
         for item in self.calc_history:
             btn = self.create_calc_history_button(item)
@@ -1,11 +1,8 @@
-import json
 import logging
-import subprocess
 import time
+from array import array
 
 import psutil
-from fabric.core.fabricator import Fabricator
-from fabric.utils.helpers import invoke_repeater
 from fabric.widgets.box import Box
 from fabric.widgets.button import Button
 from fabric.widgets.circularprogressbar import CircularProgressBar
@@ -18,39 +15,106 @@ from gi.repository import GLib
 
 import config.data as data
 import modules.icons as icons
+from services.gpu import GpuReader, select_gpu_reader
 from services.network import NetworkClient
 
 logger = logging.getLogger(__name__)
 
+HISTORY_SIZE = 60
+
+
+class RingBuffer:
+    """Fixed-size, array-backed history of float samples."""
+
+    def __init__(self, size: int = HISTORY_SIZE):
+        self._data = array("d", bytes(8 * size))
+        self._size = size
+        self._index = 0
+        self._count = 0
+
+    def append(self, value: float):
+        self._data[self._index] = value
+        self._index = (self._index + 1) % self._size
+        self._count = min(self._count + 1, self._size)
+
+    def latest(self, default: float = 0.0) -> float:
+        if not self._count:
+            return default
+        return self._data[self._index - 1]
+
+    def values(self) -> list[float]:
+        """Return the stored samples, oldest first."""
+        if self._count < self._size:
+            return self._data[: self._count].tolist()
+        return (self._data[self._index :] + self._data[: self._index]).tolist()
+
+    def __len__(self):
+        return self._count
+
+
+def _value_changed(old, new, threshold: float) -> bool:
+    if old is None or type(old) is not type(new):
+        return True
+    if isinstance(new, (list, tuple)):
+        return len(old) != len(new) or any(
+            _value_changed(a, b, threshold) for a, b in zip(old, new)
+        )
+    if isinstance(new, float) or (isinstance(new, int) and not isinstance(new, bool)):
+        return new != old and abs(new - old) >= threshold
+    return new != old
+
 
 class MetricsProvider:
     """
-    Class responsible for obtaining centralized CPU, memory, disk usage, and battery metrics.
-    It updates periodically so that all widgets querying it display the same values.
+    Class responsible for obtaining centralized CPU, memory, disk usage, network and battery metrics.
+    Every source is sampled once per tick and kept in ring buffers; widgets subscribe
+    to the keys they display and are only notified when a value moves past their threshold.
     """
 
-    def __init__(self):
+    def __init__(self, gpu_reader: GpuReader | None = None):
         self.gpu = []
+        self.gpu_names = []
         self.cpu = 0.0
+        self.cores = []
         self.mem = 0.0
         self.disk = []
+        self.net_rx = 0.0
+        self.net_tx = 0.0
 
         self.bat_percent = 0.0
         self.bat_charging = None
 
-        self._gpu_update_running = False
+        self.history: dict[str, RingBuffer] = {
+            key: RingBuffer() for key in ("cpu", "mem", "net_rx", "net_tx", "battery")
+        }
+
+        self._subscribers: dict[int, list] = {}
+        self._next_handle = 1
+
+        self._last_net = psutil.net_io_counters()
+        self._last_net_time = time.monotonic()
 
+        self._gpu_reader = gpu_reader
+
+        self._update()
         GLib.timeout_add_seconds(1, self._update)
 
+    def _record(self, key: str, value: float):
+        buffer = self.history.get(key)
+        if buffer is None:
+            buffer = self.history[key] = RingBuffer()
+        buffer.append(value)
+
     def _update(self):
-        self.cpu = psutil.cpu_percent(interval=0)
+        self.cores = psutil.cpu_percent(interval=0, percpu=True)
+        self.cpu = sum(self.cores) / len(self.cores) if self.cores else 0.0
         self.mem = psutil.virtual_memory().percent
         self.disk = [psutil.disk_usage(path).percent for path in data.BAR_METRICS_DISKS]
         self.gpubig = data.METRICS_VISIBLE["gpu"]
         self.gpusmall = data.METRICS_SMALL_VISIBLE["gpu"]
 
-        if (self.gpubig or self.gpusmall) and not self._gpu_update_running:
-            self._start_gpu_update_async()
+        if self.gpubig or self.gpusmall:
+            self._update_gpu()
         battery = psutil.sensors_battery()
         if battery is None:
             self.bat_percent = 0.0
@@ -59,71 +123,78 @@ class MetricsProvider:
             self.bat_percent = battery.percent
             self.bat_charging = battery.power_plugged
 
+        now = time.monotonic()
+        counters = psutil.net_io_counters()
+        elapsed = max(now - self._last_net_time, 1e-3)
+        self.net_rx = (counters.bytes_recv - self._last_net.bytes_recv) / elapsed
+        self.net_tx = (counters.bytes_sent - self._last_net.bytes_sent) / elapsed
+        self._last_net = counters
+        self._last_net_time = now
+
+        self._record("cpu", self.cpu)
+        self._record("mem", self.mem)
+        self._record("net_rx", self.net_rx)
+        self._record("net_tx", self.net_tx)
+        self._record("battery", self.bat_percent)
+        for i, value in enumerate(self.cores):
+            self._record(f"core{i}", value)
+        for path, value in zip(data.BAR_METRICS_DISKS, self.disk):
+            self._record(f"disk:{path}", value)
+        for i, value in enumerate(self.gpu):
+            self._record(f"gpu{i}", value)
+
+        self._notify()
         return True
 
-    def _start_gpu_update_async(self):
-        """Starts a new GLib thread to run nvtop in the background."""
-        self._gpu_update_running = True
-
-        GLib.Thread.new("nvtop-thread", lambda _: self._run_nvtop_in_thread(), None)
-
-    def _run_nvtop_in_thread(self):
-        """Runs nvtop via subprocess in a separate GLib thread."""
-        output = None
-        error_message = None
-        try:
-            result = subprocess.check_output(["nvtop", "-s"], text=True, timeout=10)
-            output = result
-        except FileNotFoundError:
-            error_message = "nvtop command not found."
-            logger.warning(error_message)
-        except subprocess.CalledProcessError as e:
-            error_message = (
-                f"nvtop failed with exit code {e.returncode}: {e.stderr.strip()}"
-            )
-            logger.error(error_message)
-        except subprocess.TimeoutExpired:
-            error_message = "nvtop command timed out."
-            logger.error(error_message)
-        except Exception as e:
-            error_message = f"Unexpected error running nvtop: {e}"
-            logger.error(error_message)
-
-        GLib.idle_add(self._process_gpu_output, output, error_message)
-        self._gpu_update_running = False
-
-    def _process_gpu_output(self, output, error_message):
-        """Process nvtop JSON output on the main loop."""
-        try:
-            if error_message:
-                logger.error(f"GPU update failed: {error_message}")
-                self.gpu = []
-            elif output:
-                info = json.loads(output)
-                try:
-                    self.gpu = [
-                        (
-                            int(v["gpu_util"].strip("%"))
-                            if v["gpu_util"] is not None
-                            else 0
-                        )
-                        for v in info
-                    ]
-
-                except (KeyError, ValueError, TypeError) as e:
-                    logger.error(f"Failed parsing nvtop JSON: {e}")
-                    self.gpu = []
-            else:
-                logger.warning("nvtop returned no output.")
-                self.gpu = []
-        except json.JSONDecodeError as e:
-            logger.error(f"JSON decode error: {e}")
-            self.gpu = []
-        except Exception as e:
-            logger.error(f"Error processing nvtop output: {e}")
-            self.gpu = []
-
-        return False
+    def _snapshot(self, key: str):
+        match key:
+            case "cpu":
+                return self.cpu
+            case "cores":
+                return self.cores
+            case "mem":
+                return self.mem
+            case "disk":
+                return self.disk
+            case "gpu":
+                return self.gpu
+            case "net":
+                return (self.net_rx, self.net_tx)
+            case "battery":
+                return (self.bat_percent, self.bat_charging)
+        return None
+
+    def _notify(self):
+        for subscriber in list(self._subscribers.values()):
+            callback, keys, threshold, last = subscriber
+            current = {key: self._snapshot(key) for key in keys}
+            if any(_value_changed(last.get(key), current[key], threshold) for key in keys):
+                subscriber[3] = current
+                callback(self)
+
+    def subscribe(self, callback, keys: list[str], threshold: float = 1.0) -> int:
+        """
+        Call `callback(provider)` after a tick in which any of `keys` moved by at
+        least `threshold`. Keys: cpu, cores, mem, disk, gpu, net, battery.
+        """
+        handle = self._next_handle
+        self._next_handle += 1
+        self._subscribers[handle] = [callback, keys, threshold, {}]
+        return handle
+
+    def unsubscribe(self, handle: int):
+        self._subscribers.pop(handle, None)
+
+    def get_history(self, key: str) -> list[float]:
+        buffer = self.history.get(key)
+        return buffer.values() if buffer else []
+
+    def _update_gpu(self):
+        if self._gpu_reader is None:
+            self._gpu_reader = select_gpu_reader()
+            self._gpu_reader.start()
+        self.gpu = self._gpu_reader.read()
+        self.gpu_names = list(self._gpu_reader.names)
 
     def get_metrics(self):
         return (self.cpu, self.mem, self.disk, self.gpu)
@@ -131,25 +202,11 @@ class MetricsProvider:
     def get_battery(self):
         return (self.bat_percent, self.bat_charging)
 
-    def get_gpu_info(self):
-        try:
-            result = subprocess.check_output(["nvtop", "-s"], text=True, timeout=5)
-            return json.loads(result)
-        except FileNotFoundError:
-            logger.warning("nvtop not found; GPU info unavailable.")
-            return []
-        except subprocess.CalledProcessError as e:
-            logger.error(f"nvtop init sync failed: {e}")
-            return []
-        except subprocess.TimeoutExpired:
-            logger.error("nvtop init call timed out.")
-            return []
-        except json.JSONDecodeError as e:
-            logger.error(f"Init JSON parse error: {e}")
-            return []
-        except Exception as e:
-            logger.error(f"Unexpected error during GPU init: {e}")
-            return []
+    def get_network_speed(self):
+        return (self.net_rx, self.net_tx)
+
+    def get_gpu_names(self):
+        return self.gpu_names
 
 
 shared_provider = MetricsProvider()
@@ -213,20 +270,6 @@ class Metrics(Box):
             else []
         )
 
-        gpu_info = shared_provider.get_gpu_info()
-        gpus = (
-            [
-                SingularMetric(
-                    "gpu",
-                    f"GPU ({v['device_name']})" if len(gpu_info) != 1 else "GPU",
-                    icons.gpu,
-                )
-                for v in gpu_info
-            ]
-            if visible.get("gpu", True)
-            else []
-        )
-
         self.cpu = (
             SingularMetric("cpu", "CPU", icons.cpu)
             if visible.get("cpu", True)
@@ -238,7 +281,9 @@ class Metrics(Box):
             else None
         )
         self.disk = disks
-        self.gpu = gpus
+        self.gpu = []
+        self._gpu_visible = visible.get("gpu", True)
+        self._gpu_names = []
 
         self.scales = []
         if self.disk:
@@ -247,8 +292,6 @@ class Metrics(Box):
             self.scales.append(self.ram.box)
         if self.cpu:
             self.scales.append(self.cpu.box)
-        if self.gpu:
-            self.scales.extend([v.box for v in self.gpu])
 
         if self.cpu:
             self.cpu.usage.set_sensitive(False)
@@ -256,15 +299,38 @@ class Metrics(Box):
             self.ram.usage.set_sensitive(False)
         for disk in self.disk:
             disk.usage.set_sensitive(False)
-        for gpu in self.gpu:
-            gpu.usage.set_sensitive(False)
 
         for x in self.scales:
             self.add(x)
+        self._sync_gpu_widgets()
 
-        GLib.timeout_add_seconds(1, self.update_status)
+        shared_provider.subscribe(
+            lambda *_: self.update_status(), ["cpu", "mem", "disk", "gpu"]
+        )
+
+    def _sync_gpu_widgets(self):
+        """GPU devices are discovered by the reader, so build their scales on demand."""
+        names = shared_provider.get_gpu_names() if self._gpu_visible else []
+        if names == self._gpu_names:
+            return
+        for gpu in self.gpu:
+            self.scales.remove(gpu.box)
+            self.remove(gpu.box)
+        self.gpu = [
+            SingularMetric(
+                "gpu", f"GPU ({name})" if len(names) != 1 else "GPU", icons.gpu
+            )
+            for name in names
+        ]
+        for gpu in self.gpu:
+            gpu.usage.set_sensitive(False)
+            self.scales.append(gpu.box)
+            self.add(gpu.box)
+            gpu.box.show_all()
+        self._gpu_names = list(names)
 
     def update_status(self):
+        self._sync_gpu_widgets()
         cpu, mem, disks, gpus = shared_provider.get_metrics()
 
         if self.cpu:
@@ -327,7 +393,7 @@ class MetricsSmall(Button):
     def __init__(self, **kwargs):
         super().__init__(name="metrics-small", **kwargs)
 
-        main_box = Box(
+        self.main_box = main_box = Box(
             spacing=0,
             orientation="h" if not data.VERTICAL else "v",
             visible=True,
@@ -352,20 +418,6 @@ class MetricsSmall(Button):
             else []
         )
 
-        gpu_info = shared_provider.get_gpu_info()
-        gpus = (
-            [
-                SingularMetricSmall(
-                    "gpu",
-                    f"GPU ({v['device_name']})" if len(gpu_info) != 1 else "GPU",
-                    icons.gpu,
-                )
-                for v in gpu_info
-            ]
-            if visible.get("gpu", True)
-            else []
-        )
-
         self.cpu = (
             SingularMetricSmall("cpu", "CPU", icons.cpu)
             if visible.get("cpu", True)
@@ -377,7 +429,9 @@ class MetricsSmall(Button):
             else None
         )
         self.disk = disks
-        self.gpu = gpus
+        self.gpu = []
+        self._gpu_visible = visible.get("gpu", True)
+        self._gpu_names = []
 
         for disk in self.disk:
             main_box.add(disk.box)
@@ -387,16 +441,17 @@ class MetricsSmall(Button):
             main_box.add(Box(name="metrics-sep"))
         if self.cpu:
             main_box.add(self.cpu.box)
-        for gpu in self.gpu:
-            main_box.add(Box(name="metrics-sep"))
-            main_box.add(gpu.box)
+        self._gpu_separators = []
+        self._sync_gpu_widgets()
 
         self.add(main_box)
 
         self.connect("enter-notify-event", self.on_mouse_enter)
         self.connect("leave-notify-event", self.on_mouse_leave)
 
-        GLib.timeout_add_seconds(1, self.update_metrics)
+        shared_provider.subscribe(
+            lambda *_: self.update_metrics(), ["cpu", "mem", "disk", "gpu"]
+        )
 
         self.hide_timer = None
         self.hover_counter = 0
@@ -445,7 +500,31 @@ class MetricsSmall(Button):
             self.hide_timer = None
             return False
 
+    def _sync_gpu_widgets(self):
+        """GPU devices are discovered by the reader, so build their circles on demand."""
+        names = shared_provider.get_gpu_names() if self._gpu_visible else []
+        if names == self._gpu_names:
+            return
+        for widget in self._gpu_separators + [gpu.box for gpu in self.gpu]:
+            self.main_box.remove(widget)
+        self.gpu = [
+            SingularMetricSmall(
+                "gpu", f"GPU ({name})" if len(names) != 1 else "GPU", icons.gpu
+            )
+            for name in names
+        ]
+        self._gpu_separators = []
+        for gpu in self.gpu:
+            separator = Box(name="metrics-sep")
+            self._gpu_separators.append(separator)
+            self.main_box.add(separator)
+            self.main_box.add(gpu.box)
+            separator.show()
+            gpu.box.show_all()
+        self._gpu_names = list(names)
+
     def update_metrics(self):
+        self._sync_gpu_widgets()
         cpu, mem, disks, gpus = shared_provider.get_metrics()
 
         if self.cpu:
@@ -527,14 +606,10 @@ class Battery(Button):
         self.connect("enter-notify-event", self.on_mouse_enter)
         self.connect("leave-notify-event", self.on_mouse_leave)
 
-        self.batt_fabricator = Fabricator(
-            poll_from=lambda v: shared_provider.get_battery(),
-            on_changed=lambda f, v: self.update_battery,
-            interval=1000,
-            stream=False,
-            default_value=0,
+        shared_provider.subscribe(
+            lambda provider: self.update_battery(None, provider.get_battery()),
+            ["battery"],
         )
-        self.batt_fabricator.changed.connect(self.update_battery)
         GLib.idle_add(self.update_battery, None, shared_provider.get_battery())
 
         self.hide_timer = None
@@ -669,23 +744,25 @@ class NetworkApplet(Button):
             self.upload_icon.set_margin_top(4)
             self.download_icon.set_margin_bottom(4)
 
-        self.last_counters = psutil.net_io_counters()
-        self.last_time = time.time()
-        invoke_repeater(1000, self.update_network)
+        self._watched_devices = []
+        shared_provider.subscribe(lambda *_: self.update_network(), ["net"], threshold=0)
+        self.network_client.connect("device-ready", self._connect_network_devices)
 
         self.connect("enter-notify-event", self.on_mouse_enter)
         self.connect("leave-notify-event", self.on_mouse_leave)
 
+    def _connect_network_devices(self, *_):
+        for device in (
+            self.network_client.wifi_device,
+            self.network_client.ethernet_device,
+        ):
+            if device and device not in self._watched_devices:
+                self._watched_devices.append(device)
+                device.connect("changed", lambda *_: self.update_network())
+        self.update_network()
+
     def update_network(self):
-        current_time = time.time()
-        elapsed = current_time - self.last_time
-        current_counters = psutil.net_io_counters()
-        download_speed = (
-            current_counters.bytes_recv - self.last_counters.bytes_recv
-        ) / elapsed
-        upload_speed = (
-            current_counters.bytes_sent - self.last_counters.bytes_sent
-        ) / elapsed
+        download_speed, upload_speed = shared_provider.get_network_speed()
         download_str = self.format_speed(download_speed)
         upload_str = self.format_speed(upload_speed)
         self.download_label.set_markup(download_str)
@@ -760,8 +837,6 @@ class NetworkApplet(Button):
         else:
             self.set_tooltip_text(tooltip_base)
 
-        self.last_counters = current_counters
-        self.last_time = current_time
         return True
 
     def format_speed(self, speed):
@@ -1,7 +1,8 @@
+import importlib
 from os import truncate
 
 from fabric.hyprland.widgets import ActiveWindow
-from fabric.utils.helpers import FormattedString, get_desktop_applications, truncate
+from fabric.utils.helpers import FormattedString, truncate
 from fabric.widgets.box import Box
 from fabric.widgets.centerbox import CenterBox
 from fabric.widgets.image import Image
@@ -13,21 +14,42 @@ from fabric.widgets.wayland import WaylandWindow as Window
 from gi.repository import Gdk, GLib, Gtk, Pango
 
 import config.data as data
-from modules.bluetooth import BluetoothConnections
-from modules.cliphist import ClipHistory
 from modules.corners import MyCorner
 from modules.dashboard import Dashboard
-from modules.emoji import EmojiPicker
-from modules.launcher import AppLauncher
-from modules.network import NetworkConnections
-from modules.notifications import NotificationContainer
-from modules.overview import Overview
 from modules.player import PlayerSmall
-from modules.power import PowerMenu
-from modules.tmux import TmuxManager
-from modules.tools import Toolbox
+from services.desktop_catalog import DesktopCatalog
+from services.hyprland_state import HyprlandStateStore
 from utils.icon_resolver import IconResolver
-from utils.occlusion import check_occlusion
+from utils.occlusion import OcclusionEngine
+from utils.profiling import on_first_frame, timeline
+
+# Panels of the notch stack, imported and built the first time they are opened.
+# name -> (module, class, whether the constructor takes `notch`)
+NOTCH_PANELS = {
+    "launcher": ("modules.launcher", "AppLauncher", True),
+    "overview": ("modules.overview", "Overview", False),
+    "emoji": ("modules.emoji", "EmojiPicker", True),
+    "power": ("modules.power", "PowerMenu", True),
+    "tools": ("modules.tools", "Toolbox", True),
+    "tmux": ("modules.tmux", "TmuxManager", True),
+    "cliphist": ("modules.cliphist", "ClipHistory", True),
+}
+
+# Order in which panels (and dashboard sections) are built in idle time.
+PREWARM_ORDER = [
+    "launcher",
+    "power",
+    "tools",
+    "overview",
+    "cliphist",
+    "emoji",
+    "tmux",
+    "pins",
+    "kanban",
+    "wallpapers",
+    "bluetooth",
+    "player",
+]
 
 
 class Notch(Window):
@@ -147,27 +169,28 @@ class Notch(Window):
         self.is_hovered = False
         self._prevent_occlusion = False
         self._occlusion_timer_id = None
+        self._occluded = False
+        self._occlusion_enabled = (
+            data.PANEL_THEME == "Notch" and data.BAR_POSITION != "Top"
+        )
 
-        self.icon_resolver = IconResolver()
-        self._all_apps = get_desktop_applications()
-        self.app_identifiers = self._build_app_identifiers_map()
+        self.icon_resolver = IconResolver.get_initial()
+        self.hypr_state = HyprlandStateStore.get_initial()
+        self.catalog = DesktopCatalog.get_initial()
 
         self.dashboard = Dashboard(notch=self)
         self.nhistory = self.dashboard.widgets.notification_history
 
         self.applet_stack = self.dashboard.widgets.applet_stack
-        self.btdevices = self.dashboard.widgets.bluetooth
+        self.btdevices = self.dashboard.widgets.slot_boxes["bluetooth"]
         self.nwconnections = self.dashboard.widgets.network_connections
 
         self.btdevices.set_visible(False)
         self.nwconnections.set_visible(False)
 
-        self.launcher = AppLauncher(notch=self)
-        self.overview = Overview()
-        self.emoji = EmojiPicker(notch=self)
-        self.power = PowerMenu(notch=self)
-        self.tmux = TmuxManager(notch=self)
-        self.cliphist = ClipHistory(notch=self)
+        self._panels = {}
+        self._panel_sizes = {}
+        self._prewarm_queue = []
 
         self.window_label = Label(
             name="notch-window-label",
@@ -200,10 +223,11 @@ class Notch(Window):
             lambda widget, event: (self.open_notch("dashboard"), False)[1],
         )
 
-        self.active_window.connect("notify::label", self.update_window_icon)
-
-        if data.PANEL_THEME == "Notch":
-            self.active_window.connect("notify::label", self.on_active_window_changed)
+        self.hypr_state.subscribe(
+            "notch",
+            ("activewindowv2", "windowtitlev2", "ready"),
+            self._on_hyprland_changed,
+        )
 
         self.active_window.get_children()[0].set_hexpand(True)
         self.active_window.get_children()[0].set_halign(Gtk.Align.FILL)
@@ -213,17 +237,19 @@ class Notch(Window):
             "notify::label", lambda *_: self.restore_label_properties()
         )
 
-        self.player_small = PlayerSmall()
-        self.user_label = Label(
-            name="compact-user", label=f"{data.USERNAME}@{data.HOSTNAME}"
+        # The compact player (MPRIS and the spectrum) is built after the first
+        # frame; the compact stack shows the active window until then anyway.
+        self.player_small = None
+        self.player_small_slot = Box(name="player-small-slot")
+        on_first_frame(
+            self,
+            lambda: GLib.idle_add(
+                self._build_player_small, priority=GLib.PRIORITY_LOW
+            ),
         )
 
-        self.player_small.mpris_manager.connect(
-            "player-appeared",
-            lambda *_: self.compact_stack.set_visible_child(self.player_small),
-        )
-        self.player_small.mpris_manager.connect(
-            "player-vanished", self.on_player_vanished
+        self.user_label = Label(
+            name="compact-user", label=f"{data.USERNAME}@{data.HOSTNAME}"
         )
 
         self.compact_stack = Stack(
@@ -235,7 +261,7 @@ class Notch(Window):
             children=[
                 self.user_label,
                 self.active_window_box,
-                self.player_small,
+                self.player_small_slot,
             ],
         )
 
@@ -257,7 +283,6 @@ class Notch(Window):
         self.compact.connect("enter-notify-event", self.on_button_enter)
         self.compact.connect("leave-notify-event", self.on_button_leave)
 
-        self.tools = Toolbox(notch=self)
         self.stack = Stack(
             name="notch-content",
             v_expand=True,
@@ -272,14 +297,7 @@ class Notch(Window):
             transition_duration=250,
             children=[
                 self.compact,
-                self.launcher,
                 self.dashboard,
-                self.overview,
-                self.emoji,
-                self.power,
-                self.tools,
-                self.tmux,
-                self.cliphist,
             ],
         )
 
@@ -293,16 +311,14 @@ class Notch(Window):
             data.PANEL_POSITION in ["Start", "End"] and data.PANEL_THEME == "Panel"
         ):
             self.compact.set_size_request(260, 40)
-            self.launcher.set_size_request(320, 635)
-            self.tmux.set_size_request(320, 635)
-            self.cliphist.set_size_request(320, 635)
+            for name in ("launcher", "tmux", "cliphist"):
+                self._panel_sizes[name] = (320, 635)
             self.dashboard.set_size_request(410, 900)
 
         else:
             self.compact.set_size_request(260, 40)
-            self.launcher.set_size_request(480, 244)
-            self.tmux.set_size_request(480, 244)
-            self.cliphist.set_size_request(480, 244)
+            for name in ("launcher", "tmux", "cliphist"):
+                self._panel_sizes[name] = (480, 244)
             self.dashboard.set_size_request(1093, 472)
 
         self.stack.set_interpolate_size(True)
@@ -436,8 +452,10 @@ class Notch(Window):
 
         self._current_window_class = self._get_current_window_class()
 
-        if data.PANEL_THEME == "Notch" and data.BAR_POSITION != "Top":
-            GLib.timeout_add(250, self._check_occlusion)
+        if self._occlusion_enabled:
+            self._occlusion_handle = OcclusionEngine.get_initial().subscribe(
+                "top", 40, self._on_occlusion_changed
+            )
         elif data.PANEL_THEME == "Notch":
             self.notch_revealer.set_reveal_child(True)
         else:
@@ -446,6 +464,82 @@ class Notch(Window):
         # Add key press event handling to the entire notch window
         self.connect("key-press-event", self.on_key_press)
 
+    # Panels
+
+    launcher = property(lambda self: self.get_panel("launcher"))
+    overview = property(lambda self: self.get_panel("overview"))
+    emoji = property(lambda self: self.get_panel("emoji"))
+    power = property(lambda self: self.get_panel("power"))
+    tools = property(lambda self: self.get_panel("tools"))
+    tmux = property(lambda self: self.get_panel("tmux"))
+    cliphist = property(lambda self: self.get_panel("cliphist"))
+
+    def get_panel(self, name: str):
+        """Return the panel called `name`, importing and building it if needed."""
+        panel = self._panels.get(name)
+        if panel is not None:
+            return panel
+
+        module_name, class_name, takes_notch = NOTCH_PANELS[name]
+        with timeline.span(f"notch panel '{name}'"):
+            panel_class = getattr(importlib.import_module(module_name), class_name)
+            panel = panel_class(notch=self) if takes_notch else panel_class()
+            if name in self._panel_sizes:
+                panel.set_size_request(*self._panel_sizes[name])
+            self._panels[name] = panel
+            self.stack.add(panel)
+            panel.show_all()
+        return panel
+
+    def schedule_prewarm(self):
+        """Build the panels that were not opened yet in idle time after startup."""
+        if not data.NOTCH_PREWARM:
+            return
+        self._prewarm_queue = list(PREWARM_ORDER)
+        GLib.timeout_add_seconds(2, self._start_prewarm)
+
+    def _start_prewarm(self):
+        GLib.idle_add(self._prewarm_next, priority=GLib.PRIORITY_LOW)
+        return False
+
+    def _prewarm_next(self):
+        # One panel per idle callback, so input is never blocked for long.
+        while self._prewarm_queue:
+            name = self._prewarm_queue.pop(0)
+            if name in NOTCH_PANELS and name not in self._panels:
+                self.get_panel(name)
+                break
+            if name in self.dashboard.section_boxes and not self.dashboard.is_built(
+                name
+            ):
+                self.dashboard.get_section(name)
+                break
+            widgets = self.dashboard.widgets
+            if name in widgets.slot_boxes and not widgets.is_built(name):
+                widgets.get_widget(name)
+                break
+        return bool(self._prewarm_queue)
+
+    def _build_player_small(self):
+        with timeline.span("notch compact player"):
+            self.player_small = PlayerSmall()
+            self.player_small_slot.add(self.player_small)
+            self.player_small.show_all()
+
+        self.player_small.mpris_manager.connect(
+            "player-appeared",
+            lambda *_: self.compact_stack.set_visible_child(self.player_small_slot),
+        )
+        self.player_small.mpris_manager.connect(
+            "player-vanished", self.on_player_vanished
+        )
+        return False
+
+    def _on_hyprland_changed(self, _events):
+        self.update_window_icon()
+        if data.PANEL_THEME == "Notch":
+            self.on_active_window_changed()
+
     def on_button_enter(self, widget, event):
         self.is_hovered = True
         window = widget.get_window()
@@ -478,6 +572,8 @@ class Notch(Window):
             return False  # Ignore child-to-child movements
 
         self.is_hovered = False
+        self._resync_occlusion()
+        self._check_occlusion()
 
         return False
 
@@ -493,6 +589,8 @@ class Notch(Window):
         self.stack.set_visible_child(self.compact)
         if data.PANEL_THEME != "Notch":
             self.notch_revealer.set_reveal_child(False)
+        self._resync_occlusion()
+        self._check_occlusion()
 
     def open_notch(self, widget_name: str):
         self.notch_revealer.set_reveal_child(True)
@@ -546,11 +644,7 @@ class Notch(Window):
                 self.applet_stack.set_visible_child(self.nhistory)
                 return
 
-        dashboard_sections_map = {
-            "pins": self.dashboard.pins,
-            "kanban": self.dashboard.kanban,
-            "wallpapers": self.dashboard.wallpapers,
-        }
+        dashboard_sections_map = self.dashboard.section_boxes
         if widget_name in dashboard_sections_map:
             section_widget_instance = dashboard_sections_map[widget_name]
 
@@ -567,39 +661,29 @@ class Notch(Window):
 
         hide_bar_revealers = False
 
-        widget_configs = {
-            "tmux": {"instance": self.tmux, "action": self.tmux.open_manager},
-            "cliphist": {
-                "instance": self.cliphist,
-                "action": lambda: GLib.idle_add(self.cliphist.open),
-            },
-            "launcher": {
-                "instance": self.launcher,
-                "action": self.launcher.open_launcher,
-                "focus": lambda: (
-                    self.launcher.search_entry.set_text(""),
-                    self.launcher.search_entry.grab_focus(),
-                ),
-            },
-            "emoji": {
-                "instance": self.emoji,
-                "action": self.emoji.open_picker,
-                "focus": lambda: (
-                    self.emoji.search_entry.set_text(""),
-                    self.emoji.search_entry.grab_focus(),
-                ),
-            },
-            "overview": {"instance": self.overview, "hide_revealers": True},
-            "power": {"instance": self.power},
-            "tools": {"instance": self.tools},
-        }
-
-        if widget_name in widget_configs:
-            config = widget_configs[widget_name]
-            target_widget_on_stack = config["instance"]
-            action_on_open = config.get("action")
-            focus_action = config.get("focus")
-            hide_bar_revealers = config.get("hide_revealers", False)
+        if widget_name in NOTCH_PANELS:
+            panel = self.get_panel(widget_name)
+            target_widget_on_stack = panel
+
+            match widget_name:
+                case "tmux":
+                    action_on_open = panel.open_manager
+                case "cliphist":
+                    action_on_open = lambda: GLib.idle_add(panel.open)
+                case "launcher":
+                    action_on_open = panel.open_launcher
+                    focus_action = lambda: (
+                        panel.search_entry.set_text(""),
+                        panel.search_entry.grab_focus(),
+                    )
+                case "emoji":
+                    action_on_open = panel.open_picker
+                    focus_action = lambda: (
+                        panel.search_entry.set_text(""),
+                        panel.search_entry.grab_focus(),
+                    )
+                case "overview":
+                    hide_bar_revealers = True
 
             if current_stack_child == target_widget_on_stack:
                 self.close_notch()
@@ -693,34 +777,9 @@ class Notch(Window):
 
             self.update_window_icon()
 
-    def _build_app_identifiers_map(self):
-        """Build a mapping of app identifiers (class names, executables, names) to DesktopApp objects"""
-        identifiers = {}
-        for app in self._all_apps:
-
-            if app.name:
-                identifiers[app.name.lower()] = app
-
-            if app.display_name:
-                identifiers[app.display_name.lower()] = app
-
-            if app.window_class:
-                identifiers[app.window_class.lower()] = app
-
-            if app.executable:
-                exe_basename = app.executable.split("/")[-1].lower()
-                identifiers[exe_basename] = app
-
-            if app.command_line:
-                cmd_base = app.command_line.split()[0].split("/")[-1].lower()
-                identifiers[cmd_base] = app
-
-        return identifiers
-
     def find_app(self, app_id: str):
-        """Find a DesktopApp object by various identifiers using the pre-built map."""
-        normalized_id = app_id.lower()
-        return self.app_identifiers.get(normalized_id)
+        """Find a DesktopApp object by various identifiers using the shared catalog."""
+        return self.catalog.find(app_id)
 
     def update_window_icon(self, *args):
         """Update the window icon based on the current active window title"""
@@ -737,15 +796,9 @@ class Notch(Window):
 
         self.window_icon.set_visible(True)
 
-        from fabric.hyprland.widgets import get_hyprland_connection
-
-        conn = get_hyprland_connection()
-        if conn:
+        if self.hypr_state.is_ready:
             try:
-                import json
-
-                active_window_json = conn.send_command("j/activewindow").reply.decode()
-                active_window_data = json.loads(active_window_json)
+                active_window_data = self.hypr_state.get_active_window()
                 app_id = active_window_data.get(
                     "initialClass", ""
                 ) or active_window_data.get("class", "")
@@ -755,7 +808,7 @@ class Notch(Window):
 
                 icon_pixbuf = None
                 if desktop_app:
-                    icon_pixbuf = desktop_app.get_icon_pixbuf(size=icon_size)
+                    icon_pixbuf = self.icon_resolver.get_app_pixbuf(desktop_app, icon_size)
 
                 if not icon_pixbuf:
 
@@ -797,35 +850,37 @@ class Notch(Window):
                     "application-x-executable-symbolic", 20
                 )
 
+    def _on_occlusion_changed(self, occluded):
+        """Called by the occlusion engine when the top 40px change state."""
+        self._occluded = occluded
+        self._check_occlusion()
+
+    def _resync_occlusion(self):
+        # A window may have been resized or dragged under the notch meanwhile.
+        if self._occlusion_enabled:
+            OcclusionEngine.get_initial().resync()
+
     def _check_occlusion(self):
         """
-        Check if top 40px of the screen is occluded by any window
-        and update the notch_revealer accordingly.
+        Update the notch_revealer according to the last known occlusion
+        state of the top 40px of the screen.
         """
 
-        occlusion_edge = "top"
-        occlusion_size = 40
+        if not self._occlusion_enabled:
+            return False
 
         if not (self.is_hovered or self._is_notch_open or self._prevent_occlusion):
-            is_occluded = check_occlusion((occlusion_edge, occlusion_size))
-            self.notch_revealer.set_reveal_child(not is_occluded)
+            self.notch_revealer.set_reveal_child(not self._occluded)
 
-        return True
+        return False
 
     def _get_current_window_class(self):
         """Get the class of the currently active window"""
         try:
-            from fabric.hyprland.widgets import get_hyprland_connection
-
-            conn = get_hyprland_connection()
-            if conn:
-                import json
-
-                active_window_json = conn.send_command("j/activewindow").reply.decode()
-                active_window_data = json.loads(active_window_json)
-                return active_window_data.get(
-                    "initialClass", ""
-                ) or active_window_data.get("class", "")
+            active_window_data = self.hypr_state.get_active_window()
+            return active_window_data.get(
+                "initialClass", ""
+            ) or active_window_data.get("class", "")
         except Exception as e:
             print(f"Error getting window class: {e}")
         return ""
@@ -861,6 +916,7 @@ class Notch(Window):
 
         self._prevent_occlusion = False
         self._occlusion_timer_id = None
+        self._check_occlusion()
 
         return False
 
@@ -895,16 +951,7 @@ class Notch(Window):
             "tmux",
         ]:
             self.stack.remove_style_class(style)
-        for w in [
-            self.launcher,
-            self.dashboard,
-            self.overview,
-            self.emoji,
-            self.power,
-            self.tools,
-            self.tmux,
-            self.cliphist,
-        ]:
+        for w in [self.dashboard, *self._panels.values()]:
             w.remove_style_class("open")
 
         self.stack.add_style_class("launcher")
@@ -995,7 +1042,7 @@ class Notch(Window):
             and self.dashboard.stack.get_visible_child() == self.dashboard.widgets
         ):
 
-            if self.stack.get_visible_child() == self.launcher:
+            if self.stack.get_visible_child() == self._panels.get("launcher"):
                 return False
 
             keyval = event.keyval
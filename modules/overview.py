@@ -1,10 +1,9 @@
 # Thanks to https://github.com/muhchaudhary for the original code. You are a legend.
-import json
+import time
 
 import cairo
 import gi
-from fabric.hyprland.service import Hyprland
-from fabric.utils.helpers import get_desktop_applications
+from fabric.hyprland.widgets import get_hyprland_connection
 from fabric.widgets.box import Box
 from fabric.widgets.button import Button
 from fabric.widgets.eventbox import EventBox
@@ -15,6 +14,8 @@ from loguru import logger
 
 import config.data as data
 import modules.icons as icons
+from services.desktop_catalog import DesktopCatalog
+from services.hyprland_state import HyprlandStateStore
 # WIP icon resolver (app_id to guessing the icon name)
 from utils.icon_resolver import IconResolver
 
@@ -25,10 +26,25 @@ screen = Gdk.Screen.get_default()
 CURRENT_WIDTH = screen.get_width()
 CURRENT_HEIGHT = screen.get_height()
 
-icon_resolver = IconResolver()
-connection = Hyprland()
+icon_resolver = IconResolver.get_initial()
+connection = get_hyprland_connection()
+hypr_state = HyprlandStateStore.get_initial()
 SCALE = 0.1
 
+# Store events after which window buttons may need to change.
+UPDATE_EVENTS = (
+    "ready",
+    "openwindow",
+    "closewindow",
+    "movewindowv2",
+    "windowtitlev2",
+    "changefloatingmode",
+    "fullscreen",
+    "monitoradded",
+    "monitorremoved",
+    "moveworkspacev2",
+)
+
 # Credit to Aylur for the drag and drop code
 TARGET = [Gtk.TargetEntry.new("text/plain", Gtk.TargetFlags.SAME_APP, 0)]
 
@@ -65,39 +81,13 @@ class HyprlandWindowButton(Button):
         self.title = title
         self.window: Box = window
 
-        # Compute dynamic icon sizes based on the button size.
-        # Using the minimum dimension of the button for scaling.
-        icon_size_main = int(min(self.size) * 0.5)  # adjust factor as needed
-
         # Enhanced icon resolution using desktop apps
-        desktop_app = window.find_app(app_id)
-        
-        # Get icon using improved method with fallbacks
-        icon_pixbuf = None
-        if desktop_app:
-            icon_pixbuf = desktop_app.get_icon_pixbuf(size=icon_size_main)
-        
-        if not icon_pixbuf:
-            # Fallback to IconResolver
-            icon_pixbuf = icon_resolver.get_icon_pixbuf(app_id, icon_size_main)
-        
-        if not icon_pixbuf:
-            # Additional fallbacks for common apps
-            icon_pixbuf = icon_resolver.get_icon_pixbuf("application-x-executable-symbolic", icon_size_main)
-            if not icon_pixbuf:
-                icon_pixbuf = icon_resolver.get_icon_pixbuf("image-missing", icon_size_main)
-                
-        # Ensure icon is scaled to the correct size
-        if icon_pixbuf and (icon_pixbuf.get_width() != icon_size_main or icon_pixbuf.get_height() != icon_size_main):
-            icon_pixbuf = icon_pixbuf.scale_simple(
-                icon_size_main, 
-                icon_size_main, 
-                gi.repository.GdkPixbuf.InterpType.BILINEAR
-            )
+        self.desktop_app = window.find_app(app_id)
+        self.icon_image = Image(pixbuf=self._load_icon(self._icon_size()))
 
         super().__init__(
             name="overview-client-box",
-            image=Image(pixbuf=icon_pixbuf),
+            image=self.icon_image,
             tooltip_text=title,
             size=size,
             on_clicked=self.on_button_click,
@@ -114,9 +104,6 @@ class HyprlandWindowButton(Button):
             ),
         )
 
-        # Store the desktop_app for later use
-        self.desktop_app = desktop_app
-
         self.drag_source_set(
             start_button_mask=Gdk.ModifierType.BUTTON1_MASK,
             targets=TARGET,
@@ -125,6 +112,50 @@ class HyprlandWindowButton(Button):
 
         self.connect("key_press_event", self.on_key_press_event)
 
+    def _icon_size(self) -> int:
+        # Scale the icon with the smallest dimension of the button.
+        return int(min(self.size) * 0.5)
+
+    def _load_icon(self, icon_size: int):
+        # Get icon using improved method with fallbacks
+        icon_pixbuf = None
+        if self.desktop_app:
+            icon_pixbuf = icon_resolver.get_app_pixbuf(self.desktop_app, icon_size)
+
+        if not icon_pixbuf:
+            # Fallback to IconResolver
+            icon_pixbuf = icon_resolver.get_icon_pixbuf(self.app_id, icon_size)
+
+        if not icon_pixbuf:
+            # Additional fallbacks for common apps
+            icon_pixbuf = icon_resolver.get_icon_pixbuf("application-x-executable-symbolic", icon_size)
+            if not icon_pixbuf:
+                icon_pixbuf = icon_resolver.get_icon_pixbuf("image-missing", icon_size)
+
+        # Ensure icon is scaled to the correct size
+        if icon_pixbuf and (icon_pixbuf.get_width() != icon_size or icon_pixbuf.get_height() != icon_size):
+            icon_pixbuf = icon_pixbuf.scale_simple(
+                icon_size,
+                icon_size,
+                gi.repository.GdkPixbuf.InterpType.BILINEAR
+            )
+        return icon_pixbuf
+
+    def update_window(self, title: str, size, transform: int = 0):
+        """Apply a new title or geometry to the existing button."""
+        if title != self.title:
+            self.title = title
+            self.set_tooltip_text(title)
+        transform %= 4
+        rotated = size if transform in [0, 2] else (size[1], size[0])
+        if rotated != self.size or transform != self.transform:
+            old_icon_size = self._icon_size()
+            self.size = rotated
+            self.transform = transform
+            self.set_size_request(int(size[0]), int(size[1]))
+            if self._icon_size() != old_icon_size:
+                self.icon_image.set_from_pixbuf(self._load_icon(self._icon_size()))
+
     def on_key_press_event(self, widget, event):
         if event.get_state() & Gdk.ModifierType.SHIFT_MASK:
             if event.keyval in (Gdk.KEY_Return, Gdk.KEY_KP_Enter, Gdk.KEY_space):
@@ -136,27 +167,8 @@ class HyprlandWindowButton(Button):
         # Compute overlay icon size dynamically.
         icon_size_overlay = int(min(self.size) * 0.5)  # adjust factor as needed
         
-        # Enhanced icon resolution for overlay
-        icon_pixbuf = None
-        if hasattr(self, 'desktop_app') and self.desktop_app:
-            icon_pixbuf = self.desktop_app.get_icon_pixbuf(size=icon_size_overlay)
-            
-        if not icon_pixbuf:
-            icon_pixbuf = icon_resolver.get_icon_pixbuf(self.app_id, icon_size_overlay)
-            
-        if not icon_pixbuf:
-            icon_pixbuf = icon_resolver.get_icon_pixbuf("application-x-executable-symbolic", icon_size_overlay)
-            if not icon_pixbuf:
-                icon_pixbuf = icon_resolver.get_icon_pixbuf("image-missing", icon_size_overlay)
-        
-        # Ensure icon is scaled to the correct size
-        if icon_pixbuf and (icon_pixbuf.get_width() != icon_size_overlay or icon_pixbuf.get_height() != icon_size_overlay):
-            icon_pixbuf = icon_pixbuf.scale_simple(
-                icon_size_overlay, 
-                icon_size_overlay, 
-                gi.repository.GdkPixbuf.InterpType.BILINEAR
-            )
-                
+        icon_pixbuf = self._load_icon(icon_size_overlay)
+
         self.set_image(
             Overlay(
                 child=image,
@@ -175,21 +187,25 @@ class HyprlandWindowButton(Button):
 
 
 class WorkspaceEventBox(EventBox):
-    def __init__(self, workspace_id: int, fixed: Gtk.Fixed | None = None):
-        self.fixed = fixed
+    """
+    Workspace preview. The `Gtk.Fixed` holding the window buttons lives as long
+    as the overview; an empty workspace shows the "add" label instead of it.
+    """
+
+    def __init__(self, workspace_id: int):
+        self.fixed = Gtk.Fixed.new()
+        self.add_label = Label(
+            name="overview-add-label",
+            h_expand=True,
+            v_expand=True,
+            markup=icons.circle_plus,
+        )
         super().__init__(
             name="overview-workspace-bg",
             h_expand=True,
             v_expand=True,
             size=(int(CURRENT_WIDTH * SCALE), int(CURRENT_HEIGHT * SCALE)),
-            child=fixed
-            if fixed
-            else Label(
-                name="overview-add-label",
-                h_expand=True,
-                v_expand=True,
-                markup=icons.circle_plus,
-            ),
+            child=self.add_label,
             on_drag_data_received=lambda _w, _c, _x, _y, data, *_: connection.send_command(
                 f"/dispatch movetoworkspacesilent {workspace_id},address:{data.get_data().decode()}"
             ),
@@ -199,27 +215,34 @@ class WorkspaceEventBox(EventBox):
             TARGET,
             Gdk.DragAction.COPY,
         )
-        if fixed:
-            fixed.show_all()
 
+    def set_occupied(self, occupied: bool):
+        child = self.fixed if occupied else self.add_label
+        if self.get_child() is not child:
+            self.remove(self.get_child())
+            self.add(child)
+            child.show_all()
 
 
 class Overview(Box):
     def __init__(self, **kwargs):
         # Initialize as a Box instead of a PopupWindow.
         super().__init__(name="overview", orientation="v", spacing=8, **kwargs)
-        self.workspace_boxes: dict[int, Box] = {}
+        self.workspace_boxes: dict[int, WorkspaceEventBox] = {}
         self.clients: dict[str, HyprlandWindowButton] = {}
+        # address -> (workspace id, x, y, placement) last applied to its button
+        self._placements: dict[str, tuple] = {}
         
-        # Initialize app registry for better icon resolution
-        self._all_apps = get_desktop_applications()
-        self.app_identifiers = self._build_app_identifiers_map()
+        # Shared app registry for better icon resolution
+        self.catalog = DesktopCatalog.get_initial()
+        self._all_apps = self.catalog.get_apps()
+        self.app_identifiers = self.catalog.identifiers
         
         # Remove the window_class_aliases dictionary completely
 
-        connection.connect("event::openwindow", self.do_update)
-        connection.connect("event::closewindow", self.do_update)
-        connection.connect("event::movewindow", self.do_update)
+        self._build_workspaces()
+        hypr_state.subscribe("overview", UPDATE_EVENTS, self.do_update)
+        self.catalog.connect("changed", self._on_catalog_changed)
         self.update()
         
     def _normalize_window_class(self, class_name):
@@ -254,34 +277,6 @@ class Overview(Box):
         # This avoids incorrectly matching flatpak apps and others
         return False
         
-    def _build_app_identifiers_map(self):
-        """Build a mapping of app identifiers (class names, executables, names) to DesktopApp objects"""
-        identifiers = {}
-        for app in self._all_apps:
-            # Map by name (lowercase)
-            if app.name:
-                identifiers[app.name.lower()] = app
-                
-            # Map by display name
-            if app.display_name:
-                identifiers[app.display_name.lower()] = app
-                
-            # Map by window class if available
-            if app.window_class:
-                identifiers[app.window_class.lower()] = app
-                
-            # Map by executable name if available
-            if app.executable:
-                exe_basename = app.executable.split('/')[-1].lower()
-                identifiers[exe_basename] = app
-                
-            # Map by command line if available (without parameters)
-            if app.command_line:
-                cmd_base = app.command_line.split()[0].split('/')[-1].lower()
-                identifiers[cmd_base] = app
-                
-        return identifiers
-        
     def find_app(self, app_identifier):
         """Return the DesktopApp object by matching any app identifier."""
         if not app_identifier:
@@ -318,16 +313,7 @@ class Overview(Box):
                 
         return None
 
-    def update(self, signal_update=False):
-        self._all_apps = get_desktop_applications()
-        self.app_identifiers = self._build_app_identifiers_map()
-        for client in self.clients.values():
-            client.destroy()
-        self.clients.clear()
-        for workspace in self.workspace_boxes.values():
-            workspace.destroy()
-        self.workspace_boxes.clear()
-
+    def _build_workspaces(self):
         if data.PANEL_THEME == "Panel" and data.BAR_POSITION in ["Left", "Right"]:
             rows = 5
             cols = 2
@@ -337,51 +323,121 @@ class Overview(Box):
 
         self.children = [Box(spacing=8) for _ in range(rows)]
 
-        monitors = {
-            monitor["id"]: (monitor["x"], monitor["y"], monitor["transform"])
-            for monitor in json.loads(connection.send_command("j/monitors").reply.decode())
-        }
-        for client in json.loads(connection.send_command("j/clients").reply.decode()):
-            if client["workspace"]["id"] > 0:
-                btn = HyprlandWindowButton(
-                    window=self,
-                    title=client["title"],
-                    address=client["address"],
-                    app_id=client["initialClass"],
-                    size=(client["size"][0] * SCALE, client["size"][1] * SCALE),
-                    transform=monitors[client["monitor"]][2],
-                )
-                self.clients[client["address"]] = btn
-                w_id = client["workspace"]["id"]
-                if w_id not in self.workspace_boxes:
-                    self.workspace_boxes[w_id] = Gtk.Fixed.new()
-                self.workspace_boxes[w_id].put(
-                    btn,
-                    abs(client["at"][0] - monitors[client["monitor"]][0]) * SCALE,
-                    abs(client["at"][1] - monitors[client["monitor"]][1]) * SCALE,
-                )
-
         for w_id in range(1, 11):
             idx = w_id - 1
             if rows == 2:
                 row = 0 if w_id <= cols else 1
             else:
                 row = idx // cols
-            overview_row = self.children[row]
-            overview_row.add(
+            self.workspace_boxes[w_id] = WorkspaceEventBox(w_id)
+            self.children[row].add(
                 Box(
                     name="overview-workspace-box",
                     orientation="vertical",
                     children=[
                         Label(name="overview-workspace-label", label=f"Workspace {w_id}"),
-                        WorkspaceEventBox(
-                            w_id,
-                            self.workspace_boxes.get(w_id)
-                        ),
+                        self.workspace_boxes[w_id],
                     ],
                 )
             )
 
-    def do_update(self, *_):
-        logger.info(f"[Overview] Updating for :{_[1].name}")
+    def _wanted_placements(self) -> dict[str, tuple]:
+        monitors = {
+            monitor["id"]: (monitor["x"], monitor["y"], monitor["transform"])
+            for monitor in hypr_state.get_monitors()
+        }
+        wanted = {}
+        for client in hypr_state.get_clients():
+            w_id = client["workspace"]["id"]
+            monitor = monitors.get(client.get("monitor"))
+            # Clients announced by `openwindow` have no geometry until the
+            # store re-reads them, and only workspaces 1-10 are shown.
+            if w_id not in self.workspace_boxes or monitor is None or "at" not in client:
+                continue
+            wanted[client["address"]] = (
+                w_id,
+                int(abs(client["at"][0] - monitor[0]) * SCALE),
+                int(abs(client["at"][1] - monitor[1]) * SCALE),
+                (
+                    client["title"],
+                    client["initialClass"],
+                    (client["size"][0] * SCALE, client["size"][1] * SCALE),
+                    monitor[2],
+                ),
+            )
+        return wanted
+
+    def _remove_client(self, address: str):
+        button = self.clients.pop(address)
+        w_id = self._placements.pop(address)[0]
+        self.workspace_boxes[w_id].fixed.remove(button)
+        button.destroy()
+
+    def _add_client(self, address: str, placement: tuple):
+        w_id, x, y, (title, app_id, size, transform) = placement
+        button = HyprlandWindowButton(
+            window=self,
+            title=title,
+            address=address,
+            app_id=app_id,
+            size=size,
+            transform=transform,
+        )
+        self.clients[address] = button
+        self._placements[address] = placement
+        self.workspace_boxes[w_id].fixed.put(button, x, y)
+        button.show_all()
+
+    def update(self, signal_update=False):
+        """Bring the window buttons in line with the store, touching only what changed."""
+        start = time.perf_counter()
+        wanted = self._wanted_placements()
+        touched = set()
+
+        for address in self.clients.keys() - wanted.keys():
+            touched.add(self._placements[address][0])
+            self._remove_client(address)
+
+        for address, placement in wanted.items():
+            old = self._placements.get(address)
+            if old == placement:
+                continue
+            w_id, x, y, (title, app_id, size, transform) = placement
+            touched.add(w_id)
+            if old is None or old[3][1] != app_id:
+                if old is not None:
+                    touched.add(old[0])
+                    self._remove_client(address)
+                self._add_client(address, placement)
+                continue
+
+            button = self.clients[address]
+            button.update_window(title, size, transform)
+            if old[0] != w_id:
+                touched.add(old[0])
+                self.workspace_boxes[old[0]].fixed.remove(button)
+                self.workspace_boxes[w_id].fixed.put(button, x, y)
+            elif old[1:3] != (x, y):
+                self.workspace_boxes[w_id].fixed.move(button, x, y)
+            self._placements[address] = placement
+
+        for w_id in touched:
+            box = self.workspace_boxes[w_id]
+            box.set_occupied(bool(box.fixed.get_children()))
+
+        if touched:
+            logger.debug(
+                f"[Overview] Updated {len(touched)} workspaces in "
+                f"{(time.perf_counter() - start) * 1000:.2f} ms"
+            )
+
+    def _on_catalog_changed(self, *_):
+        # Icons may resolve differently now; rebuild the buttons once.
+        self._all_apps = self.catalog.get_apps()
+        self.app_identifiers = self.catalog.identifiers
+        for address in list(self.clients):
+            self._remove_client(address)
+        self.update()
+
+    def do_update(self, _events):
         self.update(signal_update=True)
@@ -3,14 +3,18 @@ from enum import Enum
 from typing import Literal, cast, overload
 
 import gi
-import OpenGL.GL as GL
 from fabric import Property, Signal
 from fabric.widgets.widget import Widget
-from OpenGL.GL.shaders import compileProgram, compileShader
+
+from utils.deferred import deferred_import
 
 gi.require_version("Gtk", "3.0")
 from gi.repository import Gdk, GdkPixbuf, GLib, Gtk
 
+# PyOpenGL is only loaded once a shader widget is realized.
+GL = deferred_import("OpenGL.GL")
+shaders = deferred_import("OpenGL.GL.shaders")
+
 
 class ShadertoyUniformType(Enum):
     FLOAT = 1
@@ -141,10 +145,10 @@ class Shadertoy(Gtk.GLArea, Widget):
 
     def do_bake_program(self):
         try:
-            vertex_shader = compileShader(
+            vertex_shader = shaders.compileShader(
                 self.DEFAULT_VERTEX_SHADER, GL.GL_VERTEX_SHADER
             )
-            fragment_shader = compileShader(
+            fragment_shader = shaders.compileShader(
                 self.DEFAULT_FRAGMENT_UNIFORMS
                 + self._shader_buffer
                 + self.FRAGMENT_MAIN_FUNCTION,
@@ -155,7 +159,7 @@ class Shadertoy(Gtk.GLArea, Widget):
                 f"couldn't compile the provided shader, OpenGL error:\n {e}"
             )
 
-        return compileProgram(vertex_shader, fragment_shader)
+        return shaders.compileProgram(vertex_shader, fragment_shader)
 
     def do_realize(self, *_):
         Gtk.GLArea.do_realize(self)
@@ -1,9 +1,8 @@
+import bisect
 import colorsys
-import concurrent.futures
-import hashlib
 import os
 import shutil
-from concurrent.futures import ThreadPoolExecutor
+from collections import OrderedDict
 
 from fabric.utils.helpers import exec_shell_command_async
 from fabric.widgets.box import Box
@@ -13,11 +12,136 @@ from fabric.widgets.entry import Entry
 from fabric.widgets.label import Label
 from fabric.widgets.scrolledwindow import ScrolledWindow
 from gi.repository import Gdk, GdkPixbuf, Gio, GLib, Gtk, Pango
-from PIL import Image
+from loguru import logger
 
-import config.config
 import config.data as data
 import modules.icons as icons
+from utils.theme_cache import ThemeCache
+from utils.thumbnails import ThumbnailStore
+from utils.wallpaper_index import WallpaperIndex, sort_key
+
+THUMBNAIL_SIZE = 96
+# Decoded thumbnails kept around; everything else shows the placeholder.
+PIXBUF_CACHE_SIZE = 256
+# Items past either end of the visible range that are loaded ahead.
+PRELOAD_MARGIN = 24
+
+# Background color analysis: how many wallpapers are handed to the
+# thumbnail workers at a time, so on-screen requests never queue behind it.
+ANALYSIS_IN_FLIGHT = 4
+# Share of a wallpaper's (saturation-weighted) hue histogram that has to lie
+# within one bin of the slider's hue for "search by hue" to show it.
+HUE_MATCH_THRESHOLD = 0.25
+# Difference hashes at most this many bits apart count as near-duplicates.
+# Must stay below 8: candidates are found by sharing one of the 8 hash bytes.
+DUPLICATE_MAX_DISTANCE = 6
+
+
+def find_near_duplicates(hashes: dict[str, int]) -> list[list[str]]:
+    """Group names whose 64-bit difference hashes are nearly identical."""
+    # Two hashes within 7 bits of each other agree on at least one of their
+    # 8 bytes, so only names sharing a byte bucket need to be compared.
+    buckets: dict[tuple[int, int], list[str]] = {}
+    for name, value in hashes.items():
+        for key in _hash_buckets(value):
+            buckets.setdefault(key, []).append(name)
+
+    parent = {name: name for name in hashes}
+
+    def root(name):
+        while parent[name] != name:
+            parent[name] = parent[parent[name]]
+            name = parent[name]
+        return name
+
+    for names in buckets.values():
+        for i, a in enumerate(names):
+            for b in names[i + 1 :]:
+                if (hashes[a] ^ hashes[b]).bit_count() <= DUPLICATE_MAX_DISTANCE:
+                    parent[root(a)] = root(b)
+
+    groups: dict[str, list[str]] = {}
+    for name in hashes:
+        groups.setdefault(root(name), []).append(name)
+    return [sorted(group) for group in groups.values() if len(group) > 1]
+
+
+def _hash_buckets(value: int) -> list[tuple[int, int]]:
+    return [(byte, value >> (byte * 8) & 0xFF) for byte in range(8)]
+
+
+class NearDuplicates:
+    """
+    Near-duplicate groups of the wallpaper library, grouped once and then
+    kept up to date one wallpaper at a time: an added hash is compared only
+    with the hashes sharing one of its byte buckets.
+    """
+
+    def __init__(self):
+        self._hashes: dict[str, int] = {}
+        self._buckets: dict[tuple[int, int], set[str]] = {}
+        self._group_of: dict[str, list[str]] = {}
+
+    @property
+    def groups(self) -> list[list[str]]:
+        return list({id(group): group for group in self._group_of.values()}.values())
+
+    def _set_groups(self, groups: list[list[str]]):
+        for group in groups:
+            for name in group:
+                self._group_of[name] = group
+
+    def group_all(self, hashes: dict[str, int]) -> list[list[str]]:
+        """Replace everything with the groups of `hashes`."""
+        self._hashes = dict(hashes)
+        self._buckets = {}
+        for name, value in hashes.items():
+            for key in _hash_buckets(value):
+                self._buckets.setdefault(key, set()).add(name)
+        self._group_of = {}
+        self._set_groups(find_near_duplicates(hashes))
+        return self.groups
+
+    def add(self, name: str, value: int) -> list[str] | None:
+        """Add (or re-hash) one wallpaper; its group if it joined one."""
+        if self._hashes.get(name) == value:
+            return None
+        self.remove(name)
+        candidates = set()
+        for key in _hash_buckets(value):
+            bucket = self._buckets.setdefault(key, set())
+            candidates |= bucket
+            bucket.add(name)
+        self._hashes[name] = value
+        matches = [
+            other
+            for other in candidates
+            if (self._hashes[other] ^ value).bit_count() <= DUPLICATE_MAX_DISTANCE
+        ]
+        if not matches:
+            return None
+        members = {name}
+        for other in matches:
+            members.update(self._group_of.get(other, (other,)))
+        group = sorted(members)
+        self._set_groups([group])
+        return group
+
+    def remove(self, name: str):
+        value = self._hashes.pop(name, None)
+        if value is None:
+            return
+        for key in _hash_buckets(value):
+            self._buckets[key].discard(name)
+        group = self._group_of.pop(name, None)
+        if group is None:
+            return
+        # The removed wallpaper may have been the only link between parts
+        # of its group, so regroup what is left of it.
+        rest = [other for other in group if other != name]
+        for other in rest:
+            del self._group_of[other]
+        self._set_groups(find_near_duplicates({other: self._hashes[other] for other in rest}))
 
 
 class WallpaperSelector(Box):
@@ -32,28 +156,33 @@ class WallpaperSelector(Box):
         super().__init__(name="wallpapers", spacing=4, orientation="v", h_expand=False, v_expand=False, **kwargs)
         os.makedirs(self.CACHE_DIR, exist_ok=True)
 
-        # Process old wallpapers: use os.scandir for efficiency and only loop
-        # over image files that actually need renaming (they're not already lowercase
-        # and with hyphens instead of spaces)
-        with os.scandir(data.WALLPAPERS_DIR) as entries:
-            for entry in entries:
-                if entry.is_file() and self._is_image(entry.name):
-                    # Check if the file needs renaming: file should be lowercase and have hyphens instead of spaces
-                    if entry.name != entry.name.lower() or " " in entry.name:
-                        new_name = entry.name.lower().replace(" ", "-")
-                        full_path = os.path.join(data.WALLPAPERS_DIR, entry.name)
-                        new_full_path = os.path.join(data.WALLPAPERS_DIR, new_name)
-                        try:
-                            os.rename(full_path, new_full_path)
-                            print(f"Renamed old wallpaper '{full_path}' to '{new_full_path}'")
-                        except Exception as e:
-                            print(f"Error renaming file {full_path}: {e}")
-
-        # Refresh the file list after potential renaming
-        self.files = sorted([f for f in os.listdir(data.WALLPAPERS_DIR) if self._is_image(f)])
-        self.thumbnails = []
+        # Scanning also renames files to lowercase with hyphens instead of
+        # spaces; files that did not change keep their cached metadata.
+        self.wallpaper_index = WallpaperIndex(
+            data.WALLPAPERS_DIR, f"{data.CACHE_DIR}/wallpaper_index.json"
+        )
+        self.wallpaper_index.scan()
         self.thumbnail_queue = []
-        self.executor = ThreadPoolExecutor(max_workers=4)  # Shared executor
+        self._batch_id = None
+        self._visible_id = None
+        self.thumbnail_store = ThumbnailStore(self.CACHE_DIR)
+        # Only thumbnails in or near the visible range are decoded; the
+        # pixbufs live in an LRU and evicted rows fall back to a placeholder.
+        self._pixbufs: OrderedDict[str, GdkPixbuf.Pixbuf] = OrderedDict()
+        self._requested: set[str] = set()
+        self._iters: dict[str, Gtk.TreeIter] = {}
+        # Names currently in the model, in model order.
+        self._shown: list[str] = []
+        self.hue_search = False
+        self._filter_id = None
+        self._analysis_queue: list[str] | None = None
+        self._analysis_in_flight = 0
+        # Grouped once the first full analysis pass is done.
+        self.near_duplicates: NearDuplicates | None = None
+        self._placeholder = GdkPixbuf.Pixbuf.new(
+            GdkPixbuf.Colorspace.RGB, True, 8, THUMBNAIL_SIZE, THUMBNAIL_SIZE
+        )
+        self._placeholder.fill(0x00000000)
 
         # Variable to control the selection (similar to AppLauncher)
         self.selected_index = -1
@@ -66,6 +195,8 @@ class WallpaperSelector(Box):
         self.viewport.set_text_column(-1)
         self.viewport.set_item_width(0)
         self.viewport.connect("item-activated", self.on_wallpaper_selected)
+        self.viewport.connect("size-allocate", self._schedule_load_visible)
+        self.viewport.connect("selection-changed", self._update_palette_preview)
         # self.viewport.connect("selection-changed", self._on_selection_changed) # Removed connection
 
         self.scrolled_window = ScrolledWindow(
@@ -79,6 +210,9 @@ class WallpaperSelector(Box):
             propagate_width=False,
             propagate_height=False,
         )
+        self.scrolled_window.get_vadjustment().connect(
+            "value-changed", self._schedule_load_visible
+        )
 
         self.search_entry = Entry(
             name="search-entry-walls",
@@ -137,6 +271,12 @@ class WallpaperSelector(Box):
         self.matugen_switcher.connect("notify::active", self.on_switch_toggled)
 
         self.mat_icon = Label(name="mat-label", markup=icons.palette)
+        self.hue_search_button = Button(
+            name="hue-search-button",
+            child=self.mat_icon,
+            tooltip_text="Search by hue",
+            on_clicked=self.on_hue_search_toggled,
+        )
 
         # Add the switcher to the header_box's start_children
         self.header_box = Box(
@@ -144,7 +284,7 @@ class WallpaperSelector(Box):
             spacing=4,
             orientation="h",
             # Removed color button and label from here
-            children=[self.matugen_switcher, self.mat_icon, self.search_entry, self.scheme_dropdown],
+            children=[self.matugen_switcher, self.hue_search_button, self.search_entry, self.scheme_dropdown],
         )
 
         self.add(self.header_box)
@@ -164,6 +304,7 @@ class WallpaperSelector(Box):
         self.hue_slider.set_halign(Gtk.Align.FILL)
         self.hue_slider.set_vexpand(False) # Ensure it doesn't expand vertically
         self.hue_slider.set_valign(Gtk.Align.CENTER) # Center vertically within its box
+        self.hue_slider.connect("value-changed", self.on_hue_changed)
 
         self.apply_color_button = Button(name="apply-color-button", child=Label(name="apply-color-label", markup=icons.accept))
         self.apply_color_button.connect("clicked", self.on_apply_color_clicked)
@@ -181,11 +322,14 @@ class WallpaperSelector(Box):
         # Add the scrolled window (grid) and the custom color selector box directly
         # to the main WallpaperSelector box (which is already vertical)
         self.pack_start(self.scrolled_window, True, True, 0) # Add grid, expand
+        # Dominant colors of the selected wallpaper, from the thumbnail index
+        self.palette_preview = Box(name="wallpaper-palette", spacing=4, h_align="center")
+        self.pack_start(self.palette_preview, False, False, 0)
         self.pack_start(self.custom_color_selector_box, False, False, 0) # Add custom selector, don't expand
 
         # Removed the old main_content_box and its add
 
-        self._start_thumbnail_thread()
+        self._preload_thumbnails()
         self.connect("map", self.on_map) # Connect the map signal
         # Set initial sensitivity based on loaded state
         # self.scheme_dropdown.set_sensitive(self.matugen_enabled) # Ensure sensitivity is set correctly on load
@@ -202,54 +346,74 @@ class WallpaperSelector(Box):
     def on_directory_changed(self, monitor, file, other_file, event_type):
         file_name = file.get_basename()
         if event_type == Gio.FileMonitorEvent.DELETED:
-            if file_name in self.files:
-                self.files.remove(file_name)
-                cache_path = self._get_cache_path(file_name)
-                if os.path.exists(cache_path):
-                    try:
-                        os.remove(cache_path)
-                    except Exception as e:
-                        print(f"Error deleting cache {cache_path}: {e}")
-                self.thumbnails = [(p, n) for p, n in self.thumbnails if n != file_name]
-                GLib.idle_add(self.arrange_viewport, self.search_entry.get_text())
+            if self.wallpaper_index.remove(file_name):
+                self.thumbnail_store.forget(self.wallpaper_index.path(file_name))
+                if self.near_duplicates is not None:
+                    self.near_duplicates.remove(file_name)
+                self._pixbufs.pop(file_name, None)
+                self._remove_row(file_name)
         elif event_type == Gio.FileMonitorEvent.CREATED:
-            if self._is_image(file_name):
-                # Convert filename to lowercase and replace spaces with "-"
-                new_name = file_name.lower().replace(" ", "-")
-                full_path = os.path.join(data.WALLPAPERS_DIR, file_name)
-                new_full_path = os.path.join(data.WALLPAPERS_DIR, new_name)
-                if new_name != file_name:
-                    try:
-                        os.rename(full_path, new_full_path)
-                        file_name = new_name
-                        print(f"Renamed file '{full_path}' to '{new_full_path}')")
-                    except Exception as e:
-                        print(f"Error renaming file {full_path}: {e}")
-                if file_name not in self.files:
-                    self.files.append(file_name)
-                    self.files.sort()
-                    self.executor.submit(self._process_file, file_name)
-        elif event_type == Gio.FileMonitorEvent.CHANGED:
-            if self._is_image(file_name) and file_name in self.files:
-                cache_path = self._get_cache_path(file_name)
-                if os.path.exists(cache_path):
-                    try:
-                        os.remove(cache_path)
-                    except Exception as e:
-                        print(f"Error deleting cache for changed file {file_name}: {e}")
-                self.executor.submit(self._process_file, file_name)
+            file_name = self.wallpaper_index.add(file_name)
+            if file_name and self._analysis_queue is not None:
+                self._analysis_queue.append(file_name)
+                self._analyze_next()
+            if file_name and self._matches_query(file_name):
+                self._insert_row(file_name)
+        elif event_type == Gio.FileMonitorEvent.CHANGES_DONE_HINT:
+            # The new mtime gives the edited file a new thumbnail key, so
+            # there is nothing to invalidate; just render the new version.
+            if self.wallpaper_index.touch(file_name):
+                self._pixbufs.pop(file_name, None)
+                if file_name in self._iters:
+                    self._request_thumbnail(file_name)
+
+    def _matches_query(self, file_name: str) -> bool:
+        entry = self.wallpaper_index.get(file_name)
+        if entry is None or self.search_entry.get_text().casefold() not in entry["key"]:
+            return False
+        return not self.hue_search or self._matches_hue(file_name, self.hue_slider.get_value())
+
+    def _insert_row(self, file_name: str, position: int | None = None):
+        if file_name in self._iters:
+            return
+        if position is None:
+            position = bisect.bisect_left(self._shown, sort_key(file_name), key=sort_key)
+        pixbuf = self._pixbufs.get(file_name, self._placeholder)
+        self._iters[file_name] = self.viewport.get_model().insert(position, [pixbuf, file_name])
+        self._shown.insert(position, file_name)
+        self._schedule_load_visible()
+
+    def _remove_row(self, file_name: str):
+        it = self._iters.pop(file_name, None)
+        if it is None:
+            return
+        self.viewport.get_model().remove(it)
+        del self._shown[bisect.bisect_left(self._shown, sort_key(file_name), key=sort_key)]
+        if self.selected_index >= len(self._shown):
+            self.selected_index = -1
+        self._schedule_load_visible()
 
     def arrange_viewport(self, query: str = ""):
         model = self.viewport.get_model()
-        model.clear()
-        filtered_thumbnails = [
-            (thumb, name)
-            for thumb, name in self.thumbnails
-            if query.casefold() in name.casefold()
-        ]
-        filtered_thumbnails.sort(key=lambda x: x[1].lower())
-        for pixbuf, file_name in filtered_thumbnails:
-            model.append([pixbuf, file_name])
+        # Filtering only looks at the index's casefolded names; rows get
+        # their thumbnail once they scroll into view. The model is patched
+        # rather than rebuilt: rows that stay are left untouched.
+        wanted = self.wallpaper_index.search(query)
+        if self.hue_search:
+            hue = self.hue_slider.get_value()
+            wanted = [name for name in wanted if self._matches_hue(name, hue)]
+        wanted_set = set(wanted)
+        for file_name in self._shown:
+            if file_name not in wanted_set:
+                model.remove(self._iters.pop(file_name))
+        # What is left is in index order too, so missing rows slot in by position.
+        self._shown = [name for name in self._shown if name in wanted_set]
+        for position, file_name in enumerate(wanted):
+            if file_name not in self._iters:
+                pixbuf = self._pixbufs.get(file_name, self._placeholder)
+                self._iters[file_name] = model.insert(position, [pixbuf, file_name])
+        self._shown = wanted
+        self._schedule_load_visible()
         # If the search entry is empty, no icon is selected; otherwise, select the first one.
         if query.strip() == "":
             self.viewport.unselect_all()
@@ -267,8 +431,8 @@ class WallpaperSelector(Box):
             os.remove(current_wall)
         os.symlink(full_path, current_wall)
         if self.matugen_switcher.get_active():
-            # Matugen is enabled: run the normal command.
-            exec_shell_command_async(f'matugen image {full_path} -t {selected_scheme}')
+            # Matugen is enabled: reuse a cached theme or run matugen.
+            ThemeCache.get_initial().apply_image(full_path, selected_scheme)
         else:
             # Matugen is disabled: run the alternative swww command.
             exec_shell_command_async(
@@ -392,56 +556,215 @@ class WallpaperSelector(Box):
         self.viewport.scroll_to_path(path, False, 0.5, 0.5)  # Ensure the selected icon is visible
         self.selected_index = new_index
 
-    def _start_thumbnail_thread(self):
-        thread = GLib.Thread.new("thumbnail-loader", self._preload_thumbnails, None)
+    def _preload_thumbnails(self):
+        self.arrange_viewport()
+        live_paths = [entry["path"] for entry in self.wallpaper_index.entries.values()]
+        GLib.idle_add(
+            lambda: self.thumbnail_store.collect_garbage(live_paths) and False,
+            priority=GLib.PRIORITY_LOW,
+        )
 
-    def _preload_thumbnails(self, _data):
-        futures = [self.executor.submit(self._process_file, file_name) for file_name in self.files]
-        concurrent.futures.wait(futures)
-        GLib.idle_add(self._process_batch)
+    def _schedule_load_visible(self, *_):
+        if self._visible_id is None:
+            self._visible_id = GLib.idle_add(self._load_visible)
+
+    def _visible_range(self) -> range:
+        total = len(self.viewport.get_model())
+        visible = self.viewport.get_visible_range() if self.viewport.get_realized() else None
+        if not visible or visible[0] is False:
+            # Not laid out yet: assume the first screenful.
+            return range(min(total, PRELOAD_MARGIN * 2))
+        start, end = visible[-2:]
+        first = max(0, start.get_indices()[0] - PRELOAD_MARGIN)
+        last = min(total, end.get_indices()[0] + PRELOAD_MARGIN + 1)
+        return range(first, last)
+
+    def _load_visible(self):
+        self._visible_id = None
+        model = self.viewport.get_model()
+        for index in self._visible_range():
+            row = model[index]
+            file_name = row[1]
+            pixbuf = self._pixbufs.get(file_name)
+            if pixbuf is None:
+                self._request_thumbnail(file_name)
+                continue
+            self._pixbufs.move_to_end(file_name)
+            if row[0] is not pixbuf:
+                row[0] = pixbuf
+        return False
 
-    def _process_file(self, file_name):
-        full_path = os.path.join(data.WALLPAPERS_DIR, file_name)
-        cache_path = self._get_cache_path(file_name)
-        if not os.path.exists(cache_path):
-            try:
-                with Image.open(full_path) as img:
-                    width, height = img.size
-                    side = min(width, height)
-                    left = (img.width - side) // 2
-                    top = (height - side) // 2
-                    right = left + side
-                    bottom = top + side
-                    img_cropped = img.crop((left, top, right, bottom))
-                    img_cropped.thumbnail((96, 96), Image.Resampling.LANCZOS)
-                    img_cropped.save(cache_path, "PNG")
-            except Exception as e:
-                print(f"Error processing {file_name}: {e}")
-                return
+    def _request_thumbnail(self, file_name: str):
+        if file_name in self._requested:
+            return
+        self._requested.add(file_name)
+        full_path = self.wallpaper_index.path(file_name)
+        self.thumbnail_store.request(full_path, THUMBNAIL_SIZE, self._on_thumbnail_ready)
+
+    def _on_thumbnail_ready(self, full_path: str, cache_path: str | None):
+        file_name = os.path.basename(full_path)
+        self._requested.discard(file_name)
+        if cache_path is None:
+            return False
+        self._record_thumbnail(file_name, cache_path)
         self.thumbnail_queue.append((cache_path, file_name))
-        GLib.idle_add(self._process_batch)
+        if self._batch_id is None:
+            self._batch_id = GLib.idle_add(self._process_batch)
+        return False
+
+    def _record_thumbnail(self, file_name: str, cache_path: str):
+        thumb_key = os.path.splitext(os.path.basename(cache_path))[0]
+        meta = self.thumbnail_store.index.get(thumb_key, {})
+        self.wallpaper_index.set_thumbnail(
+            file_name, thumb_key, meta.get("width"), meta.get("height")
+        )
+
+    # Color analysis
+
+    def _analysis(self, file_name: str) -> dict | None:
+        """Palette, hue histogram and dhash of a wallpaper, if computed yet."""
+        entry = self.wallpaper_index.get(file_name)
+        if entry is None or entry["thumb"] is None:
+            return None
+        meta = self.thumbnail_store.index.get(entry["thumb"])
+        if meta is None or meta.get("hues") is None:
+            return None
+        return meta
+
+    def _matches_hue(self, file_name: str, hue: float) -> bool:
+        analysis = self._analysis(file_name)
+        if analysis is None:
+            return False
+        hues = analysis["hues"]
+        center = int(hue * len(hues) / 360) % len(hues)
+        score = sum(hues[(center + offset) % len(hues)] for offset in (-1, 0, 1))
+        return score >= HUE_MATCH_THRESHOLD
+
+    def _start_analysis(self):
+        """Analyze every wallpaper in the background, a few at a time."""
+        if self._analysis_queue is not None:
+            return
+        self._analysis_queue = list(reversed(self.wallpaper_index.names))
+        self._analyze_next()
+
+    def _analyze_next(self):
+        while self._analysis_queue and self._analysis_in_flight < ANALYSIS_IN_FLIGHT:
+            file_name = self._analysis_queue.pop()
+            if file_name not in self.wallpaper_index:
+                continue
+            self._analysis_in_flight += 1
+            self.thumbnail_store.request(
+                self.wallpaper_index.path(file_name),
+                THUMBNAIL_SIZE,
+                self._on_analysis_ready,
+                background=True,
+            )
+        if (
+            not self._analysis_queue
+            and self._analysis_in_flight == 0
+            and self.near_duplicates is None
+        ):
+            self._on_analysis_done()
+
+    def _on_analysis_ready(self, full_path: str, cache_path: str | None):
+        self._analysis_in_flight -= 1
+        if cache_path is not None:
+            file_name = os.path.basename(full_path)
+            self._record_thumbnail(file_name, cache_path)
+            if self.near_duplicates is not None:
+                self._check_near_duplicate(file_name)
+            if self.hue_search:
+                self._schedule_filter()
+        self._analyze_next()
+        return False
+
+    def _on_analysis_done(self):
+        """Group the whole library once, after the first analysis pass."""
+        hashes = {}
+        for file_name in self.wallpaper_index.names:
+            analysis = self._analysis(file_name)
+            if analysis and analysis.get("dhash"):
+                hashes[file_name] = int(analysis["dhash"], 16)
+        self.near_duplicates = NearDuplicates()
+        for group in self.near_duplicates.group_all(hashes):
+            logger.info(f"[Wallpapers] Near-duplicate wallpapers: {', '.join(group)}")
+
+    def _check_near_duplicate(self, file_name: str):
+        """Compare a wallpaper analyzed after the first pass with the library."""
+        analysis = self._analysis(file_name)
+        if not analysis or not analysis.get("dhash"):
+            return
+        group = self.near_duplicates.add(file_name, int(analysis["dhash"], 16))
+        if group:
+            logger.info(f"[Wallpapers] Near-duplicate wallpapers: {', '.join(group)}")
+
+    def _schedule_filter(self):
+        if self._filter_id is None:
+            self._filter_id = GLib.timeout_add(100, self._on_filter_timeout)
+
+    def _on_filter_timeout(self):
+        self._filter_id = None
+        self.arrange_viewport(self.search_entry.get_text())
+        return False
+
+    def on_hue_search_toggled(self, *_):
+        self.hue_search = not self.hue_search
+        if self.hue_search:
+            self.hue_search_button.add_style_class("active")
+            self._start_analysis()
+        else:
+            self.hue_search_button.remove_style_class("active")
+        self.custom_color_selector_box.set_visible(self.hue_search or not self.matugen_enabled)
+        self.arrange_viewport(self.search_entry.get_text())
+
+    def on_hue_changed(self, *_):
+        if self.hue_search:
+            self._schedule_filter()
+
+    def _update_palette_preview(self, *_):
+        for child in self.palette_preview.get_children():
+            child.destroy()
+        selected = self.viewport.get_selected_items()
+        analysis = None
+        if selected:
+            file_name = self.viewport.get_model()[selected[0]][1]
+            analysis = self._analysis(file_name)
+        for color in (analysis or {}).get("palette") or []:
+            swatch = Box(name="palette-swatch", style=f"background-color: {color};")
+            swatch.set_tooltip_text(color)
+            self.palette_preview.add(swatch)
+        self.palette_preview.show_all()
 
     def _process_batch(self):
         batch = self.thumbnail_queue[:10]
         del self.thumbnail_queue[:10]
+        model = self.viewport.get_model()
         for cache_path, file_name in batch:
+            it = self._iters.get(file_name)
+            if it is None:
+                # Filtered out or deleted while it was being rendered.
+                continue
             try:
                 pixbuf = GdkPixbuf.Pixbuf.new_from_file(cache_path)
-                self.thumbnails.append((pixbuf, file_name))
-                self.viewport.get_model().append([pixbuf, file_name])
             except Exception as e:
                 print(f"Error loading thumbnail {cache_path}: {e}")
+                continue
+            self._cache_pixbuf(file_name, pixbuf)
+            model.set_value(it, 0, pixbuf)
         if self.thumbnail_queue:
-            GLib.idle_add(self._process_batch)
+            return True
+        self._batch_id = None
         return False
 
-    def _get_cache_path(self, file_name: str) -> str:
-        file_hash = hashlib.md5(file_name.encode("utf-8")).hexdigest()
-        return os.path.join(self.CACHE_DIR, f"{file_hash}.png")
-
-    @staticmethod
-    def _is_image(file_name: str) -> bool:
-        return file_name.lower().endswith(('.png', '.jpg', '.jpeg', '.bmp', '.gif', '.webp'))
+    def _cache_pixbuf(self, file_name: str, pixbuf: GdkPixbuf.Pixbuf):
+        self._pixbufs[file_name] = pixbuf
+        self._pixbufs.move_to_end(file_name)
+        model = self.viewport.get_model()
+        while len(self._pixbufs) > PIXBUF_CACHE_SIZE:
+            evicted, _ = self._pixbufs.popitem(last=False)
+            it = self._iters.get(evicted)
+            if it is not None:
+                model.set_value(it, 0, self._placeholder)
 
     def on_search_entry_focus_out(self, widget, event):
         if self.get_mapped():
@@ -451,7 +774,8 @@ class WallpaperSelector(Box):
     def on_map(self, widget):
         """Handles the map signal to set initial visibility of the color selector."""
         # Set visibility based on the loaded state when the widget becomes visible
-        self.custom_color_selector_box.set_visible(not self.matugen_enabled)
+        self.custom_color_selector_box.set_visible(self.hue_search or not self.matugen_enabled)
+        self._start_analysis()
 
     def hsl_to_rgb_hex(self, h: float, s: float = 1.0, l: float = 0.5) -> str:
         """Converts HSL color value to RGB HEX string."""
@@ -473,7 +797,7 @@ class WallpaperSelector(Box):
         is_active = switch.get_active()
         self.matugen_enabled = is_active
         # self.scheme_dropdown.set_sensitive(is_active)
-        self.custom_color_selector_box.set_visible(not is_active) # Toggle visibility
+        self.custom_color_selector_box.set_visible(self.hue_search or not is_active) # Toggle visibility
 
         # Save the state to the dedicated file
         try:
@@ -488,8 +812,8 @@ class WallpaperSelector(Box):
         hex_color = self.hsl_to_rgb_hex(hue_value) # Convert HSL(hue, 1.0, 0.5) to HEX
         print(f"Applying color from slider: H={hue_value}, HEX={hex_color}")
         selected_scheme = self.scheme_dropdown.get_active_id()
-        # Run matugen with the chosen hex color and selected scheme
-        exec_shell_command_async(f'matugen color hex "{hex_color}" -t {selected_scheme}')
+        # Theme from the chosen hex color and selected scheme (cached per pair)
+        ThemeCache.get_initial().apply_color(hex_color, selected_scheme)
         # Optionally save the chosen color to config if needed later
         # config.config.bind_vars["matugen_hex_color"] = hex_color
         # config.config.save_config() # Removed as save_config doesn't exist
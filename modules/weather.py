@@ -1,6 +1,5 @@
 import gi
 import urllib.parse
-import requests
 from gi.repository import GLib
 
 from fabric.widgets.label import Label
@@ -10,6 +9,9 @@ gi.require_version("Gtk", "3.0")
 import modules.icons as icons
 import config.data as data
 from config.data import load_config
+from utils.deferred import deferred_import
+
+requests = deferred_import("requests")
 
 config = load_config()
 
@@ -22,6 +24,10 @@ class Weather(Button):
         self.enabled = config.get(
             "bar_weather_visible", False
         )  # Add a flag to track if the component should be shown
+        self.session = None
+        if not self.enabled:
+            # Disabled in the config: never load requests or poll wttr.in.
+            return
         self.session = requests.Session()  # Reuse HTTP connection
         # Update every 10 minutes
         GLib.timeout_add_seconds(600, self.fetch_weather)
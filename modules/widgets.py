@@ -1,3 +1,5 @@
+import importlib
+
 import gi
 
 gi.require_version("Gtk", "3.0")
@@ -6,14 +8,20 @@ from fabric.widgets.label import Label
 from fabric.widgets.stack import Stack
 
 import config.data as data
-from modules.bluetooth import BluetoothConnections
 from modules.buttons import Buttons
 from modules.calendar_module import Calendar
 from modules.controls import ControlSliders
 from modules.metrics import Metrics
 from modules.network import NetworkConnections
 from modules.notifications import NotificationHistory
-from modules.player import Player
+from utils.profiling import timeline
+
+# Widgets imported and built the first time the dashboard is shown:
+# name -> (module, class, takes the Widgets as `widgets=`)
+LAZY_WIDGETS = {
+    "bluetooth": ("modules.bluetooth", "BluetoothConnections", True),
+    "player": ("modules.player", "Player", False),
+}
 
 
 class Widgets(Box):
@@ -39,7 +47,11 @@ class Widgets(Box):
         self.notch = kwargs["notch"]
 
         self.buttons = Buttons(widgets=self)
-        self.bluetooth = BluetoothConnections(widgets=self)
+
+        # Placeholders for the lazy widgets; the real widget is added on first map.
+        self._lazy = {}
+        # They set no expand flags of their own, so they take the child's.
+        self.slot_boxes = {name: Box(name=f"{name}-slot") for name in LAZY_WIDGETS}
 
         self.box_1 = Box(
             name="box-1",
@@ -62,8 +74,6 @@ class Widgets(Box):
 
         self.calendar = Calendar()
 
-        self.player = Player()
-
         self.metrics = Metrics()
 
         self.notification_history = NotificationHistory()
@@ -77,7 +87,7 @@ class Widgets(Box):
             children=[
                 self.notification_history,
                 self.network_connections,
-                self.bluetooth,
+                self.slot_boxes["bluetooth"],
             ],
         )
 
@@ -108,7 +118,7 @@ class Widgets(Box):
             if not vertical_layout
             else [
                 self.applet_stack_box,
-                self.player,
+                self.slot_boxes["player"],
             ]
         )
 
@@ -136,7 +146,7 @@ class Widgets(Box):
 
         self.children_3 = (
             [
-                self.player,
+                self.slot_boxes["player"],
                 self.container_2,
             ]
             if not vertical_layout
@@ -156,8 +166,39 @@ class Widgets(Box):
 
         self.add(self.container_3)
 
+        # Bluetooth also drives the status of the button above, so everything
+        # is built as the dashboard maps, before its first frame is drawn.
+        self._map_handler = self.connect("map", self._on_map)
+
+    bluetooth = property(lambda self: self.get_widget("bluetooth"))
+    player = property(lambda self: self.get_widget("player"))
+
+    def is_built(self, name):
+        return name in self._lazy
+
+    def get_widget(self, name):
+        """Return the widget called `name`, importing and building it if needed."""
+        widget = self._lazy.get(name)
+        if widget is not None:
+            return widget
+
+        module_name, class_name, takes_widgets = LAZY_WIDGETS[name]
+        with timeline.span(f"dashboard widget '{name}'"):
+            widget_class = getattr(importlib.import_module(module_name), class_name)
+            widget = widget_class(widgets=self) if takes_widgets else widget_class()
+            self._lazy[name] = widget
+            self.slot_boxes[name].add(widget)
+            widget.show_all()
+        return widget
+
+    def _on_map(self, *_):
+        self.disconnect(self._map_handler)
+        for name in LAZY_WIDGETS:
+            self.get_widget(name)
+
     def show_bt(self):
-        self.applet_stack.set_visible_child(self.bluetooth)
+        self.get_widget("bluetooth")
+        self.applet_stack.set_visible_child(self.slot_boxes["bluetooth"])
 
     def show_notif(self):
         self.applet_stack.set_visible_child(self.notification_history)
@@ -0,0 +1,231 @@
+#!/usr/bin/env python3
+"""
+Feed the cava FIFO reader from a synthetic writer and report its CPU time.
+
+A child process plays cava: it writes 16-bit frames of `--bars` values into
+a FIFO at `--fps`. The parent waits on the FIFO with `select()` (standing in
+for the GLib IO watch) and runs, on every wakeup, either:
+
+  - the old reader: one frame per wakeup, `struct.unpack` into a list of
+    floats, the old `Spectrum.update` re-reading colors.css for the color,
+    and an `idle_add` per frame (recorded, not dispatched), or
+  - `Cava._io_callback` from modules/cavalcade.py, which drains the FIFO and
+    decodes only the newest frame with numpy, handing it to a handler that
+    keeps it for the next frame clock tick like `Spectrum.update`.
+
+Only the parent's CPU time is counted (the writer is a child process), so
+the numbers are the cost of ingestion alone; drawing is not included. numpy
+is imported before timing, so this is the steady state.
+
+Usage: python scripts/bench_cava_fifo.py [--fps 144] [--bars 24] [--seconds 10]
+"""
+
+import argparse
+import os
+import re
+import resource
+import select
+import struct
+import subprocess
+import sys
+import tempfile
+import time
+import types
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+WRITER = r"""
+import os, random, struct, sys, time
+path, fps, bars, seconds = sys.argv[1], float(sys.argv[2]), int(sys.argv[3]), float(sys.argv[4])
+fd = os.open(path, os.O_WRONLY)
+rng = random.Random(1)
+frames = [struct.pack(f"<{bars}H", *(rng.randint(0, 65535) for _ in range(bars))) for _ in range(64)]
+start = time.perf_counter()
+for i in range(int(fps * seconds)):
+    delay = start + i / fps - time.perf_counter()
+    if delay > 0:
+        time.sleep(delay)
+    os.write(fd, frames[i % 64])
+os.close(fd)
+"""
+
+
+class FakeGLib:
+    SOURCE_REMOVE = False
+    IO_IN = 1
+
+    def __init__(self, runtime_dir):
+        self.runtime_dir = runtime_dir
+        self.idle_calls = []
+
+    def get_user_runtime_dir(self):
+        return self.runtime_dir
+
+    def io_add_watch(self, *_):
+        return 1
+
+    def idle_add(self, callback, *args):
+        self.idle_calls.append((callback, args))
+        return len(self.idle_calls)
+
+    def source_remove(self, _):
+        pass
+
+
+def load_cavalcade(glib):
+    def module(name, **attrs):
+        mod = types.ModuleType(name)
+        mod.__dict__.update(attrs)
+        sys.modules[name] = mod
+        return mod
+
+    class Any:
+        def __init__(self, *args, **kwargs):
+            pass
+
+        def __getattr__(self, _):
+            return Any()
+
+        def __call__(self, *args, **kwargs):
+            return Any()
+
+    module("cairo")
+    module("gi", require_version=lambda *_: None)
+    module("gi.repository", GLib=glib, Gdk=Any(), Gtk=Any())
+    module("loguru", logger=Any())
+    module("fabric")
+    module("fabric.utils")
+    module(
+        "fabric.utils.helpers",
+        get_relative_path=lambda path: os.path.normpath(
+            os.path.join(REPO_DIR, "modules", path)
+        ),
+    )
+    module("fabric.widgets")
+    module("fabric.widgets.overlay", Overlay=Any)
+    module("config")
+    module("config.data", APP_NAME="bench")
+
+    sys.path.insert(0, REPO_DIR)
+    import importlib.util
+
+    spec = importlib.util.spec_from_file_location(
+        "cavalcade", os.path.join(REPO_DIR, "modules", "cavalcade.py")
+    )
+    cavalcade = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(cavalcade)
+    return cavalcade
+
+
+# The reader as it was before the drain/numpy change
+
+class LegacyReader:
+    def __init__(self, fifo_fd, bars, colors_css, glib):
+        self.fifo_fd = fifo_fd
+        self.bars = bars
+        self.colors_css = colors_css
+        self.glib = glib
+        self.byte_type, self.byte_size, self.byte_norm = "H", 2, 65535
+        self.color = None
+
+    def color_update(self):
+        color = "#a5c8ff"
+        try:
+            with open(self.colors_css, "r") as f:
+                content = f.read()
+                m = re.search(r"--primary:\s*(#[0-9a-fA-F]{6})", content)
+                if m:
+                    color = m.group(1)
+        except Exception:
+            pass
+        self.color = (int(color[1:3], 16) / 255, int(color[3:5], 16) / 255,
+                      int(color[5:7], 16) / 255, 1.0)
+
+    def update(self, sample):
+        self.color_update()
+        self.audio_sample = sample
+
+    def io_callback(self, *_):
+        chunk = self.byte_size * self.bars
+        try:
+            data = os.read(self.fifo_fd, chunk)
+        except OSError:
+            return False
+        if len(data) < chunk:
+            return True
+        fmt = self.byte_type * self.bars
+        sample = [i / self.byte_norm for i in struct.unpack(fmt, data)]
+        # The old reader updated the spectrum from an idle callback; here it
+        # is called right away and the idle_add is only recorded.
+        self.glib.idle_add(self.update, sample)
+        self.update(sample)
+        return True
+
+
+def cpu_seconds() -> float:
+    usage = resource.getrusage(resource.RUSAGE_SELF)
+    return usage.ru_utime + usage.ru_stime
+
+
+def run(path, fifo_fd, callback, args) -> dict:
+    writer = subprocess.Popen(
+        [sys.executable, "-c", WRITER, path, str(args.fps), str(args.bars), str(args.seconds)]
+    )
+    wakeups = 0
+    cpu, wall = cpu_seconds(), time.perf_counter()
+    while writer.poll() is None:
+        ready, _, _ = select.select([fifo_fd], [], [], 0.05)
+        if ready:
+            wakeups += 1
+            callback()
+    cpu, wall = cpu_seconds() - cpu, time.perf_counter() - wall
+    # Whatever is left belongs to this run; drop it before the next one.
+    try:
+        while os.read(fifo_fd, 65536):
+            pass
+    except BlockingIOError:
+        pass
+    return {"cpu": cpu, "wall": wall, "wakeups": wakeups}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--fps", type=float, default=144)
+    parser.add_argument("--bars", type=int, default=24)
+    parser.add_argument("--seconds", type=float, default=10)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        glib = FakeGLib(directory)
+        cavalcade = load_cavalcade(glib)
+        colors_css = os.path.join(directory, "colors.css")
+        with open(colors_css, "w") as f:
+            f.write(":root {\n  --primary: #a5c8ff;\n  --surface: #111318;\n}\n" * 20)
+
+        frames = []
+        cava = cavalcade.Cava(frames.append, bars=args.bars)
+        os.mkfifo(cava.path)
+        cava._start_io_reader()
+
+        # numpy is imported on the first frame; keep that one-off cost out.
+        cavalcade.np.zeros(1)
+
+        legacy = LegacyReader(cava.fifo_fd, args.bars, colors_css, glib)
+        old = run(cava.path, cava.fifo_fd, legacy.io_callback, args)
+        old_idle = len(glib.idle_calls)
+        new = run(cava.path, cava.fifo_fd, lambda: cava._io_callback(None, None), args)
+        cava.close()
+
+    print(f"{args.fps:g} fps, {args.bars} bars, {args.seconds:g} s per run")
+    print(
+        f"  old reader:        {old['cpu'] / old['wall'] * 1000:5.1f} ms CPU/s "
+        f"({old['wakeups']} wakeups, {old_idle} idle callbacks queued)"
+    )
+    print(
+        f"  Cava._io_callback: {new['cpu'] / new['wall'] * 1000:5.1f} ms CPU/s "
+        f"({new['wakeups']} wakeups, {len(frames)} frames handed on)"
+    )
+
+
+if __name__ == "__main__":
+    main()
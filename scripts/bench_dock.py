@@ -0,0 +1,273 @@
+#!/usr/bin/env python3
+"""
+Compare the dock's old window-to-pin matching with `WindowMatcher` on a
+synthetic catalog, pin list and window list.
+
+Only the matching is timed (grouping windows by class, assigning the groups
+to pins and looking up the desktop entry of every unpinned class), not the
+button reconciliation that follows it in `Dock.update_dock`. The old path is
+the matching `update_dock` ran before `WindowMatcher`, including the linear
+catalog scan of `find_app_by_key` on every update. Both paths are fed the
+same stream of updates, in which a window opens or closes now and then.
+
+Usage: python scripts/bench_dock.py [--apps 250] [--pins 30] [--windows 100]
+                                    [--updates 500]
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+import types
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+# Synthetic catalog, pins and windows
+
+def make_catalog(count: int):
+    apps = []
+    identifiers = {}
+    for i in range(count):
+        app = types.SimpleNamespace(
+            app_id=f"org.example.app{i}.desktop",
+            name=f"App{i} Studio",
+            display_name=f"App {i} Studio",
+            window_class=f"org.example.app{i}" if i % 3 else None,
+            executable=f"/usr/bin/app{i}",
+            command_line=f"/usr/bin/app{i} %U",
+        )
+        apps.append(app)
+        # The keys `DesktopCatalog` indexes every entry under.
+        for key in (
+            app.app_id.removesuffix(".desktop").lower(),
+            app.name.lower(),
+            app.display_name.lower(),
+            (app.window_class or "").lower(),
+            app.executable.split("/")[-1],
+        ):
+            if key:
+                identifiers[key] = app
+    return types.SimpleNamespace(
+        identifiers=identifiers, get_apps=lambda: apps, apps=apps
+    )
+
+
+def make_pins(catalog, count: int, rng) -> list:
+    pins = []
+    for app in rng.sample(catalog.apps, count):
+        pins.append(
+            {
+                "name": app.name,
+                "display_name": app.display_name,
+                "window_class": app.window_class,
+                "executable": app.executable,
+                "command_line": app.command_line,
+            }
+        )
+    return pins
+
+
+def make_window(catalog, rng, number: int) -> dict:
+    app = rng.choice(catalog.apps)
+    kind = rng.random()
+    if kind < 0.4:
+        class_name = app.window_class or f"app{app.executable[-3:]}"
+    elif kind < 0.6:
+        # A packaging suffix the desktop entry does not have.
+        class_name = f"{app.executable.split('/')[-1]}-bin"
+    elif kind < 0.8:
+        # The executable inside a longer class name.
+        class_name = f"com.vendor.{app.executable.split('/')[-1]}.main"
+    else:
+        # Nothing in the catalog.
+        class_name = f"steam_app_{rng.randint(1, 40)}"
+    return {
+        "address": f"0x{number:08x}",
+        "class": class_name,
+        "initialClass": class_name,
+        "title": f"{class_name} - document {number}",
+    }
+
+
+# The old matching, as `update_dock` ran it before `WindowMatcher`
+
+def normalize(class_name):
+    if not class_name:
+        return ""
+    normalized = class_name.lower()
+    for suffix in [".bin", ".exe", ".so", "-bin", "-gtk"]:
+        if normalized.endswith(suffix):
+            normalized = normalized[: -len(suffix)]
+    return normalized
+
+
+def legacy_find_app_by_key(catalog, key_value):
+    if not key_value:
+        return None
+    normalized_id = str(key_value).lower()
+    if normalized_id in catalog.identifiers:
+        return catalog.identifiers[normalized_id]
+    for app in catalog.get_apps():
+        if app.name and normalized_id in app.name.lower(): return app
+        if app.display_name and normalized_id in app.display_name.lower(): return app
+        if app.window_class and normalized_id in app.window_class.lower(): return app
+        if app.executable and normalized_id in app.executable.lower(): return app
+        if app.command_line and normalized_id in app.command_line.lower(): return app
+    return None
+
+
+def legacy_find_app(catalog, app_identifier):
+    if isinstance(app_identifier, dict):
+        for key in ["window_class", "executable", "command_line", "name", "display_name"]:
+            if app_identifier.get(key):
+                app = legacy_find_app_by_key(catalog, app_identifier[key])
+                if app:
+                    return app
+        return None
+    return legacy_find_app_by_key(catalog, app_identifier)
+
+
+def legacy_match(catalog, pins, clients):
+    running_windows = {}
+    for c in clients:
+        window_id = c.get("initialClass", "").lower() or c.get("class", "").lower() or "unknown-app"
+        running_windows.setdefault(window_id, []).append(c)
+        normalized_id = normalize(window_id)
+        if normalized_id != window_id:
+            running_windows.setdefault(normalized_id, []).extend(running_windows[window_id])
+
+    pinned = []
+    used_window_classes = set()
+    for app_data_item in pins:
+        app = legacy_find_app(catalog, app_data_item)
+        instances = []
+        matched_class = None
+        possible_identifiers = []
+        for key in ["window_class", "executable", "command_line", "name", "display_name"]:
+            if app_data_item.get(key):
+                possible_identifiers.append(app_data_item[key].lower())
+        if app:
+            if app.window_class: possible_identifiers.append(app.window_class.lower())
+            if app.executable: possible_identifiers.append(app.executable.split("/")[-1].lower())
+            if app.command_line:
+                possible_identifiers.append(app.command_line.split()[0].split("/")[-1].lower())
+            if app.name: possible_identifiers.append(app.name.lower())
+            if app.display_name: possible_identifiers.append(app.display_name.lower())
+        for identifier in set(possible_identifiers):
+            if identifier in running_windows:
+                instances = running_windows[identifier]; matched_class = identifier; break
+            normalized = normalize(identifier)
+            if normalized in running_windows:
+                instances = running_windows[normalized]; matched_class = normalized; break
+            for window_class_key in running_windows:
+                if len(identifier) >= 3 and identifier in window_class_key:
+                    instances = running_windows[window_class_key]; matched_class = window_class_key
+                    break
+            if matched_class: break
+        if matched_class:
+            used_window_classes.add(matched_class)
+            used_window_classes.add(normalize(matched_class))
+        pinned.append((app_data_item, app, instances))
+
+    unpinned = []
+    for class_name, instances in running_windows.items():
+        if class_name in used_window_classes:
+            continue
+        app = catalog.identifiers.get(class_name) or catalog.identifiers.get(normalize(class_name))
+        if not app:
+            app = legacy_find_app_by_key(catalog, class_name)
+        if not app and instances and instances[0].get("title"):
+            potential_name = instances[0]["title"].split(" - ")[0].strip()
+            if len(potential_name) > 2:
+                app = legacy_find_app_by_key(catalog, potential_name)
+        unpinned.append((class_name, app, instances))
+    return pinned, unpinned
+
+
+def new_match(matcher, pins, clients):
+    matcher.compile(pins)
+    pinned, unpinned = matcher.match(clients)
+    return pinned, [
+        (class_name, matcher.app_for_class(class_name, instances[0].get("title", "")), instances)
+        for class_name, instances in unpinned
+    ]
+
+
+# Replay
+
+def update_stream(catalog, windows: int, updates: int, seed: int = 2):
+    rng = random.Random(seed)
+    clients = [make_window(catalog, rng, i) for i in range(windows)]
+    number = windows
+    stream = []
+    for _ in range(updates):
+        if rng.random() < 0.2:
+            if rng.random() < 0.5 and clients:
+                clients.pop(rng.randrange(len(clients)))
+            else:
+                clients.append(make_window(catalog, rng, number))
+                number += 1
+        stream.append(list(clients))
+    return stream
+
+
+def percentile(values: list[float], fraction: float) -> float:
+    return values[min(len(values) - 1, int(len(values) * fraction))]
+
+
+def run(match, stream) -> list[float]:
+    timings = []
+    for clients in stream:
+        start = time.perf_counter()
+        match(clients)
+        timings.append(time.perf_counter() - start)
+    return timings
+
+
+def report(label, timings):
+    ordered = sorted(timings)
+    print(
+        f"  {label}: median {percentile(ordered, 0.5) * 1e3:6.2f} ms, "
+        f"p95 {percentile(ordered, 0.95) * 1e3:6.2f} ms per update "
+        f"(first update {timings[0] * 1e3:.2f} ms)"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--apps", type=int, default=250)
+    parser.add_argument("--pins", type=int, default=30)
+    parser.add_argument("--windows", type=int, default=100)
+    parser.add_argument("--updates", type=int, default=500)
+    args = parser.parse_args()
+
+    sys.path.insert(0, REPO_DIR)
+    from utils.window_matcher import WindowMatcher
+
+    catalog = make_catalog(args.apps)
+    pins = make_pins(catalog, args.pins, random.Random(1))
+    stream = update_stream(catalog, args.windows, args.updates)
+
+    # The old path tried a pin's identifiers in set order and could take a
+    # substring hit ("app7" in "app73") before an exact one; WindowMatcher
+    # always prefers exact matches, so a few pins may differ.
+    old_pinned, _ = legacy_match(catalog, pins, stream[0])
+    new_pinned, _ = new_match(WindowMatcher(catalog), pins, stream[0])
+    differing = sum(
+        {c["address"] for c in old[2]} != {c["address"] for c in new[2]}
+        for old, new in zip(old_pinned, new_pinned)
+    )
+
+    print(
+        f"{args.apps} catalog apps, {args.pins} pins, {args.windows} windows, "
+        f"{args.updates} updates ({differing} pins matched differently)"
+    )
+    matcher = WindowMatcher(catalog)
+    report("old matching ", run(lambda clients: legacy_match(catalog, pins, clients), stream))
+    report("WindowMatcher", run(lambda clients: new_match(matcher, pins, clients), stream))
+
+
+if __name__ == "__main__":
+    main()
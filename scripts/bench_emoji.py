@@ -0,0 +1,187 @@
+#!/usr/bin/env python3
+"""
+Time loading the emoji picker's data and searching it one keystroke at a time.
+
+Loading compares the picker's old startup, which parsed all of
+`assets/emoji.json` into a dict with ijson (plain `json` when ijson is not
+installed), with `EmojiIndex`: cold, when the binary index is built from the
+JSON and then mapped, and warm, when an index built earlier is only mapped.
+Each is run `--repeat` times and the median is reported.
+
+Then queries are typed from their first character, as the picker searches on
+every change of its entry. The old filter (a substring of name and group
+over every emoji in the dict) is timed against `EmojiIndex.search` plus
+decoding the first page of results, which is what the picker shows. Both
+must return the same emojis for every keystroke; any that differ are counted.
+
+Usage: python scripts/bench_emoji.py [--repeat 20] [--rounds 50] [--page 27]
+"""
+
+import argparse
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+import types
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+EMOJI_JSON = os.path.join(REPO_DIR, "assets", "emoji.json")
+
+QUERIES = (
+    "smile", "grinning face", "heart", "cat", "flag", "thumbs up", "red",
+    "hand", "food", "travel", "zzz", "person", "ob",
+)
+
+
+def load_emoji_index(cache_dir: str):
+    def module(name, **attrs):
+        mod = types.ModuleType(name)
+        mod.__dict__.update(attrs)
+        sys.modules[name] = mod
+        return mod
+
+    class Logger:
+        def __getattr__(self, _):
+            return lambda *args, **kwargs: None
+
+    module("loguru", logger=Logger())
+    module("config")
+    module("config.data", CACHE_DIR=cache_dir)
+
+    sys.path.insert(0, REPO_DIR)
+    import importlib.util
+
+    spec = importlib.util.spec_from_file_location(
+        "emoji_index", os.path.join(REPO_DIR, "utils", "emoji_index.py")
+    )
+    emoji_index = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(emoji_index)
+    return emoji_index
+
+
+# The picker before the index
+
+def legacy_load(path: str) -> dict:
+    emoji_data = {}
+    with open(path, "r") as f:
+        try:
+            import ijson
+        except ImportError:
+            return json.load(f)
+        for emoji_char, emoji_info in ijson.kvitems(f, ""):
+            emoji_data[emoji_char] = emoji_info
+    return emoji_data
+
+
+def _has_ijson() -> bool:
+    try:
+        import ijson  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def legacy_search(emojis: dict, query: str) -> list:
+    return [
+        (emoji_char, emoji_info)
+        for emoji_char, emoji_info in emojis.items()
+        if query.casefold()
+        in (emoji_info.get("name", "") + " " + emoji_info.get("group", "")).casefold()
+    ]
+
+
+def median_time(function, repeat: int) -> float:
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        timings.append(time.perf_counter() - start)
+    return statistics.median(timings)
+
+
+def percentile(values: list[float], fraction: float) -> float:
+    return values[min(len(values) - 1, int(len(values) * fraction))]
+
+
+def type_queries(search, rounds: int) -> list[float]:
+    timings = []
+    for _ in range(rounds):
+        for query in QUERIES:
+            for length in range(1, len(query) + 1):
+                start = time.perf_counter()
+                search(query[:length])
+                timings.append(time.perf_counter() - start)
+    return sorted(timings)
+
+
+def report(label, timings):
+    print(
+        f"  {label}: median {percentile(timings, 0.5) * 1e3:6.3f} ms, "
+        f"p95 {percentile(timings, 0.95) * 1e3:6.3f} ms, "
+        f"max {timings[-1] * 1e3:6.3f} ms"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--rounds", type=int, default=50)
+    parser.add_argument("--page", type=int, default=27, help="emojis per page")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as cache_dir:
+        emoji_index = load_emoji_index(cache_dir)
+        index_path = os.path.join(cache_dir, "emoji_index.bin")
+
+        def cold():
+            if os.path.exists(index_path):
+                os.remove(index_path)
+            return emoji_index.EmojiIndex(EMOJI_JSON, index_path)
+
+        loader = "ijson" if _has_ijson() else "json"
+        old_load = median_time(lambda: legacy_load(EMOJI_JSON), args.repeat)
+        cold_load = median_time(cold, args.repeat)
+        warm_load = median_time(
+            lambda: emoji_index.EmojiIndex(EMOJI_JSON, index_path), args.repeat
+        )
+
+        emojis = legacy_load(EMOJI_JSON)
+        index = emoji_index.EmojiIndex(EMOJI_JSON, index_path)
+
+        def old_keystroke(query):
+            return legacy_search(emojis, query)[: args.page]
+
+        def new_keystroke(query):
+            return [index.entry(number) for number in index.search(query)[: args.page]]
+
+        differing = 0
+        keystrokes = 0
+        for query in QUERIES:
+            for length in range(1, len(query) + 1):
+                keystrokes += 1
+                old = [char for char, _ in legacy_search(emojis, query[:length])]
+                new = [index.entry(number)[0] for number in index.search(query[:length])]
+                differing += old != new
+
+        print(
+            f"{len(emojis)} emojis, index {os.path.getsize(index_path) / 1024:.0f} KiB, "
+            f"{os.path.getsize(EMOJI_JSON) / 1024:.0f} KiB JSON"
+        )
+        for label, seconds in (
+            (f"old load ({loader} into a dict)", old_load),
+            ("index, cold (build and map)", cold_load),
+            ("index, warm (map only)", warm_load),
+        ):
+            print(f"  {label + ':':<30} {seconds * 1e3:7.2f} ms")
+        print(
+            f"{args.rounds * keystrokes} keystrokes, first {args.page} results decoded, "
+            f"{differing} of {keystrokes} keystrokes with different results"
+        )
+        report("substring filter", type_queries(old_keystroke, args.rounds))
+        report("EmojiIndex      ", type_queries(new_keystroke, args.rounds))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+"""
+Type queries into the launcher's app search one character at a time and
+report the latency per keystroke.
+
+A synthetic list of desktop entries (names, generic names, executables,
+keywords and categories drawn from a small vocabulary) is indexed once by
+`AppSearchIndex`. Every query is then typed from its first character, as the
+launcher searches on each `changed` of the entry, and each `search()` call
+is timed. The old substring filter over display name, name and generic name,
+sorted alphabetically, is timed on the same keystrokes for comparison.
+
+Usage: python scripts/bench_launcher.py [--apps 2000] [--rounds 20]
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+import types
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+WORDS = (
+    "fire fox thunder bird libre office writer calc impress draw text editor "
+    "terminal console file manager image viewer music player video studio "
+    "code visual audio mixer network settings system monitor disk usage "
+    "screen shot recorder mail chat web browser archive calendar notes paint "
+    "vector photo camera game steam wine virtual machine remote desktop"
+).split()
+CATEGORIES = (
+    "AudioVideo", "Development", "Education", "Game", "Graphics", "Network",
+    "Office", "Science", "Settings", "System", "Utility",
+)
+QUERIES = (
+    "firefox", "term", "libre writer", "code", "settings", "viewer",
+    "obs", "steam", "fm", "sysmon", "calc", "visual studio", "xyzzy",
+)
+
+
+def make_apps(count: int, seed: int = 1) -> list:
+    rng = random.Random(seed)
+    apps = []
+    for i in range(count):
+        words = rng.sample(WORDS, rng.randint(1, 3))
+        display_name = " ".join(word.capitalize() for word in words)
+        executable = "".join(words) + (str(i) if i >= len(WORDS) else "")
+        apps.append(
+            types.SimpleNamespace(
+                app_id=f"org.example.{executable}.desktop",
+                name=f"{display_name} {i}",
+                display_name=display_name,
+                generic_name=" ".join(rng.sample(WORDS, 2)).capitalize(),
+                executable=f"/usr/bin/{executable}",
+                keywords=rng.sample(WORDS, 3),
+                categories=";".join(rng.sample(CATEGORIES, 2)) + ";",
+            )
+        )
+    return apps
+
+
+def legacy_search(apps, query):
+    # The filter the launcher ran before the index.
+    return sorted(
+        [
+            app
+            for app in apps
+            if query.casefold()
+            in (
+                (app.display_name or "")
+                + (" " + app.name + " ")
+                + (app.generic_name or "")
+            ).casefold()
+        ],
+        key=lambda app: (app.display_name or "").casefold(),
+    )
+
+
+def percentile(values: list[float], fraction: float) -> float:
+    return values[min(len(values) - 1, int(len(values) * fraction))]
+
+
+def type_queries(search, rounds: int) -> tuple[list[float], list[float]]:
+    """Time every keystroke; also return the first-keystroke timings apart."""
+    every, first = [], []
+    for _ in range(rounds):
+        for query in QUERIES:
+            search("")
+            for length in range(1, len(query) + 1):
+                start = time.perf_counter()
+                search(query[:length])
+                elapsed = time.perf_counter() - start
+                every.append(elapsed)
+                if length == 1:
+                    first.append(elapsed)
+    return sorted(every), sorted(first)
+
+
+def report(label, every, first):
+    print(
+        f"  {label}: median {percentile(every, 0.5) * 1e3:6.3f} ms, "
+        f"p95 {percentile(every, 0.95) * 1e3:6.3f} ms, "
+        f"max {every[-1] * 1e3:6.3f} ms "
+        f"(first keystroke median {percentile(first, 0.5) * 1e3:6.3f} ms)"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--apps", type=int, default=2000)
+    parser.add_argument("--rounds", type=int, default=20)
+    args = parser.parse_args()
+
+    sys.path.insert(0, REPO_DIR)
+    from utils.app_search import AppSearchIndex
+
+    apps = make_apps(args.apps)
+    index = AppSearchIndex()
+    start = time.perf_counter()
+    index.rebuild(apps)
+    build = time.perf_counter() - start
+
+    keystrokes = args.rounds * sum(len(query) for query in QUERIES)
+    print(f"{args.apps} apps, {keystrokes} keystrokes, index built in {build * 1e3:.1f} ms")
+    report("AppSearchIndex  ", *type_queries(index.search, args.rounds))
+    report("substring filter", *type_queries(lambda q: legacy_search(apps, q), args.rounds))
+
+
+if __name__ == "__main__":
+    main()
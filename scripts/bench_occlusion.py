@@ -0,0 +1,276 @@
+#!/usr/bin/env python3
+"""
+Compare the old polled occlusion check with `OcclusionEngine` on a
+synthetic client list.
+
+The old path is the `check_occlusion` the dock and notch used to call every
+250 ms, which ran `hyprctl` three times per call. Here `hyprctl` is a small
+shell script that prints the same synthetic JSON, so the forks are real. The
+engine is fed the same clients through a stand-in for the Hyprland state
+store and a recorded event stream (focus changes, workspace switches,
+window moves), plus one on-demand geometry re-read per second, as a panel
+does when the pointer leaves it.
+
+Usage: python scripts/bench_occlusion.py [--windows 200] [--seconds 10]
+"""
+
+import argparse
+import json
+import os
+import random
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+import types
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+WIDTH, HEIGHT = 2560, 1440
+WORKSPACES = 10
+# (side, size) of the edges watched by the dock and the notch.
+PANELS = (("bottom", 76), ("top", 40))
+POLL_HZ = 4
+
+
+def make_clients(count: int, seed: int = 1) -> list[dict]:
+    rng = random.Random(seed)
+    clients = []
+    for i in range(count):
+        floating = rng.random() < 0.2
+        width = rng.randint(300, WIDTH // 2) if floating else WIDTH // 2 - 20
+        height = rng.randint(200, HEIGHT // 2) if floating else HEIGHT - 60
+        clients.append(
+            {
+                "address": f"0x{i + 1:08x}",
+                "mapped": True,
+                "floating": floating,
+                "at": [rng.randint(0, WIDTH - width), rng.randint(0, HEIGHT - height)]
+                if floating
+                else [10 + (i % 2) * WIDTH // 2, 50],
+                "size": [width, height],
+                "workspace": {"id": i % WORKSPACES + 1, "name": str(i % WORKSPACES + 1)},
+                "monitor": 0,
+                "class": f"app{i % 37}",
+                "initialClass": f"app{i % 37}",
+                "title": f"Window {i}",
+            }
+        )
+    return clients
+
+
+MONITORS = [
+    {"id": 0, "name": "DP-1", "x": 0, "y": 0, "width": WIDTH, "height": HEIGHT,
+     "activeWorkspace": {"id": 1, "name": "1"}, "focused": True}
+]
+
+
+# The old path, as it was before the engine (hyprctl forks on every call)
+
+def legacy_current_workspace():
+    result = subprocess.run(["hyprctl", "activeworkspace"], capture_output=True, text=True)
+    parts = result.stdout.split()
+    for i, part in enumerate(parts):
+        if part == "ID" and i + 1 < len(parts):
+            return int(parts[i + 1])
+    return -1
+
+
+def legacy_screen_dimensions():
+    workspace_id = legacy_current_workspace()
+    result = subprocess.run(["hyprctl", "-j", "monitors"], capture_output=True, text=True)
+    for monitor in json.loads(result.stdout):
+        if monitor.get("activeWorkspace", {}).get("id") == workspace_id:
+            return monitor["width"], monitor["height"]
+    return WIDTH, HEIGHT
+
+
+def legacy_check_occlusion(side: str, size: int) -> bool:
+    workspace = legacy_current_workspace()
+    screen_width, screen_height = legacy_screen_dimensions()
+    region = {
+        "bottom": (0, screen_height - size, screen_width, size),
+        "top": (0, 0, screen_width, size),
+        "left": (0, 0, size, screen_height),
+        "right": (screen_width - size, 0, size, screen_height),
+    }[side]
+    result = subprocess.run(["hyprctl", "-j", "clients"], capture_output=True, text=True)
+    occ_x, occ_y, occ_width, occ_height = region
+    for client in json.loads(result.stdout):
+        if not client.get("mapped") or client.get("workspace", {}).get("id") != workspace:
+            continue
+        (x, y), (width, height) = client["at"], client["size"]
+        if not (x + width <= occ_x or x >= occ_x + occ_width
+                or y + height <= occ_y or y >= occ_y + occ_height):
+            return True
+    return False
+
+
+def fake_hyprctl(directory: str, clients: list[dict]) -> str:
+    with open(os.path.join(directory, "clients.json"), "w") as f:
+        json.dump(clients, f)
+    with open(os.path.join(directory, "monitors.json"), "w") as f:
+        json.dump(MONITORS, f)
+    script = os.path.join(directory, "hyprctl")
+    with open(script, "w") as f:
+        f.write(
+            "#!/bin/sh\n"
+            'case "$*" in\n'
+            '  activeworkspace) echo "workspace ID 1 (1) on monitor DP-1:" ;;\n'
+            f'  "-j monitors") cat "{directory}/monitors.json" ;;\n'
+            f'  "-j clients") cat "{directory}/clients.json" ;;\n'
+            "esac\n"
+        )
+    os.chmod(script, 0o755)
+    return directory
+
+
+# The engine, fed by a stand-in store
+
+class FakeStore:
+    """The parts of `HyprlandStateStore` the engine uses."""
+
+    instance = None
+
+    @staticmethod
+    def get_initial():
+        return FakeStore.instance
+
+    def __init__(self, clients: list[dict]):
+        self._clients_json = json.dumps(clients)
+        self.clients = {client["address"]: client for client in clients}
+        self.monitors = {monitor["id"]: dict(monitor) for monitor in MONITORS}
+        self.active_workspace_id = 1
+        self.is_ready = True
+        self.queries = 0
+        self._callbacks = []
+
+    def connect(self, _signal, callback):
+        self._callbacks.append(callback)
+
+    def emit_changed(self, event_name: str):
+        for callback in self._callbacks:
+            callback(self, event_name)
+
+    def refresh_clients(self, event_name: str = "refresh"):
+        # One socket request and a parse of the full client list.
+        self.queries += 1
+        clients = json.loads(self._clients_json)
+        for client in clients:
+            self.clients[client["address"]]["at"] = client["at"]
+        self.emit_changed(event_name)
+
+    def get_clients(self):
+        return list(self.clients.values())
+
+    def get_monitors(self):
+        return list(self.monitors.values())
+
+    def get_workspace_clients(self, workspace_id):
+        return [c for c in self.clients.values() if c["workspace"]["id"] == workspace_id]
+
+
+def load_engine(clients: list[dict]):
+    stubs = {
+        "config": types.ModuleType("config"),
+        "config.data": types.ModuleType("config.data"),
+        "services": types.ModuleType("services"),
+        "services.hyprland_state": types.ModuleType("services.hyprland_state"),
+    }
+    stubs["config.data"].CURRENT_WIDTH = WIDTH
+    stubs["config.data"].CURRENT_HEIGHT = HEIGHT
+    stubs["config"].data = stubs["config.data"]
+    stubs["services.hyprland_state"].HyprlandStateStore = FakeStore
+    sys.modules.update(stubs)
+    sys.path.insert(0, REPO_DIR)
+    from utils.occlusion import OcclusionEngine
+
+    FakeStore.instance = FakeStore(clients)
+    return OcclusionEngine.get_initial(), FakeStore.instance
+
+
+def cpu_seconds() -> float:
+    own = resource.getrusage(resource.RUSAGE_SELF)
+    children = resource.getrusage(resource.RUSAGE_CHILDREN)
+    return own.ru_utime + own.ru_stime + children.ru_utime + children.ru_stime
+
+
+def bench_legacy(clients, seconds):
+    with tempfile.TemporaryDirectory() as directory:
+        fake_hyprctl(directory, clients)
+        os.environ["PATH"] = f"{directory}{os.pathsep}{os.environ['PATH']}"
+        checks = 0
+        cpu, wall = cpu_seconds(), time.perf_counter()
+        for _ in range(seconds * POLL_HZ):
+            for side, size in PANELS:
+                legacy_check_occlusion(side, size)
+                checks += 1
+        cpu, wall = cpu_seconds() - cpu, time.perf_counter() - wall
+    return {"forks": checks * 3, "cpu": cpu, "wall": wall, "calls": checks}
+
+
+def bench_engine(clients, seconds, seed=2):
+    engine, store = load_engine(clients)
+    states = {}
+    for side, size in PANELS:
+        engine.subscribe(side, size, lambda occluded, side=side: states.__setitem__(side, occluded))
+
+    rng = random.Random(seed)
+    addresses = list(store.clients)
+    events = 0
+    durations = []
+    cpu, wall = cpu_seconds(), time.perf_counter()
+    for second in range(seconds):
+        # A recorded-like second: focus moves twice, a workspace switch, a move.
+        for event_name in ("activewindowv2", "workspacev2", "activewindowv2", "movewindowv2"):
+            start = time.perf_counter()
+            if event_name == "workspacev2":
+                store.active_workspace_id = rng.randint(1, WORKSPACES)
+                store.monitors[0]["activeWorkspace"] = {"id": store.active_workspace_id}
+            elif event_name == "movewindowv2":
+                client = store.clients[rng.choice(addresses)]
+                client["workspace"] = {"id": rng.randint(1, WORKSPACES)}
+            store.emit_changed(event_name)
+            durations.append(time.perf_counter() - start)
+            events += 1
+        # The pointer leaves a panel, which re-reads the geometry once.
+        engine.resync()
+    cpu, wall = cpu_seconds() - cpu, time.perf_counter() - wall
+    durations.sort()
+    return {
+        "forks": 0,
+        "cpu": cpu,
+        "wall": wall,
+        "events": events,
+        "queries": store.queries,
+        "median_event_us": durations[len(durations) // 2] * 1e6,
+        "max_event_us": durations[-1] * 1e6,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--windows", type=int, default=200)
+    parser.add_argument("--seconds", type=int, default=10)
+    args = parser.parse_args()
+
+    clients = make_clients(args.windows)
+    legacy = bench_legacy(clients, args.seconds)
+    engine = bench_engine(clients, args.seconds)
+
+    print(f"{args.windows} windows, {args.seconds} simulated seconds, dock + notch")
+    print(
+        f"  polled check_occlusion: {legacy['forks'] / args.seconds:6.1f} forks/s, "
+        f"{legacy['cpu'] / args.seconds * 1000:7.2f} ms CPU/s "
+        f"({legacy['calls']} checks)"
+    )
+    print(
+        f"  OcclusionEngine:        {engine['forks'] / args.seconds:6.1f} forks/s, "
+        f"{engine['cpu'] / args.seconds * 1000:7.2f} ms CPU/s "
+        f"({engine['events']} events, {engine['queries']} client re-reads, "
+        f"median {engine['median_event_us']:.0f} us / max {engine['max_event_us']:.0f} us per event)"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,318 @@
+#!/usr/bin/env python3
+"""
+Replay a window-event stream through the overview's update path and report
+the time per event.
+
+Each step of the stream is a store event name and the client list the store
+holds after it. GTK, fabric and the shared services are replaced by
+stand-ins that only count widget calls, so the numbers measure the overview's
+own diff/apply work, not GTK's. Every step is run twice: through
+`Overview.update()` (incremental) and through a full rebuild (drop every
+button, then update), which is what the overview did before.
+
+A stream is JSON lines of {"event": ..., "clients": [...], "monitors": [...]}.
+Without `--replay`, a synthetic session is generated (`--save` writes it out
+so it can be edited or replayed later).
+
+Usage: python scripts/bench_overview.py [--windows 60] [--events 2000]
+                                        [--replay FILE] [--save FILE]
+"""
+
+import argparse
+import copy
+import json
+import os
+import random
+import sys
+import time
+import types
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+WIDTH, HEIGHT = 2560, 1440
+MONITORS = [{"id": 0, "name": "DP-1", "x": 0, "y": 0, "width": WIDTH, "height": HEIGHT,
+             "transform": 0, "activeWorkspace": {"id": 1, "name": "1"}}]
+
+widget_calls = 0
+
+
+# Stand-ins for GTK and fabric
+
+class Widget:
+    """Accepts any constructor arguments and counts every method call."""
+
+    def __init__(self, *args, **kwargs):
+        self._child = kwargs.get("child")
+        self._children = list(kwargs.get("children") or [])
+
+    def __getattr__(self, name):
+        def call(*args, **kwargs):
+            global widget_calls
+            widget_calls += 1
+
+        return call
+
+    def get_child(self):
+        return self._child
+
+    def add(self, child):
+        global widget_calls
+        widget_calls += 1
+        self._child = child
+        self._children.append(child)
+
+    def remove(self, child):
+        global widget_calls
+        widget_calls += 1
+        if self._child is child:
+            self._child = None
+
+
+class Fixed(Widget):
+    def put(self, widget, x, y):
+        global widget_calls
+        widget_calls += 1
+        self._children.append(widget)
+
+    def move(self, widget, x, y):
+        global widget_calls
+        widget_calls += 1
+
+    def remove(self, widget):
+        global widget_calls
+        widget_calls += 1
+        self._children.remove(widget)
+
+    def get_children(self):
+        return list(self._children)
+
+
+class Namespace(types.SimpleNamespace):
+    """Gtk/Gdk stand-in: any unknown constant or class is a `Widget`."""
+
+    def __getattr__(self, name):
+        return Widget()
+
+    def __call__(self, *args, **kwargs):
+        return Widget()
+
+
+class Pixbuf:
+    def __init__(self, size):
+        self.size = size
+
+    def get_width(self):
+        return self.size
+
+    def get_height(self):
+        return self.size
+
+
+class FakeIconResolver:
+    @staticmethod
+    def get_initial():
+        return FakeIconResolver()
+
+    def get_app_pixbuf(self, _app, size):
+        return Pixbuf(size)
+
+    def get_icon_pixbuf(self, _name, size):
+        return Pixbuf(size)
+
+
+class FakeCatalog:
+    identifiers = {}
+
+    @staticmethod
+    def get_initial():
+        return FakeCatalog()
+
+    def get_apps(self):
+        return []
+
+    def connect(self, *_):
+        pass
+
+
+class FakeStore:
+    """The parts of `HyprlandStateStore` the overview reads."""
+
+    def __init__(self):
+        self.clients = []
+        self.monitors = MONITORS
+        self.subscriber = None
+
+    def subscribe(self, _name, _events, callback):
+        self.subscriber = callback
+
+    def get_clients(self):
+        return self.clients
+
+    def get_monitors(self):
+        return self.monitors
+
+
+def load_overview():
+    fixed_ns = types.SimpleNamespace(new=Fixed)
+    gtk = Namespace(Fixed=fixed_ns, Widget=Widget)
+    gdk = Namespace(Screen=types.SimpleNamespace(get_default=lambda: types.SimpleNamespace(
+        get_width=lambda: WIDTH, get_height=lambda: HEIGHT)))
+    store = FakeStore()
+
+    def module(name, **attrs):
+        mod = types.ModuleType(name)
+        mod.__dict__.update(attrs)
+        sys.modules[name] = mod
+        return mod
+
+    module("gi", require_version=lambda *_: None)
+    module("gi.repository", Gtk=gtk, Gdk=gdk, GdkPixbuf=Namespace())
+    sys.modules["gi"].repository = sys.modules["gi.repository"]
+    module("cairo", ImageSurface=Widget, Context=Widget)
+    module("loguru", logger=types.SimpleNamespace(debug=lambda *_: None))
+    module("fabric")
+    module("fabric.hyprland")
+    module("fabric.hyprland.widgets", get_hyprland_connection=lambda: Widget())
+    module("fabric.widgets")
+    for name in ("box", "button", "eventbox", "image", "label", "overlay"):
+        class_name = {"eventbox": "EventBox"}.get(name, name.capitalize())
+        module(f"fabric.widgets.{name}", **{class_name: type(class_name, (Widget,), {})})
+    module("config")
+    module("config.data", PANEL_THEME="Notch", BAR_POSITION="Top")
+    module("modules")
+    module("modules.icons", circle_plus="+")
+    module("services")
+    module("services.desktop_catalog", DesktopCatalog=FakeCatalog)
+    module("services.hyprland_state",
+           HyprlandStateStore=types.SimpleNamespace(get_initial=lambda: store))
+    module("utils")
+    module("utils.icon_resolver", IconResolver=FakeIconResolver)
+
+    sys.path.insert(0, REPO_DIR)
+    import importlib.util
+
+    spec = importlib.util.spec_from_file_location(
+        "overview", os.path.join(REPO_DIR, "modules", "overview.py")
+    )
+    overview = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(overview)
+    return overview, store
+
+
+# Event streams
+
+def synthetic_stream(windows: int, events: int, seed: int = 1) -> list[dict]:
+    rng = random.Random(seed)
+    next_address = 1
+    clients: dict[str, dict] = {}
+
+    def new_client():
+        nonlocal next_address
+        address = f"0x{next_address:08x}"
+        next_address += 1
+        width, height = rng.randint(300, 1200), rng.randint(200, 900)
+        app = f"app{rng.randint(0, 29)}"
+        clients[address] = {
+            "address": address,
+            "at": [rng.randint(0, WIDTH - width), rng.randint(0, HEIGHT - height)],
+            "size": [width, height],
+            "workspace": {"id": rng.randint(1, 10)},
+            "monitor": 0,
+            "title": f"{app} window {address}",
+            "class": app,
+            "initialClass": app,
+        }
+
+    for _ in range(windows):
+        new_client()
+
+    stream = []
+    for _ in range(events):
+        kind = rng.choices(
+            ["windowtitlev2", "movewindowv2", "changefloatingmode", "openwindow", "closewindow"],
+            weights=[45, 20, 20, 8, 7],
+        )[0]
+        if kind == "openwindow" or not clients:
+            kind = "openwindow"
+            new_client()
+        elif kind == "closewindow":
+            del clients[rng.choice(list(clients))]
+        else:
+            client = clients[rng.choice(list(clients))]
+            if kind == "windowtitlev2":
+                client["title"] = f"{client['class']} {rng.random():.6f}"
+            elif kind == "movewindowv2":
+                client["workspace"] = {"id": rng.randint(1, 10)}
+            else:
+                client["at"] = [rng.randint(0, WIDTH // 2), rng.randint(0, HEIGHT // 2)]
+                client["size"] = [rng.randint(300, 1200), rng.randint(200, 900)]
+        stream.append({"event": kind, "clients": copy.deepcopy(list(clients.values()))})
+    return stream
+
+
+def percentile(values: list[float], fraction: float) -> float:
+    return values[min(len(values) - 1, int(len(values) * fraction))]
+
+
+def replay(overview_module, store, stream, full_rebuild: bool):
+    global widget_calls
+    overview = overview_module.Overview()
+    timings: dict[str, list[float]] = {}
+    calls = 0
+    for step in stream:
+        store.clients = step["clients"]
+        store.monitors = step.get("monitors", MONITORS)
+        widget_calls = 0
+        start = time.perf_counter()
+        if full_rebuild:
+            for address in list(overview.clients):
+                overview._remove_client(address)
+            overview.update()
+        else:
+            store.subscriber({step["event"]})
+        timings.setdefault(step["event"], []).append(time.perf_counter() - start)
+        calls += widget_calls
+    return timings, calls
+
+
+def report(label, timings, calls, steps):
+    every = sorted(t for values in timings.values() for t in values)
+    print(
+        f"{label}: median {percentile(every, 0.5) * 1e6:7.1f} us, "
+        f"p95 {percentile(every, 0.95) * 1e6:7.1f} us, "
+        f"{calls / steps:6.1f} widget calls per event"
+    )
+    for event_name, values in sorted(timings.items()):
+        values.sort()
+        print(
+            f"    {event_name:20} {len(values):5d} x  median "
+            f"{percentile(values, 0.5) * 1e6:7.1f} us  p95 {percentile(values, 0.95) * 1e6:7.1f} us"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--windows", type=int, default=60)
+    parser.add_argument("--events", type=int, default=2000)
+    parser.add_argument("--replay", help="JSON-lines event stream to replay")
+    parser.add_argument("--save", help="write the generated stream here")
+    args = parser.parse_args()
+
+    if args.replay:
+        with open(args.replay) as f:
+            stream = [json.loads(line) for line in f if line.strip()]
+    else:
+        stream = synthetic_stream(args.windows, args.events)
+    if args.save:
+        with open(args.save, "w") as f:
+            for step in stream:
+                f.write(json.dumps(step) + "\n")
+
+    overview_module, store = load_overview()
+    print(f"{len(stream)} events, up to {max(len(s['clients']) for s in stream)} windows")
+    for label, full_rebuild in (("incremental update", False), ("full rebuild     ", True)):
+        timings, calls = replay(overview_module, store, stream, full_rebuild)
+        report(label, timings, calls, len(stream))
+
+
+if __name__ == "__main__":
+    main()
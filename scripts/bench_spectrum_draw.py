@@ -0,0 +1,351 @@
+#!/usr/bin/env python3
+"""
+Time the spectrum's per-frame redraw before and after the geometry cache.
+
+`Spectrum` from modules/cavalcade.py is driven with synthetic frames through
+`process()`, and every redraw it queues is run on a context clipped to the
+queued area, as GTK would. The old spectrum (every frame queues a full
+redraw, which recomputes every bar and builds its outline from scratch) is
+the same class with the previous `process()` and `redraw()`.
+
+Two workloads are run at every bar count: all bars change every frame, and
+only a span of 4 adjacent bars changes. With pycairo installed, drawing goes
+to a real image surface; without it, to a stand-in context that records the
+cairo calls, so cairo's own rasterization is then left out (the number of
+cairo calls per frame is reported either way).
+
+Usage: python scripts/bench_spectrum_draw.py [--bars 32 64 128] [--frames 2000]
+                                             [--bar-width 8] [--height 40]
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+import types
+from math import pi
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+calls = 0
+# Size of the next `Gtk.DrawingArea` a spectrum creates.
+area_size = (0, 0)
+
+
+# Stand-in cairo, used when pycairo is not installed
+
+class RecordingContext:
+    """Counts cairo calls and keeps the current path as a list of operations."""
+
+    def __init__(self, surface=None):
+        self._path = []
+        self._clip = None
+
+    def _record(self, *op):
+        global calls
+        calls += 1
+        self._path.append(op)
+
+    def rectangle(self, *args):
+        self._record("rectangle", *args)
+
+    def arc(self, *args):
+        self._record("arc", *args)
+
+    def close_path(self):
+        self._record("close_path")
+
+    def new_path(self):
+        global calls
+        calls += 1
+        self._path = []
+
+    def copy_path(self):
+        global calls
+        calls += 1
+        return list(self._path)
+
+    def append_path(self, path):
+        global calls
+        calls += 1
+        self._path.extend(path)
+
+    def clip(self):
+        global calls
+        calls += 1
+        rectangles = [op[1:] for op in self._path if op[0] == "rectangle"]
+        self._clip = rectangles[-1]
+        self._path = []
+
+    def clip_extents(self):
+        x, y, width, height = self._clip
+        return x, y, x + width, y + height
+
+    def fill(self):
+        global calls
+        calls += 1
+        self._path = []
+
+    def set_source_rgba(self, *_):
+        global calls
+        calls += 1
+
+    def set_source_surface(self, *_):
+        global calls
+        calls += 1
+
+    def paint(self):
+        global calls
+        calls += 1
+
+
+def stand_in_cairo():
+    return types.SimpleNamespace(
+        Context=RecordingContext,
+        Path=list,
+        CONTENT_COLOR_ALPHA=0,
+        FORMAT_ARGB32=0,
+        ImageSurface=lambda *args: object(),
+    )
+
+
+class CountingContext:
+    """A real cairo context that also counts the calls made on it."""
+
+    def __init__(self, context):
+        self._context = context
+
+    def __getattr__(self, name):
+        method = getattr(self._context, name)
+
+        def call(*args):
+            global calls
+            calls += 1
+            return method(*args)
+
+        return call
+
+
+# Stand-ins for GTK
+
+class DrawingArea:
+    def __init__(self, width, height, cairo):
+        self.width = width
+        self.height = height
+        self.cairo = cairo
+        self.queued = []
+
+    def connect(self, *_):
+        pass
+
+    def add_events(self, *_):
+        pass
+
+    def get_allocated_width(self):
+        return self.width
+
+    def get_allocated_height(self):
+        return self.height
+
+    def get_style_context(self):
+        return types.SimpleNamespace(lookup_color=lambda _: (False, None))
+
+    def get_window(self):
+        return types.SimpleNamespace(
+            create_similar_surface=lambda content, width, height: self.cairo.ImageSurface(
+                self.cairo.FORMAT_ARGB32, width, height
+            )
+        )
+
+    def queue_draw(self):
+        self.queued.append((0, 0, self.width, self.height))
+
+    def queue_draw_area(self, x, y, width, height):
+        self.queued.append((x, y, width, height))
+
+
+def load_cavalcade(cairo):
+    def module(name, **attrs):
+        mod = types.ModuleType(name)
+        mod.__dict__.update(attrs)
+        sys.modules[name] = mod
+        return mod
+
+    class Any:
+        def __init__(self, *args, **kwargs):
+            pass
+
+        def __getattr__(self, _):
+            return Any()
+
+        def __call__(self, *args, **kwargs):
+            return Any()
+
+    if cairo is not sys.modules.get("cairo"):
+        sys.modules["cairo"] = cairo
+    gdk = types.SimpleNamespace(
+        RGBA=lambda red, green, blue, alpha: (red, green, blue, alpha),
+        EventMask=Any(),
+    )
+    module("gi", require_version=lambda *_: None)
+    gtk = types.SimpleNamespace(DrawingArea=lambda: DrawingArea(*area_size, cairo))
+    module("gi.repository", GLib=Any(), Gdk=gdk, Gtk=gtk)
+    module("loguru", logger=Any())
+    module("fabric")
+    module("fabric.utils")
+    module(
+        "fabric.utils.helpers",
+        get_relative_path=lambda path: os.path.normpath(
+            os.path.join(REPO_DIR, "modules", path)
+        ),
+    )
+    module("fabric.widgets")
+    module("fabric.widgets.overlay", Overlay=Any)
+    module("config")
+    module("config.data", APP_NAME="bench")
+
+    sys.path.insert(0, REPO_DIR)
+    import importlib.util
+
+    spec = importlib.util.spec_from_file_location(
+        "cavalcade", os.path.join(REPO_DIR, "modules", "cavalcade.py")
+    )
+    cavalcade = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(cavalcade)
+    return cavalcade
+
+
+def legacy_spectrum_class(cavalcade):
+    class LegacySpectrum(cavalcade.Spectrum):
+        """`Spectrum.process` and `Spectrum.redraw` as they were before the cache."""
+
+        def process(self, data):
+            self.audio_sample = data
+            if not self.is_silence(self.audio_sample[0]):
+                self.area.queue_draw()
+            elif self.silence_value == (self.silence + 1):
+                self.audio_sample = [0] * self.sizes.number
+                self.area.queue_draw()
+
+        def redraw(self, widget, cr):
+            cr.set_source_rgba(*self.color)
+            dx = 3
+
+            center_y = self.sizes.area.height / 2
+            for i, value in enumerate(self.audio_sample):
+                width = self.sizes.area.width / self.sizes.number - self.sizes.padding
+                radius = width / 2
+                height = max(self.sizes.bar.height * min(value, 1), self.sizes.zero) / 2
+                if height == self.sizes.zero / 2 + 1:
+                    height *= 0.5
+
+                height = min(height, self.max_height)
+
+                cr.rectangle(dx, center_y - height, width, height * 2)
+                cr.arc(dx + radius, center_y - height, radius, 0, 2 * pi)
+                cr.arc(dx + radius, center_y + height, radius, 0, 2 * pi)
+
+                cr.close_path()
+                dx += width + self.sizes.padding
+            cr.fill()
+
+    return LegacySpectrum
+
+
+# Workloads
+
+def frames(bars: int, count: int, span: int | None, seed: int = 1) -> list[list[float]]:
+    rng = random.Random(seed)
+    frame = [rng.random() for _ in range(bars)]
+    result = []
+    for _ in range(count):
+        frame = list(frame)
+        if span is None:
+            frame = [rng.random() for _ in range(bars)]
+        else:
+            first = rng.randrange(bars - span + 1)
+            for i in range(first, first + span):
+                frame[i] = rng.random()
+        # Never silent, so every frame is drawn.
+        frame[0] = max(frame[0], 0.01)
+        result.append(frame)
+    return result
+
+
+def run(spectrum, stream, cairo, real_cairo) -> tuple[float, float, float]:
+    """Median redraw time, median frame time (process + redraws), calls per frame."""
+    global calls
+    area = spectrum.area
+    surface = (
+        cairo.ImageSurface(cairo.FORMAT_ARGB32, area.width, area.height)
+        if real_cairo
+        else None
+    )
+    spectrum.size_update()
+    redraws, totals = [], []
+    calls = 0
+    for frame in stream:
+        area.queued.clear()
+        start = time.perf_counter()
+        spectrum.process(frame)
+        redraw = 0.0
+        for x, y, width, height in area.queued:
+            cr = cairo.Context(surface)
+            if real_cairo:
+                cr = CountingContext(cr)
+            cr.rectangle(x, y, width, height)
+            cr.clip()
+            redraw_start = time.perf_counter()
+            spectrum.redraw(area, cr)
+            redraw += time.perf_counter() - redraw_start
+        totals.append(time.perf_counter() - start)
+        redraws.append(redraw)
+    redraws.sort()
+    totals.sort()
+    middle = len(stream) // 2
+    return redraws[middle], totals[middle], calls / len(stream)
+
+
+def main():
+    global area_size
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--bars", type=int, nargs="+", default=[32, 64, 128])
+    parser.add_argument("--frames", type=int, default=2000)
+    parser.add_argument("--bar-width", type=int, default=8, help="area width per bar, in px")
+    parser.add_argument("--height", type=int, default=40)
+    args = parser.parse_args()
+
+    try:
+        import cairo
+
+        real_cairo = True
+    except ImportError:
+        cairo = stand_in_cairo()
+        real_cairo = False
+    cavalcade = load_cavalcade(cairo)
+    LegacySpectrum = legacy_spectrum_class(cavalcade)
+
+    print(
+        f"{args.frames} frames per run, {args.bar_width} px per bar, {args.height} px high, "
+        + ("pycairo image surface" if real_cairo else "recording stand-in context (no pycairo)")
+    )
+    print("  median redraw time / median frame time (process + redraws) / cairo calls per frame")
+    print(f"  {'bars':>4}  {'workload':<16} {'old':>29}   {'new':>29}")
+    for bars in args.bars:
+        for label, span in (("all bars change", None), ("4 bars change", 4)):
+            stream = frames(bars, args.frames, span)
+            results = []
+            for spectrum_class in (LegacySpectrum, cavalcade.Spectrum):
+                area_size = (bars * args.bar_width, args.height)
+                spectrum = spectrum_class(bars=bars)
+                results.append(run(spectrum, stream, cairo, real_cairo))
+            columns = [
+                f"{redraw * 1e6:5.0f} / {total * 1e6:5.0f} us {calls_per_frame:5.0f} calls"
+                for redraw, total, calls_per_frame in results
+            ]
+            print(f"  {bars:>4}  {label:<16} {columns[0]:>29}   {columns[1]:>29}")
+
+
+if __name__ == "__main__":
+    main()
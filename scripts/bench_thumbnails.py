@@ -0,0 +1,224 @@
+#!/usr/bin/env python3
+"""
+Render wallpaper thumbnails into a cold cache, the old way and through the
+thumbnail workers, and report wall time and peak memory.
+
+Synthetic 4K wallpapers (mostly JPEG, some PNG) are generated first; only
+`--unique` distinct images are encoded and the rest are hard links to them,
+which keeps the disk usage small without changing the work per file. Each
+path then runs in its own child process, so its peak RSS is its own:
+
+  - old: `WallpaperSelector._process_file` as it was, Pillow decoding at
+    full resolution on a 4-thread pool inside the (shell) process, and
+  - new: `utils/thumbnail_worker.py` processes fed one JSON job at a time
+    over a pipe, as `ThumbnailStore` does, with the store's worker count.
+    The workers also run the color analysis the store asks for.
+
+Needs Pillow and NumPy.
+
+Usage: python scripts/bench_thumbnails.py [--count 1000] [--unique 20]
+                                          [--png-share 0.1] [--keep DIR]
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import random
+import resource
+import selectors
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+WORKER_SCRIPT = os.path.join(REPO_DIR, "utils", "thumbnail_worker.py")
+WIDTH, HEIGHT = 3840, 2160
+THUMBNAIL_SIZE = 96
+
+
+def generate(directory: str, count: int, unique: int, png_share: float) -> list[str]:
+    from PIL import Image, ImageChops, ImageFilter
+
+    rng = random.Random(1)
+    sources = {}
+    paths = []
+    for i in range(count):
+        ext = "png" if i < count * png_share else "jpg"
+        variant = (ext, i % unique)
+        path = os.path.join(directory, f"wallpaper-{i:04d}.{ext}")
+        if variant not in sources:
+            # Smooth gradients with some grain, like a photo or a render.
+            channels = [
+                Image.linear_gradient("L").rotate(rng.randint(0, 359)).resize((WIDTH, HEIGHT))
+                for _ in range(3)
+            ]
+            grain = Image.effect_noise((WIDTH // 4, HEIGHT // 4), 24).resize((WIDTH, HEIGHT))
+            channels = [ImageChops.add(c, grain, scale=2) for c in channels]
+            img = Image.merge("RGB", channels).filter(ImageFilter.GaussianBlur(1))
+            if ext == "png":
+                img.save(path, "PNG", compress_level=1)
+            else:
+                img.save(path, "JPEG", quality=90)
+            sources[variant] = path
+        else:
+            os.link(sources[variant], path)
+        paths.append(path)
+    return paths
+
+
+# The two paths, each run in a child process (`--run old|new`)
+
+def run_old(paths: list[str], cache_dir: str):
+    from PIL import Image
+
+    def process_file(full_path):
+        file_name = os.path.basename(full_path)
+        file_hash = hashlib.md5(file_name.encode("utf-8")).hexdigest()
+        cache_path = os.path.join(cache_dir, f"{file_hash}.png")
+        if not os.path.exists(cache_path):
+            with Image.open(full_path) as img:
+                width, height = img.size
+                side = min(width, height)
+                left = (img.width - side) // 2
+                top = (height - side) // 2
+                img_cropped = img.crop((left, top, left + side, top + side))
+                img_cropped.thumbnail((96, 96), Image.Resampling.LANCZOS)
+                img_cropped.save(cache_path, "PNG")
+
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        for future in [executor.submit(process_file, path) for path in paths]:
+            future.result()
+
+
+def run_new(paths: list[str], cache_dir: str):
+    workers = max(1, min(4, (os.cpu_count() or 2) // 2))
+    jobs = [
+        {"id": i, "src": path, "dst": os.path.join(cache_dir, f"{i}.png"), "size": THUMBNAIL_SIZE}
+        for i, path in enumerate(paths)
+    ]
+    jobs.reverse()
+    selector = selectors.DefaultSelector()
+    processes = []
+
+    def send(process):
+        process.stdin.write(json.dumps(jobs.pop()) + "\n")
+        process.stdin.flush()
+
+    for _ in range(min(workers, len(jobs))):
+        process = subprocess.Popen(
+            [sys.executable, WORKER_SCRIPT],
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            text=True,
+        )
+        processes.append(process)
+        selector.register(process.stdout, selectors.EVENT_READ, process)
+        send(process)
+
+    failed = 0
+    running = len(processes)
+    while running:
+        for key, _ in selector.select():
+            process = key.data
+            result = json.loads(process.stdout.readline())
+            failed += not result["ok"]
+            if jobs:
+                send(process)
+            else:
+                selector.unregister(process.stdout)
+                process.stdin.close()
+                running -= 1
+    for process in processes:
+        process.wait()
+    if failed:
+        print(f"{failed} thumbnails failed", file=sys.stderr)
+
+
+def child(mode: str, listing: str, cache_dir: str):
+    with open(listing) as f:
+        paths = f.read().splitlines()
+    start = time.perf_counter()
+    (run_old if mode == "old" else run_new)(paths, cache_dir)
+    wall = time.perf_counter() - start
+    # ru_maxrss is in KiB on Linux; for children it is the largest one.
+    own = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    workers = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+    print(json.dumps({"wall": wall, "rss": own, "worker_rss": workers}))
+
+
+def measure(mode: str, listing: str, directory: str) -> dict:
+    cache_dir = os.path.join(directory, f"cache-{mode}")
+    shutil.rmtree(cache_dir, ignore_errors=True)
+    os.makedirs(cache_dir)
+    output = subprocess.run(
+        [sys.executable, os.path.abspath(__file__), "--run", mode, listing, cache_dir],
+        check=True,
+        capture_output=True,
+        text=True,
+    ).stdout
+    return json.loads(output.splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--count", type=int, default=1000)
+    parser.add_argument("--unique", type=int, default=20)
+    parser.add_argument("--png-share", type=float, default=0.1)
+    parser.add_argument("--keep", help="generate into (or reuse) this directory")
+    parser.add_argument("--run", nargs=3, metavar=("MODE", "LISTING", "CACHE"), help=argparse.SUPPRESS)
+    parser.add_argument("--generate", metavar="DIR", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.run:
+        return child(*args.run)
+    if args.generate:
+        paths = generate(
+            os.path.join(args.generate, "images"), args.count, args.unique, args.png_share
+        )
+        with open(os.path.join(args.generate, "listing.txt"), "w") as f:
+            f.write("\n".join(paths))
+        return
+
+    directory = args.keep or tempfile.mkdtemp(prefix="bench-thumbnails-")
+    try:
+        listing = os.path.join(directory, "listing.txt")
+        if not os.path.exists(listing):
+            os.makedirs(os.path.join(directory, "images"), exist_ok=True)
+            start = time.perf_counter()
+            # In a child as well: the peak RSS of a process carries over to
+            # the children it starts, which would hide the runs' own.
+            subprocess.run(
+                [
+                    sys.executable, os.path.abspath(__file__), "--generate", directory,
+                    "--count", str(args.count), "--unique", str(args.unique),
+                    "--png-share", str(args.png_share),
+                ],
+                check=True,
+            )
+            print(f"generated {args.count} wallpapers in {time.perf_counter() - start:.1f} s")
+
+        with open(listing) as f:
+            count = len(f.read().splitlines())
+        print(f"{count} wallpapers at {WIDTH}x{HEIGHT}, {os.cpu_count()} CPUs, cold cache")
+        old = measure("old", listing, directory)
+        print(
+            f"  old (thread pool in process): {old['wall']:6.1f} s, "
+            f"peak RSS {old['rss'] / 1024:5.0f} MB"
+        )
+        new = measure("new", listing, directory)
+        print(
+            f"  thumbnail workers:            {new['wall']:6.1f} s, "
+            f"peak RSS {new['rss'] / 1024:5.0f} MB driver, "
+            f"{new['worker_rss'] / 1024:.0f} MB largest worker"
+        )
+    finally:
+        if not args.keep:
+            shutil.rmtree(directory, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,439 @@
+import json
+import os
+
+from fabric.core.service import Service, Signal
+from fabric.utils import DesktopApp
+from gi.repository import Gio, GLib
+from loguru import logger
+
+import config.data as data
+from utils.colors import Colors
+
+CACHE_VERSION = 1
+CACHE_PATH = f"{data.CACHE_DIR}/desktop_catalog.json"
+
+# Package managers tend to touch many entries at once; wait for the burst to end.
+RESCAN_DELAY_MS = 300
+
+ENTRY_FIELDS = (
+    "name",
+    "generic_name",
+    "display_name",
+    "description",
+    "window_class",
+    "executable",
+    "command_line",
+    "icon_name",
+    "keywords",
+    "categories",
+)
+
+
+def application_dirs() -> list[str]:
+    """XDG application directories, highest precedence first."""
+    return [
+        os.path.join(base, "applications")
+        for base in [GLib.get_user_data_dir(), *GLib.get_system_data_dirs()]
+    ]
+
+
+def _environment_key() -> dict:
+    # `should_show()` and the localized names depend on these.
+    return {
+        "desktop": os.environ.get("XDG_CURRENT_DESKTOP", ""),
+        "languages": list(GLib.get_language_names()),
+    }
+
+
+def _command_base(command_line: str | None) -> str:
+    parts = (command_line or "").split()
+    return parts[0].split("/")[-1].lower() if parts else ""
+
+
+def parse_entry(path: str, mtime: int) -> dict | None:
+    """Read the fields the shell uses from one `.desktop` file."""
+    try:
+        info = Gio.DesktopAppInfo.new_from_filename(path)
+    except (GLib.Error, TypeError):
+        info = None
+    if info is None:
+        return None
+    icon = info.get_icon()
+    return {
+        "path": path,
+        "mtime": mtime,
+        "name": info.get_name(),
+        "generic_name": info.get_generic_name(),
+        "display_name": info.get_display_name(),
+        "description": info.get_description(),
+        "window_class": info.get_startup_wm_class(),
+        "executable": info.get_executable(),
+        "command_line": info.get_commandline(),
+        "icon_name": icon.to_string() if icon is not None else None,
+        "keywords": list(info.get_keywords() or []),
+        "categories": info.get_categories() or "",
+        "hidden": info.get_is_hidden(),
+        "show": info.should_show(),
+    }
+
+
+class CatalogApp:
+    """
+    A desktop entry restored from the catalog. It has the attributes of
+    fabric's `DesktopApp`; the entry is only parsed again by GIO when the app
+    is launched or its icon is loaded.
+    """
+
+    def __init__(self, app_id: str, entry: dict):
+        self.app_id = app_id
+        self.path = entry["path"]
+        self.mtime = entry["mtime"]
+        for field in ENTRY_FIELDS:
+            setattr(self, field, entry.get(field))
+        self.keywords = self.keywords or []
+        self.categories = self.categories or ""
+        self.show = entry.get("show", True)
+        self._desktop_app = None
+
+    @property
+    def desktop_app(self) -> DesktopApp | None:
+        if self._desktop_app is None:
+            try:
+                info = Gio.DesktopAppInfo.new_from_filename(self.path)
+            except (GLib.Error, TypeError):
+                info = None
+            if info is not None:
+                self._desktop_app = DesktopApp(info)
+        return self._desktop_app
+
+    def launch(self):
+        app = self.desktop_app
+        return app.launch() if app is not None else False
+
+    def get_icon_pixbuf(self, *args, **kwargs):
+        app = self.desktop_app
+        return app.get_icon_pixbuf(*args, **kwargs) if app is not None else None
+
+    def __getattr__(self, attr):
+        # Anything else fabric's DesktopApp offers (`icon`, `_app`, ...).
+        if attr.startswith("__") or attr == "_desktop_app":
+            raise AttributeError(attr)
+        app = self.desktop_app
+        if app is None:
+            raise AttributeError(attr)
+        return getattr(app, attr)
+
+    def __repr__(self):
+        return f"<CatalogApp {self.app_id}>"
+
+
+class DesktopCatalog(Service):
+    """
+    Every installed desktop entry, parsed once and shared by all widgets.
+
+    The parsed entries are cached on disk together with the mtimes of the
+    application directories (and of every entry), so a restart only re-reads
+    the directories that changed. While running, the directories are watched
+    with file monitors and only the entries that changed are parsed again.
+    """
+
+    instance = None
+
+    @staticmethod
+    def get_initial():
+        if DesktopCatalog.instance is None:
+            DesktopCatalog.instance = DesktopCatalog()
+
+        return DesktopCatalog.instance
+
+    @Signal
+    def changed(self) -> None:
+        """Signal emitted after entries were added, removed or modified."""
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.dirs = application_dirs()
+        # apps dir -> desktop id -> entry, and scanned dir -> mtime
+        self._entries: dict[str, dict[str, dict]] = {}
+        self._dir_mtimes: dict[str, int] = {}
+        self._apps_by_path: dict[tuple[str, int], CatalogApp] = {}
+        self._monitors: dict[str, Gio.FileMonitor] = {}
+        self._dirty: set[str] = set()
+        self._rescan_id = None
+
+        self.apps: list[CatalogApp] = []
+        self.all_apps: list[CatalogApp] = []
+        self.identifiers: dict[str, CatalogApp] = {}
+        self.by_id: dict[str, CatalogApp] = {}
+        self.by_name: dict[str, CatalogApp] = {}
+        self.by_window_class: dict[str, CatalogApp] = {}
+        self.by_executable: dict[str, CatalogApp] = {}
+        self.by_startup_wm_class: dict[str, CatalogApp] = {}
+
+        self.load()
+        for apps_dir in self.dirs:
+            self._watch_tree(apps_dir)
+
+    # Loading
+
+    def load(self):
+        cached = self._read_cache()
+        cached_entries = cached.get("entries", {})
+        cached_mtimes = cached.get("dirs", {})
+        reused = 0
+        for apps_dir in self.dirs:
+            current = self._tree_mtimes(apps_dir)
+            entries = cached_entries.get(apps_dir)
+            # Compared as a whole, so directories that appeared or vanished
+            # since (including `apps_dir` itself) are a miss too.
+            cached_tree = {
+                path: mtime
+                for path, mtime in cached_mtimes.items()
+                if self._apps_dir_of(path) == apps_dir
+            }
+            if entries is not None and current == cached_tree:
+                self._entries[apps_dir] = entries
+                self._dir_mtimes.update(current)
+                reused += 1
+            else:
+                self._entries[apps_dir] = entries or {}
+                self._scan(apps_dir)
+        self._rebuild()
+        logger.info(
+            f"{Colors.INFO}[DesktopCatalog] {len(self.apps)} applications, "
+            f"{reused}/{len(self.dirs)} directories from cache"
+        )
+        if reused != len(self.dirs):
+            self._write_cache()
+
+    def _read_cache(self) -> dict:
+        try:
+            with open(CACHE_PATH) as f:
+                cached = json.load(f)
+        except (OSError, ValueError):
+            return {}
+        if (
+            not isinstance(cached, dict)
+            or cached.get("version") != CACHE_VERSION
+            or cached.get("environment") != _environment_key()
+        ):
+            return {}
+        return cached
+
+    def _write_cache(self):
+        tmp_path = f"{CACHE_PATH}.tmp"
+        try:
+            os.makedirs(os.path.dirname(CACHE_PATH), exist_ok=True)
+            with open(tmp_path, "w") as f:
+                json.dump(
+                    {
+                        "version": CACHE_VERSION,
+                        "environment": _environment_key(),
+                        "dirs": self._dir_mtimes,
+                        "entries": self._entries,
+                    },
+                    f,
+                    separators=(",", ":"),
+                )
+            os.replace(tmp_path, CACHE_PATH)
+        except OSError as e:
+            logger.warning(f"{Colors.WARNING}[DesktopCatalog] Cache not saved: {e}")
+
+    @staticmethod
+    def _tree_mtimes(apps_dir: str) -> dict[str, int]:
+        mtimes = {}
+        for root, _, _ in os.walk(apps_dir):
+            try:
+                mtimes[root] = os.stat(root).st_mtime_ns
+            except OSError:
+                pass
+        return mtimes
+
+    def _scan(self, apps_dir: str) -> bool:
+        """Bring the entries of `apps_dir` up to date. Returns True if any changed."""
+        old = self._entries.get(apps_dir, {})
+        new = {}
+        for path in [p for p in self._dir_mtimes if self._apps_dir_of(p) == apps_dir]:
+            del self._dir_mtimes[path]
+        for root, _, files in os.walk(apps_dir):
+            try:
+                self._dir_mtimes[root] = os.stat(root).st_mtime_ns
+            except OSError:
+                continue
+            for file_name in files:
+                if not file_name.endswith(".desktop"):
+                    continue
+                path = os.path.join(root, file_name)
+                try:
+                    mtime = os.stat(path).st_mtime_ns
+                except OSError:
+                    continue
+                # Entries in subdirectories get ids like `kde-foo.desktop`.
+                app_id = os.path.relpath(path, apps_dir).replace("/", "-")
+                entry = old.get(app_id)
+                if entry is None or entry["path"] != path or entry["mtime"] != mtime:
+                    entry = parse_entry(path, mtime)
+                if entry is not None:
+                    new[app_id] = entry
+        self._entries[apps_dir] = new
+        return new != old
+
+    def _rebuild(self):
+        merged: dict[str, CatalogApp] = {}
+        shadowed: set[str] = set()
+        apps_by_path = {}
+        for apps_dir in self.dirs:
+            for app_id, entry in self._entries.get(apps_dir, {}).items():
+                # The first directory that has an id shadows the others,
+                # including with a `Hidden=true` entry that deletes it.
+                if app_id in merged or app_id in shadowed:
+                    continue
+                if entry.get("hidden"):
+                    shadowed.add(app_id)
+                    continue
+                key = (entry["path"], entry["mtime"])
+                app = self._apps_by_path.get(key) or CatalogApp(app_id, entry)
+                apps_by_path[key] = app
+                merged[app_id] = app
+        self._apps_by_path = apps_by_path
+
+        self.all_apps = sorted(
+            merged.values(), key=lambda app: (app.display_name or "").casefold()
+        )
+        self.apps = [app for app in self.all_apps if app.show]
+        self.by_id = merged
+
+        self.by_name = {}
+        self.by_window_class = {}
+        self.by_executable = {}
+        self.by_startup_wm_class = {}
+        self.identifiers = {}
+        for app in self.apps:
+            app_id = app.app_id.removesuffix(".desktop").lower()
+            names = [(app.name or "").lower(), (app.display_name or "").lower()]
+            wm_class = (app.window_class or "").lower()
+            executables = [
+                (app.executable or "").split("/")[-1].lower(),
+                _command_base(app.command_line),
+            ]
+            for name in names:
+                if name:
+                    self.by_name.setdefault(name, app)
+            if wm_class:
+                self.by_startup_wm_class.setdefault(wm_class, app)
+                self.by_window_class.setdefault(wm_class, app)
+            # Wayland clients usually report their desktop id as the class.
+            self.by_window_class.setdefault(app_id, app)
+            for executable in executables:
+                if executable:
+                    self.by_executable.setdefault(executable, app)
+            # Same precedence the widgets used to build their own maps with.
+            for key in (app_id, *names, wm_class, *executables):
+                if key:
+                    self.identifiers[key] = app
+
+    # Lookups
+
+    def get_apps(self, include_hidden: bool = False) -> list[CatalogApp]:
+        return self.all_apps if include_hidden else self.apps
+
+    def find(self, identifier: str) -> CatalogApp | None:
+        """Find an app by desktop id, name, window class or executable."""
+        if not identifier:
+            return None
+        return self.identifiers.get(str(identifier).lower())
+
+    def find_by_name(self, name: str) -> CatalogApp | None:
+        return self.by_name.get((name or "").lower())
+
+    def find_by_window_class(self, window_class: str) -> CatalogApp | None:
+        return self.by_window_class.get((window_class or "").lower())
+
+    def find_by_executable(self, executable: str) -> CatalogApp | None:
+        return self.by_executable.get((executable or "").split("/")[-1].lower())
+
+    def find_by_startup_wm_class(self, wm_class: str) -> CatalogApp | None:
+        return self.by_startup_wm_class.get((wm_class or "").lower())
+
+    # Monitoring
+
+    def _apps_dir_of(self, path: str) -> str | None:
+        for apps_dir in self.dirs:
+            if path == apps_dir or path.startswith(f"{apps_dir}/"):
+                return apps_dir
+        return None
+
+    @staticmethod
+    def _nearest_existing_parent(path: str) -> str:
+        parent = os.path.dirname(path)
+        while parent != os.path.dirname(parent) and not os.path.isdir(parent):
+            parent = os.path.dirname(parent)
+        return parent
+
+    def _watch_tree(self, apps_dir: str):
+        if not os.path.isdir(apps_dir):
+            # Watch the closest parent that exists, to notice it being created.
+            self._watch(self._nearest_existing_parent(apps_dir))
+            return
+        for root, _, _ in os.walk(apps_dir):
+            self._watch(root)
+
+    def _watch(self, path: str):
+        if path in self._monitors:
+            return
+        try:
+            monitor = Gio.File.new_for_path(path).monitor_directory(
+                Gio.FileMonitorFlags.WATCH_MOVES, None
+            )
+        except GLib.Error as e:
+            logger.warning(f"{Colors.WARNING}[DesktopCatalog] Cannot watch {path}: {e}")
+            return
+        monitor.connect("changed", self._on_dir_changed)
+        self._monitors[path] = monitor
+
+    def _on_dir_changed(self, _monitor, file, other_file, event_type):
+        if event_type in (
+            Gio.FileMonitorEvent.CHANGED,
+            Gio.FileMonitorEvent.ATTRIBUTE_CHANGED,
+        ):
+            # Wait for CHANGES_DONE_HINT instead of rescanning mid-write.
+            return
+        for changed in (file, other_file):
+            path = changed.get_path() if changed is not None else None
+            if not path:
+                continue
+            apps_dir = self._apps_dir_of(path)
+            if apps_dir is not None:
+                self._dirty.add(apps_dir)
+            else:
+                # A parent of a missing apps dir, watched by `_watch_tree`.
+                self._dirty.update(d for d in self.dirs if d.startswith(f"{path}/"))
+        if self._dirty and self._rescan_id is None:
+            self._rescan_id = GLib.timeout_add(RESCAN_DELAY_MS, self._rescan)
+
+    def _rescan(self):
+        self._rescan_id = None
+        dirty, self._dirty = self._dirty, set()
+        changed = False
+        for apps_dir in dirty:
+            changed |= self._scan(apps_dir)
+            self._watch_tree(apps_dir)
+        parents = {
+            self._nearest_existing_parent(apps_dir)
+            for apps_dir in self.dirs
+            if not os.path.isdir(apps_dir)
+        }
+        for path in [
+            p
+            for p in self._monitors
+            if not os.path.isdir(p) or (self._apps_dir_of(p) is None and p not in parents)
+        ]:
+            self._monitors.pop(path).cancel()
+        if changed:
+            self._rebuild()
+            self._write_cache()
+            logger.info(
+                f"{Colors.INFO}[DesktopCatalog] Updated, {len(self.apps)} applications"
+            )
+            self.emit("changed")
+        return False
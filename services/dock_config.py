@@ -0,0 +1,148 @@
+import copy
+import hashlib
+import json
+
+from fabric.core.service import Service, Signal
+from fabric.utils import get_relative_path
+from gi.repository import Gio, GLib
+from loguru import logger
+
+from services.desktop_catalog import DesktopCatalog
+from utils.colors import Colors
+
+CONFIG_PATH = get_relative_path("../config/dock.json")
+
+# Editors save in several steps; parse once the file has settled.
+RELOAD_DELAY_MS = 200
+
+
+def migrate_pins(config: dict) -> dict:
+    """Turn legacy pins (plain desktop app names) into app data dicts."""
+    pinned = config.get("pinned_apps")
+    if not pinned or not isinstance(pinned[0], str):
+        return config
+
+    catalog = DesktopCatalog.get_initial()
+    app_map = {app.name: app for app in catalog.get_apps() if app.name}
+    config["pinned_apps"] = []
+    for app_id in pinned:
+        app = app_map.get(app_id)
+        if app:
+            config["pinned_apps"].append(
+                {
+                    "name": app.name,
+                    "display_name": app.display_name,
+                    "window_class": app.window_class,
+                    "executable": app.executable,
+                    "command_line": app.command_line,
+                }
+            )
+        else:
+            config["pinned_apps"].append({"name": app_id})
+    return config
+
+
+class DockConfig(Service):
+    """
+    Shared view of `config/dock.json`.
+
+    The file is watched with a file monitor and parsed only when its content
+    actually changed (by hash), after a short debounce. Every dock listens to
+    `changed`, so nothing polls the file while it is left alone.
+    """
+
+    instance = None
+
+    @staticmethod
+    def get_initial():
+        if DockConfig.instance is None:
+            DockConfig.instance = DockConfig()
+
+        return DockConfig.instance
+
+    @Signal
+    def changed(self) -> None:
+        """Signal emitted after the configuration was changed on disk or saved."""
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.path = CONFIG_PATH
+        self.config: dict = {"pinned_apps": []}
+        self._digest = None
+        self._reload_id = None
+        self._read()
+
+        self._monitor = Gio.File.new_for_path(self.path).monitor_file(
+            Gio.FileMonitorFlags.WATCH_MOVES, None
+        )
+        self._monitor.connect("changed", self._on_file_changed)
+
+    def get_config(self) -> dict:
+        """A copy of the configuration the caller is free to modify."""
+        return copy.deepcopy(self.config)
+
+    def _read(self) -> bool:
+        """Parse the file if its content changed. Returns True if it did."""
+        try:
+            with open(self.path, "rb") as f:
+                raw = f.read()
+        except FileNotFoundError:
+            raw = b""
+        except OSError as e:
+            logger.error(f"{Colors.ERROR}[DockConfig] Failed to read {self.path}: {e}")
+            return False
+
+        digest = hashlib.sha1(raw).hexdigest()
+        if digest == self._digest:
+            return False
+
+        if raw:
+            try:
+                config = json.loads(raw)
+            except json.JSONDecodeError as e:
+                # Most likely caught mid-write; the next event brings the rest.
+                logger.warning(f"{Colors.WARNING}[DockConfig] Ignoring invalid JSON: {e}")
+                return False
+        else:
+            config = {"pinned_apps": []}
+        self._digest = digest
+        self.config = migrate_pins(config)
+        return True
+
+    def reload(self):
+        """Re-read the file now instead of waiting for the file monitor."""
+        if self._reload_id is not None:
+            GLib.source_remove(self._reload_id)
+            self._reload_id = None
+        if self._read():
+            self.emit("changed")
+
+    def _on_file_changed(self, _monitor, _file, _other_file, event_type):
+        if event_type in (
+            Gio.FileMonitorEvent.CHANGED,
+            Gio.FileMonitorEvent.ATTRIBUTE_CHANGED,
+        ):
+            return
+        if self._reload_id is not None:
+            GLib.source_remove(self._reload_id)
+        self._reload_id = GLib.timeout_add(RELOAD_DELAY_MS, self._on_reload_timeout)
+
+    def _on_reload_timeout(self):
+        self._reload_id = None
+        self.reload()
+        return False
+
+    def save(self, config: dict) -> bool:
+        """Write `config` to the file and notify every dock."""
+        raw = json.dumps(config, indent=4).encode()
+        try:
+            with open(self.path, "wb") as f:
+                f.write(raw)
+        except OSError as e:
+            logger.error(f"{Colors.ERROR}[DockConfig] Failed to write dock config: {e}")
+            return False
+        # The monitor will report this write; the hash makes that a no-op.
+        self._digest = hashlib.sha1(raw).hexdigest()
+        self.config = copy.deepcopy(config)
+        self.emit("changed")
+        return True
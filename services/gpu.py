@@ -0,0 +1,346 @@
+import glob
+import json
+import os
+import subprocess
+
+from gi.repository import Gio, GLib
+from loguru import logger
+
+import utils.functions as helpers
+from utils.colors import Colors
+
+DRM_GLOB = "/sys/class/drm/card[0-9]*/device"
+NVIDIA_PROC_GLOB = "/proc/driver/nvidia/gpus/*/information"
+# nvidia-smi is restarted after it exits, waiting twice as long each time
+# it exits again without printing a sample, up to this many seconds.
+NVIDIA_SMI_RESTART_MAX = 60
+
+
+def _read_text(path: str) -> str | None:
+    try:
+        with open(path) as f:
+            return f.read().strip()
+    except OSError:
+        return None
+
+
+class GpuReader:
+    """
+    Source of per-device GPU utilization (0-100).
+
+    `names` lists the devices known so far and `read()` returns the latest
+    utilization for each of them. `read()` is called on the main loop once
+    per metrics tick, so it must never block on a child process.
+    """
+
+    backend = "none"
+
+    def __init__(self):
+        self.names: list[str] = []
+
+    def start(self):
+        pass
+
+    def stop(self):
+        pass
+
+    def read(self) -> list[int]:
+        return []
+
+
+class SysfsGpuReader(GpuReader):
+    """Reads `gpu_busy_percent` exposed by the amdgpu (and compatible) DRM drivers."""
+
+    backend = "sysfs"
+
+    def __init__(self, devices: list[str] | None = None):
+        super().__init__()
+        self.devices = devices if devices is not None else self.probe()
+        self.names = [self._device_name(device) for device in self.devices]
+
+    @staticmethod
+    def probe() -> list[str]:
+        return sorted(
+            device
+            for device in glob.glob(DRM_GLOB)
+            if os.path.exists(os.path.join(device, "gpu_busy_percent"))
+        )
+
+    @staticmethod
+    def _device_name(device: str) -> str:
+        name = _read_text(os.path.join(device, "product_name"))
+        if name:
+            return name
+        for hwmon in sorted(glob.glob(os.path.join(device, "hwmon", "hwmon*"))):
+            name = _read_text(os.path.join(hwmon, "name"))
+            if name:
+                return name
+        return os.path.basename(os.path.dirname(device))
+
+    def read(self) -> list[int]:
+        values = []
+        for device in self.devices:
+            value = _read_text(os.path.join(device, "gpu_busy_percent"))
+            try:
+                values.append(int(value))
+            except (TypeError, ValueError):
+                values.append(0)
+        return values
+
+
+class NvidiaSmiGpuReader(GpuReader):
+    """
+    Keeps one `nvidia-smi --loop` child alive and parses its CSV output line by
+    line as it arrives, so a sample costs a pipe read instead of a spawn.
+    """
+
+    backend = "nvidia-smi"
+
+    def __init__(self, interval: int = 1):
+        super().__init__()
+        self.interval = interval
+        self.names = [
+            line.split(":", 1)[1].strip()
+            for path in sorted(glob.glob(NVIDIA_PROC_GLOB))
+            for line in (_read_text(path) or "").splitlines()
+            if line.startswith("Model:")
+        ]
+        self._values: dict[int, int] = {}
+        self._process = None
+        self._stream = None
+        self._cancellable = None
+        self._restart_delay = 1
+        self._restart_id = None
+
+    @staticmethod
+    def available() -> bool:
+        return helpers.executable_exists("nvidia-smi")
+
+    def start(self):
+        if self._process is not None:
+            return
+        try:
+            self._process = Gio.Subprocess.new(
+                [
+                    "nvidia-smi",
+                    "--query-gpu=index,name,utilization.gpu",
+                    "--format=csv,noheader,nounits",
+                    f"--loop={self.interval}",
+                ],
+                Gio.SubprocessFlags.STDOUT_PIPE | Gio.SubprocessFlags.STDERR_SILENCE,
+            )
+        except GLib.Error as e:
+            logger.error(f"{Colors.ERROR}[GPU] Failed to start nvidia-smi: {e}")
+            self._process = None
+            self._schedule_restart()
+            return
+        self._cancellable = Gio.Cancellable()
+        self._stream = Gio.DataInputStream.new(self._process.get_stdout_pipe())
+        self._read_next_line()
+
+    def stop(self):
+        if self._restart_id is not None:
+            GLib.source_remove(self._restart_id)
+            self._restart_id = None
+        if self._cancellable is not None:
+            self._cancellable.cancel()
+        if self._process is not None:
+            self._process.force_exit()
+        self._process = None
+        self._stream = None
+        self._cancellable = None
+
+    def _schedule_restart(self):
+        if self._restart_id is not None:
+            return
+        logger.warning(
+            f"{Colors.WARNING}[GPU] Restarting nvidia-smi in {self._restart_delay} s"
+        )
+        self._restart_id = GLib.timeout_add_seconds(self._restart_delay, self._on_restart)
+        self._restart_delay = min(self._restart_delay * 2, NVIDIA_SMI_RESTART_MAX)
+
+    def _on_restart(self):
+        self._restart_id = None
+        self.start()
+        return False
+
+    def _read_next_line(self):
+        self._stream.read_line_async(
+            GLib.PRIORITY_LOW, self._cancellable, self._on_line
+        )
+
+    def _on_line(self, stream, result):
+        try:
+            line, _ = stream.read_line_finish_utf8(result)
+        except GLib.Error as e:
+            if e.matches(Gio.io_error_quark(), Gio.IOErrorEnum.CANCELLED):
+                return
+            logger.error(f"{Colors.ERROR}[GPU] nvidia-smi stream failed: {e}")
+            line = None
+        if line is None:
+            logger.warning(f"{Colors.WARNING}[GPU] nvidia-smi exited")
+            self.stop()
+            self._values = {}
+            self._schedule_restart()
+            return
+        if self.parse_line(line):
+            self._restart_delay = 1
+        self._read_next_line()
+
+    def parse_line(self, line: str) -> bool:
+        """Take one sample line; False if it was not one."""
+        # INDEX, NAME, UTILIZATION
+        parts = [part.strip() for part in line.split(",")]
+        if len(parts) < 3:
+            return False
+        try:
+            index = int(parts[0])
+        except ValueError:
+            return False
+        name = ",".join(parts[1:-1])
+        while len(self.names) <= index:
+            self.names.append(name)
+        self.names[index] = name
+        try:
+            self._values[index] = int(float(parts[-1]))
+        except ValueError:
+            self._values[index] = 0
+        return True
+
+    def read(self) -> list[int]:
+        return [self._values.get(i, 0) for i in range(len(self.names))]
+
+
+class NvtopGpuReader(GpuReader):
+    """
+    Last-resort reader for drivers that only nvtop understands. `nvtop -s`
+    has no streaming mode, so snapshots are taken on a worker thread at a
+    reduced rate and `read()` returns the latest one.
+    """
+
+    backend = "nvtop"
+
+    def __init__(self, interval: int = 5):
+        super().__init__()
+        self.interval = interval
+        self._values: list[int] = []
+        self._running = False
+        self._timer_id = None
+
+    @staticmethod
+    def available() -> bool:
+        return helpers.executable_exists("nvtop")
+
+    def start(self):
+        if self._timer_id is None:
+            self._snapshot()
+            self._timer_id = GLib.timeout_add_seconds(self.interval, self._snapshot)
+
+    def stop(self):
+        if self._timer_id is not None:
+            GLib.source_remove(self._timer_id)
+            self._timer_id = None
+
+    def _snapshot(self):
+        if not self._running:
+            self._running = True
+            GLib.Thread.new("nvtop-thread", lambda _: self._run_nvtop(), None)
+        return True
+
+    def _run_nvtop(self):
+        try:
+            output = subprocess.check_output(["nvtop", "-s"], text=True, timeout=10)
+            info = json.loads(output)
+        except (
+            OSError,
+            subprocess.SubprocessError,
+            json.JSONDecodeError,
+        ) as e:
+            logger.error(f"{Colors.ERROR}[GPU] nvtop snapshot failed: {e}")
+            info = []
+        GLib.idle_add(self._apply, info)
+
+    def _apply(self, info):
+        try:
+            self.names = [v.get("device_name") or "GPU" for v in info]
+            self._values = [
+                int(v["gpu_util"].strip("%")) if v.get("gpu_util") else 0
+                for v in info
+            ]
+        except (AttributeError, KeyError, TypeError, ValueError) as e:
+            logger.error(f"{Colors.ERROR}[GPU] Failed parsing nvtop JSON: {e}")
+            self.names, self._values = [], []
+        self._running = False
+        return False
+
+    def read(self) -> list[int]:
+        return list(self._values)
+
+
+class FakeGpuReader(GpuReader):
+    """Reader returning fixed (or scripted) values, for testing the widgets."""
+
+    backend = "fake"
+
+    def __init__(self, names: list[str], samples: list[list[int]] | None = None):
+        super().__init__()
+        self.names = list(names)
+        self._samples = samples or [[0] * len(names)]
+        self._index = 0
+
+    def read(self) -> list[int]:
+        sample = self._samples[self._index % len(self._samples)]
+        self._index += 1
+        return list(sample)
+
+
+class CombinedGpuReader(GpuReader):
+    """Devices of several readers side by side, e.g. an AMD iGPU and an NVIDIA dGPU."""
+
+    def __init__(self, readers: list[GpuReader]):
+        super().__init__()
+        self.readers = readers
+        self.backend = "+".join(reader.backend for reader in readers)
+
+    def start(self):
+        for reader in self.readers:
+            reader.start()
+
+    def stop(self):
+        for reader in self.readers:
+            reader.stop()
+
+    def read(self) -> list[int]:
+        # Readers can learn their devices late (nvidia-smi names them in its
+        # output), so the names are collected along with every sample.
+        names, values = [], []
+        for reader in self.readers:
+            sample = reader.read()
+            names += reader.names
+            # Pad or trim, so values stay aligned with `names`.
+            values += sample[: len(reader.names)] + [0] * (len(reader.names) - len(sample))
+        self.names = names
+        return values
+
+
+def select_gpu_reader() -> GpuReader:
+    """
+    Pick the cheapest readers that work on this machine: sysfs for the DRM
+    devices that expose it and nvidia-smi for NVIDIA cards, together when a
+    machine has both, or nvtop when neither is available.
+    """
+    readers = []
+    if SysfsGpuReader.probe():
+        readers.append(SysfsGpuReader())
+    if NvidiaSmiGpuReader.available():
+        readers.append(NvidiaSmiGpuReader())
+    if not readers and NvtopGpuReader.available():
+        readers.append(NvtopGpuReader())
+    if not readers:
+        reader = GpuReader()
+    elif len(readers) == 1:
+        reader = readers[0]
+    else:
+        reader = CombinedGpuReader(readers)
+    logger.info(f"{Colors.INFO}[GPU] Using {reader.backend} reader")
+    return reader
@@ -0,0 +1,478 @@
+import json
+from typing import Callable
+
+from fabric.core.service import Service, Signal
+from fabric.hyprland.widgets import get_hyprland_connection
+from gi.repository import GLib
+from loguru import logger
+
+from utils.colors import Colors
+from utils.profiling import PROFILE_EVENTS
+
+# Events that may change window geometry. Hyprland does not report the new
+# sizes and positions, so the client list is re-read once per burst of them.
+LAYOUT_EVENTS = (
+    "openwindow",
+    "closewindow",
+    "movewindowv2",
+    "changefloatingmode",
+    "fullscreen",
+    "monitoradded",
+    "monitorremoved",
+    "createworkspacev2",
+    "destroyworkspacev2",
+    "moveworkspacev2",
+)
+
+
+# One frame at 60 Hz: long enough to merge the events of one user action.
+COALESCE_MS = 16
+# How often `--profile-events` logs the coalescing counters, in seconds.
+STATS_INTERVAL = 60
+
+
+def normalize_address(address: str) -> str:
+    """Return a window address in the `0x...` form used by `j/clients`."""
+    address = address.strip()
+    if not address:
+        return ""
+    return address if address.startswith("0x") else f"0x{address}"
+
+
+class CoalescedSubscription:
+    """
+    Collects the names of matching store events and hands them to `callback`
+    as one set, at most once per `window_ms`.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        events: set[str],
+        callback: Callable[[set[str]], None],
+        window_ms: int,
+    ):
+        self.name = name
+        self.events = events
+        self.callback = callback
+        self.window_ms = window_ms
+        self.pending: set[str] = set()
+        self.raw_events = 0
+        self.invocations = 0
+        self._source_id = None
+
+    def push(self, event_name: str):
+        if event_name not in self.events:
+            return
+        self.raw_events += 1
+        self.pending.add(event_name)
+        if self._source_id is None:
+            self._source_id = GLib.timeout_add(self.window_ms, self.flush)
+
+    def flush(self):
+        self._source_id = None
+        events, self.pending = self.pending, set()
+        if events:
+            self.invocations += 1
+            self.callback(events)
+        return False
+
+    def cancel(self):
+        if self._source_id is not None:
+            GLib.source_remove(self._source_id)
+            self._source_id = None
+        self.pending.clear()
+
+
+class HyprlandStateStore(Service):
+    """
+    In-process mirror of the compositor state (clients, workspaces, monitors).
+
+    The state is loaded once and then kept up to date from the event socket,
+    so widgets can query windows by address, workspace or class without
+    round-tripping the Hyprland socket.
+    """
+
+    instance = None
+
+    @staticmethod
+    def get_initial():
+        if HyprlandStateStore.instance is None:
+            HyprlandStateStore.instance = HyprlandStateStore()
+
+        return HyprlandStateStore.instance
+
+    @Signal
+    def changed(self, event: str) -> None:
+        """Signal emitted after an event has been applied to the store."""
+
+    @Signal
+    def ready(self) -> None:
+        """Signal emitted once the initial state has been loaded."""
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.conn = get_hyprland_connection()
+
+        self.clients: dict[str, dict] = {}
+        self.workspaces: dict[int, dict] = {}
+        self.monitors: dict[int, dict] = {}
+
+        self._by_workspace: dict[int, set[str]] = {}
+        self._by_class: dict[str, set[str]] = {}
+
+        self.active_address = ""
+        self.active_workspace_id = -1
+        self.focused_monitor = ""
+
+        self.is_ready = False
+        self._refresh_id = None
+        self._pending_events: list[str] = []
+        self._subscriptions: dict[int, CoalescedSubscription] = {}
+        self._next_handle = 1
+
+        handlers = {
+            "openwindow": self._on_open_window,
+            "closewindow": self._on_close_window,
+            "movewindowv2": self._on_move_window,
+            "activewindowv2": self._on_active_window,
+            "windowtitlev2": self._on_window_title,
+            "workspacev2": self._on_workspace,
+            "focusedmon": self._on_focused_monitor,
+            "createworkspacev2": self._on_create_workspace,
+            "destroyworkspacev2": self._on_destroy_workspace,
+            "changefloatingmode": self._on_layout_event,
+            "fullscreen": self._on_layout_event,
+            "monitoradded": self._on_layout_event,
+            "monitorremoved": self._on_layout_event,
+            "moveworkspacev2": self._on_layout_event,
+        }
+        for event_name, handler in handlers.items():
+            self.conn.connect(
+                f"event::{event_name}",
+                lambda _, event, name=event_name, handler=handler: handler(
+                    name, event.data
+                ),
+            )
+
+        if PROFILE_EVENTS:
+            GLib.timeout_add_seconds(STATS_INTERVAL, self.log_coalescing_stats)
+
+        if self.conn.ready:
+            self.load()
+        else:
+            self.conn.connect("event::ready", lambda *_: self.load())
+
+    # Loading
+
+    def _query(self, command: str):
+        try:
+            return json.loads(self.conn.send_command(command).reply.decode())
+        except (json.JSONDecodeError, AttributeError) as e:
+            logger.error(f"{Colors.ERROR}[HyprlandState] '{command}' failed: {e}")
+            return None
+
+    def load(self):
+        """Load the full compositor state. Called once at startup."""
+        self._load_monitors()
+        self._load_workspaces()
+        self._load_clients()
+
+        active_workspace = self._query("j/activeworkspace") or {}
+        self.active_workspace_id = active_workspace.get("id", -1)
+        self.focused_monitor = active_workspace.get("monitor", "")
+        active_window = self._query("j/activewindow") or {}
+        self.active_address = active_window.get("address", "")
+
+        self.is_ready = True
+        logger.info(
+            f"{Colors.INFO}[HyprlandState] Loaded {len(self.clients)} clients, "
+            f"{len(self.workspaces)} workspaces, {len(self.monitors)} monitors"
+        )
+        self.emit("ready")
+        self.emit("changed", "ready")
+
+    def _load_monitors(self):
+        monitors = self._query("j/monitors")
+        if monitors is not None:
+            self.monitors = {monitor["id"]: monitor for monitor in monitors}
+
+    def _load_workspaces(self):
+        workspaces = self._query("j/workspaces")
+        if workspaces is not None:
+            self.workspaces = {ws["id"]: ws for ws in workspaces}
+
+    def _load_clients(self):
+        clients = self._query("j/clients")
+        if clients is None:
+            return
+        self.clients = {}
+        self._by_workspace = {}
+        self._by_class = {}
+        for client in clients:
+            self._index_client(client)
+
+    # Indexes
+
+    def _index_client(self, client: dict):
+        address = client["address"]
+        self.clients[address] = client
+        self._by_workspace.setdefault(
+            client.get("workspace", {}).get("id", -1), set()
+        ).add(address)
+        for key in {client.get("class", ""), client.get("initialClass", "")}:
+            if key:
+                self._by_class.setdefault(key.lower(), set()).add(address)
+
+    def _unindex_client(self, address: str) -> dict | None:
+        client = self.clients.pop(address, None)
+        if client is None:
+            return None
+        ws_id = client.get("workspace", {}).get("id", -1)
+        self._by_workspace.get(ws_id, set()).discard(address)
+        for key in {client.get("class", ""), client.get("initialClass", "")}:
+            if key:
+                self._by_class.get(key.lower(), set()).discard(address)
+        return client
+
+    def _workspace_id_from_name(self, name: str) -> int:
+        for ws_id, ws in self.workspaces.items():
+            if ws.get("name") == name:
+                return ws_id
+        try:
+            return int(name)
+        except ValueError:
+            return -1
+
+    # Deltas
+
+    def _emit_changed(self, event_name: str):
+        self.emit("changed", event_name)
+        for subscription in list(self._subscriptions.values()):
+            subscription.push(event_name)
+
+    def _schedule_refresh(self, event_name: str):
+        """Re-read client geometry once for a burst of layout events."""
+        if event_name not in self._pending_events:
+            self._pending_events.append(event_name)
+        if self._refresh_id is None:
+            self._refresh_id = GLib.idle_add(self._refresh)
+
+    def _refresh(self):
+        self._refresh_id = None
+        pending = self._pending_events
+        self._pending_events = []
+
+        if {"monitoradded", "monitorremoved", "moveworkspacev2"} & set(pending):
+            self._load_monitors()
+        if {
+            "createworkspacev2",
+            "destroyworkspacev2",
+            "moveworkspacev2",
+        } & set(pending):
+            self._load_workspaces()
+        self._load_clients()
+
+        for event_name in pending:
+            self._emit_changed(event_name)
+        return False
+
+    def refresh_clients(self, event_name: str = "refresh"):
+        """
+        Re-read client geometry for changes Hyprland sends no event for
+        (resizing, dragging a floating window). `changed` is emitted with
+        `event_name` once the clients are reloaded.
+        """
+        self._schedule_refresh(event_name)
+
+    def _on_layout_event(self, event_name: str, _data: list[str]):
+        self._schedule_refresh(event_name)
+
+    def _on_open_window(self, event_name: str, data: list[str]):
+        # ADDRESS,WORKSPACENAME,WINDOWCLASS,WINDOWTITLE
+        if len(data) < 3:
+            return self._schedule_refresh(event_name)
+        address = normalize_address(data[0])
+        ws_name = data[1]
+        self._unindex_client(address)
+        self._index_client(
+            {
+                "address": address,
+                "mapped": True,
+                "workspace": {
+                    "id": self._workspace_id_from_name(ws_name),
+                    "name": ws_name,
+                },
+                "class": data[2],
+                "initialClass": data[2],
+                "title": ",".join(data[3:]),
+                "initialTitle": ",".join(data[3:]),
+            }
+        )
+        self._schedule_refresh(event_name)
+
+    def _on_close_window(self, event_name: str, data: list[str]):
+        address = normalize_address(data[0]) if data else ""
+        self._unindex_client(address)
+        if address == self.active_address:
+            self.active_address = ""
+        self._schedule_refresh(event_name)
+
+    def _on_move_window(self, event_name: str, data: list[str]):
+        # ADDRESS,WORKSPACEID,WORKSPACENAME
+        if len(data) < 3:
+            return self._schedule_refresh(event_name)
+        client = self._unindex_client(normalize_address(data[0]))
+        if client is not None:
+            try:
+                ws_id = int(data[1])
+            except ValueError:
+                ws_id = self._workspace_id_from_name(data[2])
+            client["workspace"] = {"id": ws_id, "name": ",".join(data[2:])}
+            self._index_client(client)
+        self._schedule_refresh(event_name)
+
+    def _on_active_window(self, event_name: str, data: list[str]):
+        self.active_address = normalize_address(data[0]) if data else ""
+        self._emit_changed(event_name)
+
+    def _on_window_title(self, event_name: str, data: list[str]):
+        # ADDRESS,TITLE
+        client = self.clients.get(normalize_address(data[0])) if data else None
+        if client is not None:
+            client["title"] = ",".join(data[1:])
+        self._emit_changed(event_name)
+
+    def _on_workspace(self, event_name: str, data: list[str]):
+        # WORKSPACEID,WORKSPACENAME
+        try:
+            self.active_workspace_id = int(data[0])
+        except (ValueError, IndexError):
+            return
+        for monitor in self.monitors.values():
+            if monitor.get("name") == self.focused_monitor:
+                monitor["activeWorkspace"] = {
+                    "id": self.active_workspace_id,
+                    "name": ",".join(data[1:]),
+                }
+        self._emit_changed(event_name)
+
+    def _on_focused_monitor(self, event_name: str, data: list[str]):
+        # MONITORNAME,WORKSPACENAME
+        if not data:
+            return
+        self.focused_monitor = data[0]
+        for monitor in self.monitors.values():
+            monitor["focused"] = monitor.get("name") == self.focused_monitor
+            if monitor["focused"]:
+                self.active_workspace_id = monitor.get("activeWorkspace", {}).get(
+                    "id", self.active_workspace_id
+                )
+        self._emit_changed(event_name)
+
+    def _on_create_workspace(self, event_name: str, data: list[str]):
+        # WORKSPACEID,WORKSPACENAME
+        try:
+            ws_id = int(data[0])
+        except (ValueError, IndexError):
+            return self._schedule_refresh(event_name)
+        self.workspaces.setdefault(ws_id, {"id": ws_id, "name": ",".join(data[1:])})
+        self._emit_changed(event_name)
+
+    def _on_destroy_workspace(self, event_name: str, data: list[str]):
+        try:
+            self.workspaces.pop(int(data[0]), None)
+        except (ValueError, IndexError):
+            return self._schedule_refresh(event_name)
+        self._emit_changed(event_name)
+
+    # Coalesced subscriptions
+
+    def subscribe(
+        self,
+        name: str,
+        events,
+        callback: Callable[[set[str]], None],
+        window_ms: int = COALESCE_MS,
+    ) -> int:
+        """
+        Call `callback(event_names)` once per burst of `events` instead of once
+        per event. `name` labels the subscription in `coalescing_stats()`.
+        Returns a handle for `unsubscribe`.
+        """
+        handle = self._next_handle
+        self._next_handle += 1
+        self._subscriptions[handle] = CoalescedSubscription(
+            name, set(events), callback, window_ms
+        )
+        return handle
+
+    def unsubscribe(self, handle: int):
+        subscription = self._subscriptions.pop(handle, None)
+        if subscription is not None:
+            subscription.cancel()
+
+    def coalescing_stats(self) -> dict[str, tuple[int, int]]:
+        """Raw events received and handler invocations, per subscription name."""
+        stats = {}
+        for subscription in self._subscriptions.values():
+            raw, calls = stats.get(subscription.name, (0, 0))
+            stats[subscription.name] = (
+                raw + subscription.raw_events,
+                calls + subscription.invocations,
+            )
+        return stats
+
+    def log_coalescing_stats(self):
+        if not self._subscriptions:
+            return True
+        lines = [f"{Colors.HEADER}[HyprlandState] raw events -> handler calls{Colors.RESET}"]
+        for name, (raw, calls) in sorted(self.coalescing_stats().items()):
+            lines.append(f"  {raw:6d} -> {calls:6d}  {name}")
+        logger.info("\n".join(lines))
+        return True
+
+    # Lookups
+
+    def get_clients(self) -> list[dict]:
+        return list(self.clients.values())
+
+    def get_client(self, address: str) -> dict | None:
+        return self.clients.get(normalize_address(address))
+
+    def get_workspace_clients(self, workspace_id: int) -> list[dict]:
+        return [
+            self.clients[address]
+            for address in self._by_workspace.get(workspace_id, ())
+            if address in self.clients
+        ]
+
+    def get_clients_by_class(self, window_class: str) -> list[dict]:
+        return [
+            self.clients[address]
+            for address in self._by_class.get(window_class.lower(), ())
+            if address in self.clients
+        ]
+
+    def get_active_window(self) -> dict:
+        return self.clients.get(self.active_address, {})
+
+    def get_active_workspace(self) -> dict:
+        return self.workspaces.get(
+            self.active_workspace_id, {"id": self.active_workspace_id}
+        )
+
+    def get_monitors(self) -> list[dict]:
+        return list(self.monitors.values())
+
+    def get_monitor(self, monitor_id: int) -> dict | None:
+        return self.monitors.get(monitor_id)
+
+    def get_monitor_by_name(self, name: str) -> dict | None:
+        for monitor in self.monitors.values():
+            if monitor.get("name") == name:
+                return monitor
+        return None
+
+    def get_focused_monitor(self) -> dict | None:
+        return self.get_monitor_by_name(self.focused_monitor)
@@ -0,0 +1,322 @@
+import json
+import os
+import re
+import time
+
+_WORD_RE = re.compile(r"[^\W_]+")
+
+# Match tiers, best first. The integer part of a score is the tier and the
+# fractional part is the frecency boost, so usage only reorders within a tier.
+TIER_PREFIX = 5  # a name starts with the query
+TIER_NAME_WORD = 4  # every query word starts a word of a name or the executable
+TIER_WORD = 3  # ... of the generic name, keywords or categories
+TIER_SUBSTRING = 2  # the query appears anywhere in the searchable text
+TIER_FUZZY = 1  # the query's characters appear in order in a name
+
+# Shorter queries would match almost everything as a subsequence.
+FUZZY_MIN_LENGTH = 3
+
+_EMPTY = frozenset()
+
+
+def _words(text: str) -> list[str]:
+    return _WORD_RE.findall(text)
+
+
+def app_key(app) -> str:
+    """Stable identifier for an application (its desktop file id when known)."""
+    app_id = getattr(app, "app_id", None)
+    if app_id is None:
+        info = getattr(app, "_app", None)
+        app_id = info.get_id() if info is not None and hasattr(info, "get_id") else None
+    return app_id or app.name or app.display_name or ""
+
+
+def _app_fields(app) -> tuple[list[str], list[str]]:
+    """Return (names, other searchable fields) of `app`, casefolded."""
+    keywords = getattr(app, "keywords", None)
+    categories = getattr(app, "categories", None)
+    info = getattr(app, "_app", None) if keywords is None else None
+    if info is not None:
+        if hasattr(info, "get_keywords"):
+            keywords = info.get_keywords()
+        if hasattr(info, "get_categories"):
+            categories = info.get_categories()
+    keywords = keywords or []
+    categories = (categories or "").replace(";", " ")
+
+    names = [
+        (app.display_name or "").casefold(),
+        (app.name or "").casefold(),
+        os.path.basename(app.executable or "").casefold(),
+    ]
+    others = [
+        (app.generic_name or "").casefold(),
+        " ".join(keywords).casefold(),
+        categories.casefold(),
+    ]
+    return [n for n in names if n], [o for o in others if o]
+
+
+class PrefixTrie:
+    """Maps every prefix of the inserted words to the ids of their documents."""
+
+    __slots__ = ("children", "ids")
+
+    def __init__(self):
+        self.children: dict[str, "PrefixTrie"] = {}
+        self.ids: set[int] = set()
+
+    def insert(self, word: str, doc_id: int):
+        node = self
+        for char in word:
+            child = node.children.get(char)
+            if child is None:
+                child = node.children[char] = PrefixTrie()
+            child.ids.add(doc_id)
+            node = child
+
+    def lookup(self, prefix: str) -> set[int]:
+        node = self
+        for char in prefix:
+            node = node.children.get(char)
+            if node is None:
+                return _EMPTY
+        return node.ids
+
+
+class FrecencyStore:
+    """Launch counts that decay with a one-week half-life, persisted as JSON."""
+
+    HALF_LIFE = 7 * 24 * 3600
+
+    def __init__(self, path: str):
+        self.path = path
+        self._entries: dict[str, list[float]] = {}
+        try:
+            with open(path) as f:
+                self._entries = {
+                    key: [float(value[0]), float(value[1])]
+                    for key, value in json.load(f).items()
+                }
+        except (OSError, ValueError, TypeError, IndexError):
+            self._entries = {}
+
+    def score(self, key: str, now: float | None = None) -> float:
+        entry = self._entries.get(key)
+        if entry is None:
+            return 0.0
+        now = time.time() if now is None else now
+        return entry[0] * 0.5 ** ((now - entry[1]) / self.HALF_LIFE)
+
+    def boost(self, key: str, now: float | None = None) -> float:
+        """Frecency squashed into [0, 1) so it never crosses a match tier."""
+        score = self.score(key, now)
+        return score / (score + 1.0)
+
+    def record(self, key: str):
+        now = time.time()
+        self._entries[key] = [self.score(key, now) + 1.0, now]
+        self.save()
+
+    def save(self):
+        tmp_path = f"{self.path}.tmp"
+        try:
+            with open(tmp_path, "w") as f:
+                json.dump(self._entries, f)
+            os.replace(tmp_path, self.path)
+        except OSError:
+            pass
+
+
+class AppSearchIndex:
+    """
+    Search index over desktop applications.
+
+    Names, generic names, keywords, executables and categories are tokenized
+    once into prefix tries, character and trigram postings. Each query is
+    ranked prefix > word start > substring > subsequence, with frecency
+    breaking ties, and a query that extends the previous one only re-checks
+    the previous matches instead of every application.
+    """
+
+    def __init__(self, frecency: FrecencyStore | None = None):
+        self.frecency = frecency
+        self.apps: list = []
+        self._signature = None
+        self._reset_query()
+
+    def _reset_query(self):
+        self._last_query: str | None = None
+        self._last_pool: set[int] | None = None
+
+    def rebuild(self, apps) -> bool:
+        """Index `apps`. Returns False when they are unchanged since the last call."""
+        signature = tuple(
+            (app.name, app.display_name, app.generic_name, app.executable)
+            for app in apps
+        )
+        if signature == self._signature:
+            return False
+        self._signature = signature
+
+        self.apps = list(apps)
+        self._names: list[list[str]] = []
+        self._name_texts: list[str] = []
+        self._haystacks: list[str] = []
+        self._name_words = PrefixTrie()
+        self._other_words = PrefixTrie()
+        self._chars: dict[str, set[int]] = {}
+        self._name_chars: dict[str, set[int]] = {}
+        self._trigrams: dict[str, set[int]] = {}
+
+        for doc_id, app in enumerate(self.apps):
+            names, others = _app_fields(app)
+            haystack = " ".join(names + others)
+            self._names.append(names)
+            # One line per name, so a fuzzy match never spans two of them.
+            self._name_texts.append("\n".join(names))
+            self._haystacks.append(haystack)
+            for word in {w for name in names for w in _words(name)}:
+                self._name_words.insert(word, doc_id)
+            for word in {w for other in others for w in _words(other)}:
+                self._other_words.insert(word, doc_id)
+            for char in set(haystack):
+                self._chars.setdefault(char, set()).add(doc_id)
+            for char in set(self._name_texts[-1]):
+                self._name_chars.setdefault(char, set()).add(doc_id)
+            for i in range(len(haystack) - 2):
+                self._trigrams.setdefault(haystack[i : i + 3], set()).add(doc_id)
+
+        self._chars = {char: frozenset(ids) for char, ids in self._chars.items()}
+        self._name_chars = {
+            char: frozenset(ids) for char, ids in self._name_chars.items()
+        }
+        self._trigrams = {tri: frozenset(ids) for tri, ids in self._trigrams.items()}
+        self._alphabetical = sorted(
+            range(len(self.apps)),
+            key=lambda doc_id: (self.apps[doc_id].display_name or "").casefold(),
+        )
+        self._rank = [0] * len(self.apps)
+        for rank, doc_id in enumerate(self._alphabetical):
+            self._rank[doc_id] = rank
+        self.refresh_frecency()
+        self._reset_query()
+        return True
+
+    def refresh_frecency(self):
+        now = time.time()
+        self._boost = [
+            self.frecency.boost(app_key(app), now) if self.frecency else 0.0
+            for app in self.apps
+        ]
+        self._boosted = frozenset(
+            doc_id for doc_id, boost in enumerate(self._boost) if boost
+        )
+
+    def record_launch(self, app):
+        if self.frecency is None:
+            return
+        self.frecency.record(app_key(app))
+        self.refresh_frecency()
+
+    def _candidates(self, query: str) -> frozenset[int] | set[int]:
+        if (
+            self._last_pool is not None
+            and self._last_query
+            and query.startswith(self._last_query)
+        ):
+            # Every way of matching is monotonic: anything matching the longer
+            # query also matched (or was a candidate for) the shorter one.
+            return self._last_pool
+        candidates = None
+        for char in set(query) - {" "}:
+            postings = self._chars.get(char, _EMPTY)
+            candidates = postings if candidates is None else candidates & postings
+            if not candidates:
+                return _EMPTY
+        return candidates if candidates is not None else frozenset(range(len(self.apps)))
+
+    def _word_matches(self, trie: PrefixTrie, words: list[str], candidates) -> set:
+        matches = candidates
+        for word in words:
+            matches = matches & trie.lookup(word)
+            if not matches:
+                return _EMPTY
+        return matches if words else _EMPTY
+
+    def _substring_matches(self, query: str, candidates) -> set:
+        if len(query) == 1:
+            # The candidates were filtered on the query's characters already.
+            return candidates
+        pool = candidates
+        for i in range(len(query) - 2):
+            pool = pool & self._trigrams.get(query[i : i + 3], _EMPTY)
+            if not pool:
+                return _EMPTY
+        haystacks = self._haystacks
+        return {doc_id for doc_id in pool if query in haystacks[doc_id]}
+
+    def _ordered(self, ids) -> list[int]:
+        """`ids` by frecency, then alphabetically."""
+        rank = self._rank
+        boosted = ids & self._boosted
+        if not boosted:
+            return sorted(ids, key=rank.__getitem__)
+        boost = self._boost
+        return sorted(
+            boosted, key=lambda doc_id: (-boost[doc_id], rank[doc_id])
+        ) + sorted(ids - boosted, key=rank.__getitem__)
+
+    def search(self, query: str) -> list:
+        """Return the applications matching `query`, best first."""
+        query = query.casefold().strip()
+        if not query:
+            self._reset_query()
+            return [self.apps[doc_id] for doc_id in self._alphabetical]
+
+        candidates = self._candidates(query)
+        words = _words(query)
+        name_word = self._word_matches(self._name_words, words, candidates)
+        other_word = (
+            self._word_matches(self._other_words, words, candidates) - name_word
+        )
+        substring = (
+            self._substring_matches(query, candidates) - name_word - other_word
+        )
+        fuzzy = _EMPTY
+        if len(query) >= FUZZY_MIN_LENGTH:
+            rest = candidates - name_word - other_word - substring
+            for char in set(query) - {" "}:
+                rest = rest & self._name_chars.get(char, _EMPTY)
+            if rest:
+                search = re.compile(
+                    ".*?".join(map(re.escape, query.replace(" ", "")))
+                ).search
+                name_texts = self._name_texts
+                fuzzy = {doc_id for doc_id in rest if search(name_texts[doc_id])}
+
+        names = self._names
+        prefix = {
+            doc_id
+            for doc_id in name_word
+            if any(name.startswith(query) for name in names[doc_id])
+        }
+        ranked = []
+        for ids in (
+            prefix,
+            name_word - prefix,
+            other_word,
+            substring,
+            fuzzy,
+        ):
+            if ids:
+                ranked.extend(self._ordered(ids))
+
+        self._last_query = query
+        # Below the fuzzy threshold a longer query may still match candidates
+        # that were not matched yet, so keep narrowing from the candidates.
+        self._last_pool = (
+            set(ranked) if len(query) >= FUZZY_MIN_LENGTH else candidates
+        )
+        return [self.apps[doc_id] for doc_id in ranked]
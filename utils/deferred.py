@@ -0,0 +1,49 @@
+import importlib
+import sys
+import threading
+import types
+
+
+class DeferredModule(types.ModuleType):
+    """
+    Stand-in for a module that is imported the first time one of its
+    attributes is used. Lets a component name a heavy dependency at the top
+    of its file without paying for it when the component is disabled.
+    """
+
+    def __init__(self, name: str):
+        super().__init__(name)
+        self.__dict__["_deferred_module"] = None
+        self.__dict__["_deferred_lock"] = threading.Lock()
+
+    def _load(self):
+        module = self.__dict__["_deferred_module"]
+        if module is None:
+            # Widgets fetch from worker threads, so the first use may race.
+            with self.__dict__["_deferred_lock"]:
+                module = self.__dict__["_deferred_module"]
+                if module is None:
+                    module = importlib.import_module(self.__name__)
+                    self.__dict__["_deferred_module"] = module
+        return module
+
+    def __getattr__(self, attr: str):
+        return getattr(self._load(), attr)
+
+    def __dir__(self):
+        return dir(self._load())
+
+    @property
+    def is_loaded(self) -> bool:
+        return self.__dict__["_deferred_module"] is not None
+
+
+def deferred_import(name: str):
+    """
+    Return module `name`, or a `DeferredModule` standing in for it when it has
+    not been imported yet. Use it as `requests = deferred_import("requests")`.
+    """
+    module = sys.modules.get(name)
+    if module is not None:
+        return module
+    return DeferredModule(name)
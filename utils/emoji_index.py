@@ -0,0 +1,178 @@
+import json
+import mmap
+import os
+import struct
+
+from loguru import logger
+
+import config.data as data
+from utils.colors import Colors
+
+INDEX_PATH = f"{data.CACHE_DIR}/emoji_index.bin"
+INDEX_MAGIC = b"EMJI"
+INDEX_VERSION = 2
+
+# magic, version, source mtime (ns) and size, emoji count, then the byte
+# offsets of the three sections below.
+HEADER = struct.Struct("<4sIqqI3I")
+
+# Emoji fields kept in the string table, in this order per emoji.
+FIELDS = ("char", "name", "group")
+
+# Ends every emoji's text in the search blob; no name or group contains it.
+SEPARATOR = "\n"
+
+
+def search_text(info: dict) -> str:
+    """The text a query must be a substring of, as the picker always matched."""
+    return f"{info.get('name', '')} {info.get('group', '')}".casefold()
+
+
+def _align(blob: bytearray):
+    blob.extend(b"\0" * (-len(blob) % 4))
+
+
+def build_index(source_path: str, index_path: str = INDEX_PATH):
+    """
+    Compile `emoji.json` into the binary index read by `EmojiIndex`.
+
+    Layout (little endian, every section 4-byte aligned):
+      - `HEADER`
+      - string offsets: u32 x (3 * count + 1), into the string blob
+      - string blob: the UTF-8 char, name and group of every emoji
+      - text blob: the UTF-8 casefolded `search_text` of every emoji, in
+        file order, each followed by `SEPARATOR`
+    """
+    stat = os.stat(source_path)
+    with open(source_path, "rb") as f:
+        emojis = json.load(f)
+
+    strings = bytearray()
+    string_offsets = [0]
+    texts = bytearray()
+    for char, info in emojis.items():
+        info = {"char": char, **info}
+        for field in FIELDS:
+            strings += str(info.get(field, "")).encode("utf-8")
+            string_offsets.append(len(strings))
+        texts += (search_text(info).replace(SEPARATOR, " ") + SEPARATOR).encode("utf-8")
+
+    body = bytearray()
+    sections = []
+    for fmt, values in (
+        ("I", string_offsets),
+        (None, strings),
+        (None, texts),
+    ):
+        sections.append(HEADER.size + len(body))
+        body += struct.pack(f"<{len(values)}{fmt}", *values) if fmt else values
+        _align(body)
+
+    header = HEADER.pack(
+        INDEX_MAGIC, INDEX_VERSION, stat.st_mtime_ns, stat.st_size,
+        len(emojis), *sections,
+    )
+    os.makedirs(os.path.dirname(index_path), exist_ok=True)
+    tmp_path = f"{index_path}.{os.getpid()}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(header)
+        f.write(body)
+    os.replace(tmp_path, index_path)
+
+
+class EmojiIndex:
+    """
+    Searchable emoji table, memory-mapped from the compiled index of
+    `assets/emoji.json` (see `build_index`).
+
+    The index is rebuilt whenever the JSON's mtime or size differs from the
+    one it was built from. Strings are decoded only for the emojis shown.
+    A search keeps the picker's substring matching on name and group, but
+    tests the query against texts casefolded when the index was built
+    (decoded once, on the first search) instead of building and casefolding
+    a string per emoji on every keystroke.
+    """
+
+    instance = None
+
+    @staticmethod
+    def get_initial(source_path: str):
+        if EmojiIndex.instance is None:
+            EmojiIndex.instance = EmojiIndex(source_path)
+
+        return EmojiIndex.instance
+
+    def __init__(self, source_path: str, index_path: str = INDEX_PATH):
+        self.source_path = source_path
+        self.index_path = index_path
+        self.count = 0
+        self._map = None
+        self._open()
+
+    def _open(self):
+        try:
+            stat = os.stat(self.source_path)
+        except OSError as e:
+            logger.error(f"{Colors.ERROR}[Emoji] Cannot read {self.source_path}: {e}")
+            return
+        if not self._map_index(stat):
+            try:
+                build_index(self.source_path, self.index_path)
+            except (OSError, ValueError) as e:
+                logger.error(f"{Colors.ERROR}[Emoji] Failed to build the emoji index: {e}")
+                return
+            logger.info(f"[Emoji] Built emoji index at {self.index_path}")
+            self._map_index(stat)
+
+    def _map_index(self, stat: os.stat_result) -> bool:
+        """Map the index file if it exists and was built from the current JSON."""
+        try:
+            with open(self.index_path, "rb") as f:
+                index_map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except (OSError, ValueError):
+            return False
+        if len(index_map) < HEADER.size:
+            index_map.close()
+            return False
+        magic, version, mtime, size, count, *sections = HEADER.unpack_from(index_map)
+        if (magic, version, mtime, size) != (
+            INDEX_MAGIC, INDEX_VERSION, stat.st_mtime_ns, stat.st_size,
+        ):
+            index_map.close()
+            return False
+
+        view = memoryview(index_map)
+        strings_at, blob_at, texts_at = sections
+        self._string_offsets = view[strings_at : strings_at + 4 * (3 * count + 1)].cast("I")
+        self._strings = view[blob_at:texts_at]
+        self._text_blob = view[texts_at:]
+        self._texts = None
+        self._map = index_map
+        self.count = count
+        return True
+
+    def __len__(self) -> int:
+        return self.count
+
+    def _string(self, i: int) -> str:
+        return str(self._strings[self._string_offsets[i] : self._string_offsets[i + 1]], "utf-8")
+
+    def entry(self, number: int) -> tuple[str, dict]:
+        """The emoji `number` (in file order) as `(char, {"name", "group"})`."""
+        base = 3 * number
+        return self._string(base), {
+            "name": self._string(base + 1),
+            "group": self._string(base + 2),
+        }
+
+    def search(self, query: str = "") -> list[int]:
+        """Numbers of the emojis whose name and group contain `query`, in file order."""
+        if self._map is None:
+            return []
+        query = query.casefold()
+        if not query:
+            return list(range(self.count))
+        if self._texts is None:
+            texts = str(self._text_blob, "utf-8").split(SEPARATOR)
+            self._texts = texts[: self.count]
+        return [number for number, text in enumerate(self._texts) if query in text]
@@ -1,21 +1,46 @@
 import json
 import os
 import re
+from collections import OrderedDict
 
 import gi
 
 gi.require_version("Gtk", "3.0")
-from gi.repository import GLib, Gtk
+from gi.repository import GdkPixbuf, GLib, Gtk
 from loguru import logger
 
 import config.data as data
+from services.desktop_catalog import DesktopCatalog
 
 ICON_CACHE_FILE = data.CACHE_DIR + "/icons.json"
 if not os.path.exists(data.CACHE_DIR):
     os.makedirs(data.CACHE_DIR)
 
+# Newly resolved names are written out together once lookups settle down.
+SAVE_DELAY_SECONDS = 2
+PIXBUF_CACHE_SIZE = 256
+
 
 class IconResolver:
+    """
+    Resolves window classes / app ids to icon names and loads them as pixbufs.
+
+    Resolved names (including negative results, stored as `null`) persist in
+    `icons.json`, written atomically and at most once per burst of lookups.
+    Loaded pixbufs are kept in an LRU keyed by (icon, size, scale), so the
+    dock, notch, overview and launcher share renders of the same icon. Both
+    levels are invalidated when the icon theme changes.
+    """
+
+    instance = None
+
+    @staticmethod
+    def get_initial():
+        if IconResolver.instance is None:
+            IconResolver.instance = IconResolver()
+
+        return IconResolver.instance
+
     def __init__(self, default_applicaiton_icon: str = "application-x-executable-symbolic"):
         if os.path.exists(ICON_CACHE_FILE):
             with open(ICON_CACHE_FILE) as f:
@@ -28,42 +53,64 @@ class IconResolver:
             self._icon_dict = {}
 
         self.default_applicaiton_icon = default_applicaiton_icon
+        self._pixbufs: OrderedDict[tuple[str, int, int], GdkPixbuf.Pixbuf | None] = (
+            OrderedDict()
+        )
+        self._missing: set[str] = set()
+        self._save_id = None
+        self.stats = {
+            "name_hits": 0,
+            "name_misses": 0,
+            "pixbuf_hits": 0,
+            "pixbuf_misses": 0,
+        }
+
+        self.icon_theme = Gtk.IconTheme.get_default()
+        self.icon_theme.connect("changed", self._on_theme_changed)
+        self.catalog = DesktopCatalog.get_initial()
+        self.catalog.connect("changed", lambda *_: self._drop_negative_names())
+
+    # Name resolution
 
     def get_icon_name(self, app_id: str):
         if app_id in self._icon_dict:
-            return self._icon_dict[app_id]
+            self.stats["name_hits"] += 1
+            return self._icon_dict[app_id] or self.default_applicaiton_icon
+        self.stats["name_misses"] += 1
         new_icon = self._compositor_find_icon(app_id)
         logger.info(
             f"[ICONS] found new icon: '{new_icon}' for app id: '{app_id}', storing..."
         )
         self._store_new_icon(app_id, new_icon)
-        return new_icon
+        return new_icon or self.default_applicaiton_icon
 
-    def get_icon_pixbuf(self, app_id: str, size: int = 16):
-        icon_theme = Gtk.IconTheme.get_default()
-        icon_name = self.get_icon_name(app_id)
+    def _store_new_icon(self, app_id: str, icon: str | None):
+        self._icon_dict[app_id] = icon
+        if self._save_id is None:
+            self._save_id = GLib.timeout_add_seconds(SAVE_DELAY_SECONDS, self._save)
+
+    def _save(self):
+        self._save_id = None
+        tmp_path = f"{ICON_CACHE_FILE}.tmp"
         try:
-            # Try to load the resolved icon.
-            return icon_theme.load_icon(icon_name, size, Gtk.IconLookupFlags.FORCE_SIZE)
-        except GLib.Error as primary_error:
-            logger.warning(
-                f"Warning: Icon '{icon_name}' not found in theme. Error: {primary_error}"
-            )
-            try:
-                # Fallback to the default application icon.
-                return icon_theme.load_icon(
-                    self.default_applicaiton_icon, size, Gtk.IconLookupFlags.FORCE_SIZE
-                )
-            except GLib.Error as fallback_error:
-                logger.error(
-                    f"Error: Fallback icon '{self.default_applicaiton_icon}' also not found. Error: {fallback_error}"
-                )
-                return None
+            with open(tmp_path, "w") as f:
+                json.dump(self._icon_dict, f)
+            os.replace(tmp_path, ICON_CACHE_FILE)
+        except OSError as e:
+            logger.warning(f"[ICONS] Failed to save icon cache: {e}")
+        return False
 
-    def _store_new_icon(self, app_id: str, icon: str):
-        self._icon_dict[app_id] = icon
-        with open(ICON_CACHE_FILE, "w") as f:
-            json.dump(self._icon_dict, f)
+    def _drop_negative_names(self):
+        # Apps installed since may provide the icons that were missing.
+        self._icon_dict = {
+            app_id: icon for app_id, icon in self._icon_dict.items() if icon
+        }
+
+    def _on_theme_changed(self, *_):
+        logger.info("[ICONS] Icon theme changed, clearing cached icons")
+        self._drop_negative_names()
+        self._pixbufs.clear()
+        self._missing.clear()
 
     def _get_icon_from_desktop_file(self, desktop_file_path: str):
         # Retrieve the icon specified in the [Desktop Entry] section.
@@ -71,32 +118,88 @@ class IconResolver:
             for line in f.readlines():
                 if "Icon=" in line:
                     return "".join(line[5:].split())
-            return self.default_applicaiton_icon
-
-    def _get_desktop_file(self, app_id: str) -> str | None:
-        data_dirs = GLib.get_system_data_dirs()
-        for data_dir in data_dirs:
-            data_dir = os.path.join(data_dir, "applications")
-            if os.path.exists(data_dir):
-                files = os.listdir(data_dir)
-                matching = [s for s in files if "".join(app_id.lower().split()) in s.lower()]
-                if matching:
-                    return os.path.join(data_dir, matching[0])
-                for word in list(filter(None, re.split(r"-|\.|_|\s", app_id))):
-                    matching = [s for s in files if word.lower() in s.lower()]
-                    if matching:
-                        return os.path.join(data_dir, matching[0])
+            return None
+
+    def _find_desktop_app(self, app_id: str):
+        app = self.catalog.find(app_id)
+        if app is not None:
+            return app
+        # Fuzzy fallback over the desktop ids the catalog already holds.
+        apps = self.catalog.by_id
+        needle = "".join(app_id.lower().split())
+        for desktop_id, app in apps.items():
+            if needle in desktop_id.lower():
+                return app
+        for word in list(filter(None, re.split(r"-|\.|_|\s", app_id))):
+            for desktop_id, app in apps.items():
+                if word.lower() in desktop_id.lower():
+                    return app
         return None
 
-    def _compositor_find_icon(self, app_id: str):
-        icon_theme = Gtk.IconTheme.get_default()
-        if icon_theme.has_icon(app_id):
+    def _compositor_find_icon(self, app_id: str) -> str | None:
+        if self.icon_theme.has_icon(app_id):
             return app_id
-        if icon_theme.has_icon(app_id + "-desktop"):
+        if self.icon_theme.has_icon(app_id + "-desktop"):
             return app_id + "-desktop"
-        desktop_file = self._get_desktop_file(app_id)
-        return (
-            self._get_icon_from_desktop_file(desktop_file)
-            if desktop_file
-            else self.default_applicaiton_icon
-        )
+        app = self._find_desktop_app(app_id)
+        if app is None:
+            return None
+        return app.icon_name or self._get_icon_from_desktop_file(app.path)
+
+    # Pixbufs
+
+    def load_icon(self, icon_name: str, size: int, scale: int = 1):
+        """Load `icon_name` (a theme icon or a file path) through the LRU."""
+        key = (icon_name, size, scale)
+        if key in self._pixbufs:
+            self.stats["pixbuf_hits"] += 1
+            self._pixbufs.move_to_end(key)
+            return self._pixbufs[key]
+        self.stats["pixbuf_misses"] += 1
+
+        try:
+            if os.path.isabs(icon_name):
+                pixbuf = GdkPixbuf.Pixbuf.new_from_file_at_scale(
+                    icon_name, size * scale, size * scale, True
+                )
+            else:
+                pixbuf = self.icon_theme.load_icon_for_scale(
+                    icon_name, size, scale, Gtk.IconLookupFlags.FORCE_SIZE
+                )
+        except GLib.Error:
+            pixbuf = None
+
+        self._pixbufs[key] = pixbuf
+        if len(self._pixbufs) > PIXBUF_CACHE_SIZE:
+            self._pixbufs.popitem(last=False)
+        return pixbuf
+
+    def get_icon_pixbuf(self, app_id: str, size: int = 16, scale: int = 1):
+        icon_name = self.get_icon_name(app_id)
+        pixbuf = self.load_icon(icon_name, size, scale)
+        if pixbuf is None and icon_name != self.default_applicaiton_icon:
+            self._warn_missing(icon_name)
+            pixbuf = self.load_icon(self.default_applicaiton_icon, size, scale)
+        if pixbuf is None:
+            self._warn_missing(self.default_applicaiton_icon)
+        return pixbuf
+
+    def _warn_missing(self, icon_name: str):
+        # Missing icons are cached too, so only report them once.
+        if icon_name not in self._missing:
+            self._missing.add(icon_name)
+            logger.warning(f"Warning: Icon '{icon_name}' not found in theme.")
+
+    def get_app_pixbuf(self, app, size: int = 16, scale: int = 1):
+        """Pixbuf of a desktop app's own icon, or None if it has none."""
+        if not app.icon_name:
+            return None
+        return self.load_icon(app.icon_name, size, scale)
+
+    def hit_rates(self) -> dict[str, float]:
+        rates = {}
+        for level in ("name", "pixbuf"):
+            hits = self.stats[f"{level}_hits"]
+            total = hits + self.stats[f"{level}_misses"]
+            rates[level] = hits / total if total else 0.0
+        return rates
@@ -1,58 +1,51 @@
-import subprocess
-import json
+from typing import Callable
 
 import config.data as data
+from services.hyprland_state import HyprlandStateStore
+
+# Store events after which window rectangles have to be re-indexed.
+GEOMETRY_EVENTS = (
+    "ready",
+    "openwindow",
+    "closewindow",
+    "movewindowv2",
+    "changefloatingmode",
+    "fullscreen",
+    "moveworkspacev2",
+    "refresh",
+)
+# Store events that only change which workspace is being looked at.
+FOCUS_EVENTS = ("workspacev2", "focusedmon", "createworkspacev2", "destroyworkspacev2")
+MONITOR_EVENTS = ("monitoradded", "monitorremoved")
+
 
 def get_current_workspace():
     """
-    Get the current workspace ID using hyprctl.
+    Get the current workspace ID from the shared Hyprland state.
     """
-    try:
-        result = subprocess.run(
-            ["hyprctl", "activeworkspace"],
-            capture_output=True,
-            text=True
-        )
-        # Assume the output similar to: "ID <number>"
-        # Extracting the number from the output
-        parts = result.stdout.split()
-        for i, part in enumerate(parts):
-            if part == "ID" and i + 1 < len(parts):
-                return int(parts[i+1])
-    except Exception as e:
-        print(f"Error getting current workspace: {e}")
-    return -1
+    return HyprlandStateStore.get_initial().active_workspace_id
+
 
 def get_screen_dimensions():
     """
-    Get screen dimensions from hyprctl.
-    
+    Get screen dimensions from the shared Hyprland state.
+
     Returns:
         tuple: (width, height) of the monitor containing the current workspace
     """
-    try:
-        # Get current workspace
-        workspace_id = get_current_workspace()
-        
-        # Get monitor information
-        result = subprocess.run(
-            ["hyprctl", "-j", "monitors"],
-            capture_output=True,
-            text=True
-        )
-        monitors = json.loads(result.stdout)
-        
-        # Find the monitor containing our workspace
-        for monitor in monitors:
-            if monitor.get("activeWorkspace", {}).get("id") == workspace_id:
-                return monitor.get("width", data.CURRENT_WIDTH), monitor.get("height", data.CURRENT_HEIGHT)
-                
-        # Fallback to first monitor
-        if monitors:
-            return monitors[0].get("width", data.CURRENT_WIDTH), monitors[0].get("height", data.CURRENT_HEIGHT)
-    except Exception as e:
-        print(f"Error getting screen dimensions: {e}")
-    
+    hypr_state = HyprlandStateStore.get_initial()
+    workspace_id = hypr_state.active_workspace_id
+    monitors = hypr_state.get_monitors()
+
+    # Find the monitor containing our workspace
+    for monitor in monitors:
+        if monitor.get("activeWorkspace", {}).get("id") == workspace_id:
+            return monitor.get("width", data.CURRENT_WIDTH), monitor.get("height", data.CURRENT_HEIGHT)
+
+    # Fallback to first monitor
+    if monitors:
+        return monitors[0].get("width", data.CURRENT_WIDTH), monitors[0].get("height", data.CURRENT_HEIGHT)
+
     # Default fallback values
     return data.CURRENT_WIDTH, data.CURRENT_HEIGHT
 
@@ -94,16 +87,7 @@ def check_occlusion(occlusion_region, workspace=None):
         print(f"Invalid occlusion region format: {occlusion_region}")
         return False
 
-    try:
-        result = subprocess.run(
-            ["hyprctl", "-j", "clients"],
-            capture_output=True,
-            text=True
-        )
-        clients = json.loads(result.stdout)
-    except Exception as e:
-        print(f"Error retrieving client windows: {e}")
-        return False
+    clients = HyprlandStateStore.get_initial().get_workspace_clients(workspace)
 
     occ_x, occ_y, occ_width, occ_height = occlusion_region
     occ_x2 = occ_x + occ_width
@@ -114,11 +98,6 @@ def check_occlusion(occlusion_region, workspace=None):
         if not client.get("mapped", False):
             continue
 
-        # Ensure client has proper workspace information and matches the workspace
-        client_workspace = client.get("workspace", {})
-        if client_workspace.get("id") != workspace:
-            continue
-
         # Ensure client has position and size info
         position = client.get("at")
         size = client.get("size")
@@ -135,3 +114,199 @@ def check_occlusion(occlusion_region, workspace=None):
             return True  # Occlusion region is occupied
 
     return False  # No window overlaps the occlusion region
+
+
+def _edge_rect(side: str, size: int, monitor: dict) -> tuple[int, int, int, int]:
+    """Return the (x1, y1, x2, y2) rectangle of a screen edge on a monitor."""
+    mon_x, mon_y = monitor.get("x", 0), monitor.get("y", 0)
+    width = monitor.get("width", data.CURRENT_WIDTH)
+    height = monitor.get("height", data.CURRENT_HEIGHT)
+    match side.lower():
+        case "bottom":
+            return (mon_x, mon_y + height - size, mon_x + width, mon_y + height)
+        case "left":
+            return (mon_x, mon_y, mon_x + size, mon_y + height)
+        case "right":
+            return (mon_x + width - size, mon_y, mon_x + width, mon_y + height)
+        case _:
+            return (mon_x, mon_y, mon_x + width, mon_y + size)
+
+
+def _intersects(a: tuple[int, int, int, int], b: tuple[int, int, int, int]) -> bool:
+    return not (a[2] <= b[0] or a[0] >= b[2] or a[3] <= b[1] or a[1] >= b[3])
+
+
+class _EdgeRegion:
+    """An observed screen edge and the windows currently overlapping it."""
+
+    def __init__(self, side: str, size: int):
+        self.side = side
+        self.size = size
+        self.rects: dict[int, tuple[int, int, int, int]] = {}
+        self.occupants: dict[int, set[str]] = {}
+        self.subscribers: dict[int, Callable[[bool], None]] = {}
+        self.occluded: bool | None = None
+
+    def rebuild_rects(self, monitors: list[dict]):
+        self.rects = {
+            monitor["id"]: _edge_rect(self.side, self.size, monitor)
+            for monitor in monitors
+        }
+
+    def discard(self, address: str, workspace_id: int):
+        occupants = self.occupants.get(workspace_id)
+        if occupants is not None:
+            occupants.discard(address)
+
+    def add(
+        self,
+        address: str,
+        workspace_id: int,
+        monitor_id: int,
+        rect: tuple[int, int, int, int],
+    ):
+        region_rect = self.rects.get(monitor_id)
+        if region_rect is not None and _intersects(rect, region_rect):
+            self.occupants.setdefault(workspace_id, set()).add(address)
+
+
+class OcclusionEngine:
+    """
+    Event-driven replacement for polling `check_occlusion`.
+
+    Window rectangles are indexed per workspace and, for every observed screen
+    edge, the set of windows overlapping it is kept up to date from the shared
+    Hyprland state. Only windows whose geometry changed are re-tested, and
+    subscribers are called only when the occluded state of their edge flips.
+    """
+
+    instance = None
+
+    @staticmethod
+    def get_initial():
+        if OcclusionEngine.instance is None:
+            OcclusionEngine.instance = OcclusionEngine()
+
+        return OcclusionEngine.instance
+
+    def __init__(self):
+        self.hypr_state = HyprlandStateStore.get_initial()
+        # address -> (workspace_id, monitor_id, (x1, y1, x2, y2))
+        self._windows: dict[str, tuple[int, int, tuple[int, int, int, int]]] = {}
+        self._regions: dict[tuple[str, int], _EdgeRegion] = {}
+        self._handles: dict[int, tuple[str, int]] = {}
+        self._next_handle = 1
+
+        self.hypr_state.connect("changed", self._on_state_changed)
+        if self.hypr_state.is_ready:
+            self._sync_windows()
+
+    def subscribe(self, side: str, size: int, callback: Callable[[bool], None]) -> int:
+        """
+        Watch a screen edge and call `callback(occluded)` whenever it changes.
+
+        The callback is also called once right away with the current state.
+        Returns a handle for `unsubscribe`.
+        """
+        key = (side.lower(), size)
+        region = self._regions.get(key)
+        if region is None:
+            region = _EdgeRegion(*key)
+            region.rebuild_rects(self.hypr_state.get_monitors())
+            for address, (ws_id, mon_id, rect) in self._windows.items():
+                region.add(address, ws_id, mon_id, rect)
+            self._regions[key] = region
+
+        handle = self._next_handle
+        self._next_handle += 1
+        region.subscribers[handle] = callback
+        self._handles[handle] = key
+
+        region.occluded = self._is_region_occluded(region)
+        callback(region.occluded)
+        return handle
+
+    def unsubscribe(self, handle: int):
+        key = self._handles.pop(handle, None)
+        if key is None:
+            return
+        region = self._regions[key]
+        region.subscribers.pop(handle, None)
+        if not region.subscribers:
+            del self._regions[key]
+
+    def is_occluded(self, side: str, size: int) -> bool:
+        region = self._regions.get((side.lower(), size))
+        if region is not None:
+            return bool(region.occluded)
+        return check_occlusion((side, size))
+
+    def resync(self):
+        """
+        Re-read window geometry once. Hyprland sends no event when a window
+        is resized or a floating window is dragged, so panels call this when
+        they are about to decide whether to hide again; subscribers are
+        notified if the re-read flips their edge.
+        """
+        if self._regions:
+            self.hypr_state.refresh_clients()
+
+    def _on_state_changed(self, _, event_name: str):
+        if event_name in MONITOR_EVENTS:
+            monitors = self.hypr_state.get_monitors()
+            for region in self._regions.values():
+                region.rebuild_rects(monitors)
+                region.occupants.clear()
+            self._windows.clear()
+            self._sync_windows()
+        elif event_name in GEOMETRY_EVENTS:
+            if event_name == "ready":
+                monitors = self.hypr_state.get_monitors()
+                for region in self._regions.values():
+                    region.rebuild_rects(monitors)
+            self._sync_windows()
+        elif event_name in FOCUS_EVENTS:
+            self._notify()
+
+    def _sync_windows(self):
+        """Diff the indexed rectangles against the store and re-test changed windows."""
+        current = {}
+        for client in self.hypr_state.get_clients():
+            position, size = client.get("at"), client.get("size")
+            if not client.get("mapped", False) or not position or not size:
+                continue
+            x, y = position
+            width, height = size
+            current[client["address"]] = (
+                client.get("workspace", {}).get("id", -1),
+                client.get("monitor", -1),
+                (x, y, x + width, y + height),
+            )
+
+        for address, previous in list(self._windows.items()):
+            if current.get(address) == previous:
+                continue
+            for region in self._regions.values():
+                region.discard(address, previous[0])
+            del self._windows[address]
+
+        for address, entry in current.items():
+            if address in self._windows:
+                continue
+            for region in self._regions.values():
+                region.add(address, *entry)
+            self._windows[address] = entry
+
+        self._notify()
+
+    def _is_region_occluded(self, region: _EdgeRegion) -> bool:
+        return bool(region.occupants.get(self.hypr_state.active_workspace_id))
+
+    def _notify(self):
+        for region in list(self._regions.values()):
+            occluded = self._is_region_occluded(region)
+            if occluded == region.occluded:
+                continue
+            region.occluded = occluded
+            for callback in list(region.subscribers.values()):
+                callback(occluded)
@@ -0,0 +1,196 @@
+import sys
+import time
+from contextlib import contextmanager
+from importlib.abc import MetaPathFinder
+
+from loguru import logger
+
+from utils.colors import Colors
+
+PROFILE_STARTUP = "--profile-startup" in sys.argv
+PROFILE_IMPORTS = "--profile-imports" in sys.argv
+PROFILE_EVENTS = "--profile-events" in sys.argv
+
+# Top-level packages of the shell; imports are attributed to the innermost
+# module from one of these that is being imported when they happen.
+SHELL_PACKAGES = ("modules", "services", "widgets", "utils", "config")
+
+
+def on_first_frame(window, callback):
+    """Call `callback()` once, after `window` has drawn its first frame."""
+    handler_id = None
+
+    def on_draw(*_):
+        window.disconnect(handler_id)
+        callback()
+        return False
+
+    handler_id = window.connect("draw", on_draw)
+
+
+class StartupTimeline:
+    """
+    Named checkpoints from the moment this module is imported until the first
+    frame is drawn. Disabled (and free) unless `--profile-startup` is passed.
+    """
+
+    def __init__(self, enabled: bool):
+        self.enabled = enabled
+        self.origin = time.perf_counter()
+        self.marks: list[tuple[str, float, float | None]] = []
+        self.reported = False
+
+    def mark(self, label: str):
+        """Record that `label` was reached."""
+        if self.enabled:
+            self.marks.append((label, time.perf_counter(), None))
+
+    @contextmanager
+    def span(self, label: str):
+        """Record how long the enclosed block took."""
+        if not self.enabled:
+            yield
+            return
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            end = time.perf_counter()
+            self.marks.append((label, end, end - start))
+            if self.reported:
+                logger.info(
+                    f"{Colors.INFO}[Startup] {label}: {(end - start) * 1000:.1f} ms "
+                    f"(at +{(end - self.origin) * 1000:.0f} ms)"
+                )
+
+    def report_on_first_frame(self, window):
+        """Print the timeline once `window` has drawn its first frame."""
+        if self.enabled:
+            on_first_frame(window, lambda: (self.mark("first frame"), self.report()))
+
+    def report(self):
+        if not self.enabled or self.reported:
+            return
+        self.reported = True
+        lines = [f"{Colors.HEADER}[Startup] timeline{Colors.RESET}"]
+        previous = self.origin
+        for label, at, duration in self.marks:
+            took = duration if duration is not None else at - previous
+            lines.append(
+                f"  +{(at - self.origin) * 1000:8.1f} ms  {took * 1000:8.1f} ms  {label}"
+            )
+            previous = at
+        logger.info("\n".join(lines))
+
+
+class _TimedLoader:
+    """Wraps a module loader to time `exec_module` for the import profiler."""
+
+    def __init__(self, loader, profiler: "ImportProfiler"):
+        self._loader = loader
+        self._profiler = profiler
+
+    def __getattr__(self, attr):
+        return getattr(self._loader, attr)
+
+    def create_module(self, spec):
+        return self._loader.create_module(spec)
+
+    def exec_module(self, module):
+        self._profiler.enter(module.__name__)
+        try:
+            self._loader.exec_module(module)
+        finally:
+            self._profiler.leave(module.__name__)
+
+
+class ImportProfiler(MetaPathFinder):
+    """
+    Measures how long every module takes to execute on import, like
+    `python -X importtime`, and attributes third-party imports to the shell
+    component that pulled them in. Enabled with `--profile-imports`.
+    """
+
+    def __init__(self, enabled: bool):
+        self.enabled = enabled
+        self.modules: dict[str, tuple[float, float, str]] = {}
+        self._stack: list[list] = []
+        self._finding = False
+        if enabled:
+            sys.meta_path.insert(0, self)
+
+    def find_spec(self, fullname, path, target=None):
+        if self._finding:
+            return None
+        self._finding = True
+        try:
+            for finder in sys.meta_path:
+                if finder is self or not hasattr(finder, "find_spec"):
+                    continue
+                spec = finder.find_spec(fullname, path, target)
+                if spec is not None:
+                    break
+            else:
+                return None
+        finally:
+            self._finding = False
+        if spec.loader is not None and hasattr(spec.loader, "exec_module"):
+            spec.loader = _TimedLoader(spec.loader, self)
+        return spec
+
+    @staticmethod
+    def _is_shell_module(name: str) -> bool:
+        return name.split(".", 1)[0] in SHELL_PACKAGES
+
+    def enter(self, name: str):
+        # [name, start, time spent in nested imports]
+        self._stack.append([name, time.perf_counter(), 0.0])
+
+    def leave(self, name: str):
+        _, start, nested = self._stack.pop()
+        cumulative = time.perf_counter() - start
+        if self._stack:
+            self._stack[-1][2] += cumulative
+
+        component = next(
+            (
+                frame[0]
+                for frame in reversed(self._stack + [[name]])
+                if self._is_shell_module(frame[0])
+            ),
+            "<startup>",
+        )
+        self.modules[name] = (cumulative - nested, cumulative, component)
+
+    def report_on_first_frame(self, window):
+        """Print the report once `window` has drawn its first frame."""
+        if self.enabled:
+            on_first_frame(window, self.report)
+
+    def report(self, limit: int = 15):
+        if not self.enabled:
+            return
+        components: dict[str, float] = {}
+        for own, _, component in self.modules.values():
+            components[component] = components.get(component, 0.0) + own
+
+        lines = [f"{Colors.HEADER}[Imports] cost by component{Colors.RESET}"]
+        for component, total in sorted(
+            components.items(), key=lambda item: item[1], reverse=True
+        ):
+            lines.append(f"  {total * 1000:8.1f} ms  {component}")
+
+        lines.append(f"{Colors.HEADER}[Imports] slowest modules{Colors.RESET}")
+        slowest = sorted(
+            self.modules.items(), key=lambda item: item[1][0], reverse=True
+        )
+        for name, (own, cumulative, component) in slowest[:limit]:
+            lines.append(
+                f"  {own * 1000:8.1f} ms  {cumulative * 1000:8.1f} ms  {name}"
+                f"  <- {component}"
+            )
+        logger.info("\n".join(lines))
+
+
+timeline = StartupTimeline(PROFILE_STARTUP)
+import_profiler = ImportProfiler(PROFILE_IMPORTS)
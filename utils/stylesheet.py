@@ -0,0 +1,225 @@
+import hashlib
+import json
+import os
+import re
+import time
+
+from gi.repository import Gdk, Gio, GLib, Gtk
+from loguru import logger
+
+import config.data as data
+from utils.colors import Colors
+
+CACHE_DIR = f"{data.CACHE_DIR}/stylesheet"
+COLORS_FILE = "colors.css"
+
+# matugen writes colors.css in more than one step.
+RELOAD_DELAY_MS = 100
+
+IMPORT_RE = re.compile(r"""@import\s+url\(\s*["']?([^"')]+)["']?\s*\)\s*;""")
+COMMENT_RE = re.compile(r"/\*.*?\*/", re.DOTALL)
+VARS_BLOCK_RE = re.compile(r":vars\s*\{([^}]*)\}")
+VAR_DECL_RE = re.compile(r"--([\w-]+)\s*:\s*([^;]+);")
+VAR_USE_RE = re.compile(r"var\(\s*--([\w-]+)\s*\)")
+
+
+def _digest(raw: bytes) -> str:
+    return hashlib.sha1(raw).hexdigest()
+
+
+def _color_name(var_name: str) -> str:
+    return var_name.replace("-", "_")
+
+
+def parse_color_vars(css: str) -> tuple[dict[str, str], str]:
+    """Split a `:vars { --name: value; }` stylesheet into its variables and the rest."""
+    variables = {}
+    for block in VARS_BLOCK_RE.findall(css):
+        for name, value in VAR_DECL_RE.findall(block):
+            variables[name] = value.strip()
+    return variables, VARS_BLOCK_RE.sub("", css)
+
+
+def colors_to_gtk(variables: dict[str, str], rest: str = "") -> str:
+    """The variables as GTK named colors, which other providers can reference."""
+    lines = [f"@define-color {_color_name(name)} {value};" for name, value in variables.items()]
+    return "\n".join(lines) + "\n" + rest
+
+
+class Stylesheet:
+    """
+    The shell's stylesheet, loaded into two CSS providers.
+
+    `main.css` and everything it imports are flattened into one bundle, in
+    which `var(--name)` references to the theme colors become GTK named
+    colors (`@name`). The bundle is cached on disk under the hashes of its
+    source files, so an unchanged tree skips the import resolution on start.
+
+    `colors.css` is kept out of the bundle: its variables are loaded as
+    `@define-color`s into a provider of their own. A theme change from
+    matugen therefore only reparses that small provider, and GTK resolves
+    the new colors for every widget without reparsing the rest. It stays a
+    single bundle (not one provider per file) because selector specificity
+    is not compared across providers.
+    """
+
+    def __init__(self, main_path: str):
+        self.main_path = os.path.abspath(main_path)
+        self.base_dir = os.path.dirname(self.main_path)
+        self.colors_path = os.path.join(self.base_dir, "styles", COLORS_FILE)
+        self.color_names: set[str] = set()
+        self._bundle_digest = None
+        self._colors_digest = None
+        self._reload_id = None
+        os.makedirs(CACHE_DIR, exist_ok=True)
+
+        screen = Gdk.Screen.get_default()
+        self.colors_provider = Gtk.CssProvider()
+        self.bundle_provider = Gtk.CssProvider()
+        for provider in (self.colors_provider, self.bundle_provider):
+            provider.connect("parsing-error", self._on_parsing_error)
+            Gtk.StyleContext.add_provider_for_screen(
+                screen, provider, Gtk.STYLE_PROVIDER_PRIORITY_USER
+            )
+
+        self._monitor = Gio.File.new_for_path(self.colors_path).monitor_file(
+            Gio.FileMonitorFlags.WATCH_MOVES, None
+        )
+        self._monitor.connect("changed", self._on_colors_changed)
+
+    # Loading
+
+    def reload(self):
+        """Reload whatever changed on disk: the colors, the bundle or both."""
+        start = time.perf_counter()
+        colors_changed = self.reload_colors()
+        bundle_changed = self._reload_bundle()
+        if colors_changed or bundle_changed:
+            logger.info(
+                f"[Stylesheet] Reloaded {'colors' if colors_changed else ''}"
+                f"{' and ' if colors_changed and bundle_changed else ''}"
+                f"{'bundle' if bundle_changed else ''} in "
+                f"{(time.perf_counter() - start) * 1000:.1f} ms"
+            )
+
+    def reload_colors(self) -> bool:
+        try:
+            with open(self.colors_path, "rb") as f:
+                raw = f.read()
+        except OSError as e:
+            logger.warning(f"{Colors.WARNING}[Stylesheet] Cannot read {self.colors_path}: {e}")
+            return False
+        digest = _digest(raw)
+        if digest == self._colors_digest:
+            return False
+        variables, rest = parse_color_vars(COMMENT_RE.sub("", raw.decode("utf-8")))
+        self.colors_provider.load_from_data(colors_to_gtk(variables, rest).encode("utf-8"))
+        self._colors_digest = digest
+        # Which variables exist decides how the bundle translates `var()`,
+        # so the names are part of the bundle's key.
+        self.color_names = set(variables)
+        return True
+
+    def _reload_bundle(self) -> bool:
+        css, digest = self._cached_bundle()
+        if css is None:
+            css, files = self._build_bundle()
+            digest = self._store_bundle(css, files)
+        if digest == self._bundle_digest:
+            return False
+        self.bundle_provider.load_from_data(css.encode("utf-8"))
+        self._bundle_digest = digest
+        return True
+
+    # Bundling
+
+    def _bundle_key(self, files: dict[str, str]) -> str:
+        names = ",".join(sorted(self.color_names))
+        listing = "".join(f"{path}:{digest}\n" for path, digest in sorted(files.items()))
+        return _digest(f"{names}\n{listing}".encode("utf-8"))
+
+    def _cached_bundle(self) -> tuple[str | None, str | None]:
+        try:
+            with open(os.path.join(CACHE_DIR, "manifest.json")) as f:
+                manifest = json.load(f)
+            files = manifest["files"]
+            for path, digest in files.items():
+                with open(path, "rb") as f:
+                    if _digest(f.read()) != digest:
+                        return None, None
+            key = self._bundle_key(files)
+            if key != manifest["key"]:
+                return None, None
+            with open(os.path.join(CACHE_DIR, f"{key}.css")) as f:
+                return f.read(), key
+        except (OSError, ValueError, KeyError):
+            return None, None
+
+    def _build_bundle(self) -> tuple[str, dict[str, str]]:
+        files: dict[str, str] = {}
+
+        def inline(path: str, stack: tuple) -> str:
+            try:
+                with open(path, "rb") as f:
+                    raw = f.read()
+            except OSError as e:
+                logger.warning(f"{Colors.WARNING}[Stylesheet] Cannot import {path}: {e}")
+                return ""
+            files[path] = _digest(raw)
+            css = COMMENT_RE.sub("", raw.decode("utf-8"))
+
+            def replace_import(match):
+                target = os.path.normpath(os.path.join(os.path.dirname(path), match.group(1)))
+                if target == self.colors_path or target in stack:
+                    return ""
+                return inline(target, stack + (target,))
+
+            return IMPORT_RE.sub(replace_import, css)
+
+        css = inline(self.main_path, (self.main_path,))
+
+        def replace_var(match):
+            name = match.group(1)
+            return f"@{_color_name(name)}" if name in self.color_names else match.group(0)
+
+        return VAR_USE_RE.sub(replace_var, css), files
+
+    def _store_bundle(self, css: str, files: dict[str, str]) -> str:
+        key = self._bundle_key(files)
+        try:
+            for entry in os.scandir(CACHE_DIR):
+                if entry.name.endswith(".css"):
+                    os.remove(entry.path)
+            for name, content in (
+                (f"{key}.css", css),
+                ("manifest.json", json.dumps({"key": key, "files": files})),
+            ):
+                tmp = os.path.join(CACHE_DIR, f"{name}.tmp")
+                with open(tmp, "w") as f:
+                    f.write(content)
+                os.replace(tmp, os.path.join(CACHE_DIR, name))
+        except OSError as e:
+            logger.warning(f"{Colors.WARNING}[Stylesheet] Failed to cache bundle: {e}")
+        return key
+
+    # Events
+
+    def _on_colors_changed(self, _monitor, _file, _other_file, event_type):
+        if event_type in (
+            Gio.FileMonitorEvent.CHANGED,
+            Gio.FileMonitorEvent.ATTRIBUTE_CHANGED,
+        ):
+            return
+        if self._reload_id is not None:
+            GLib.source_remove(self._reload_id)
+        self._reload_id = GLib.timeout_add(RELOAD_DELAY_MS, self._on_reload_timeout)
+
+    def _on_reload_timeout(self):
+        self._reload_id = None
+        self.reload()
+        return False
+
+    def _on_parsing_error(self, _provider, section, error):
+        logger.warning(
+            f"{Colors.WARNING}[Stylesheet] line {section.get_start_line() + 1}: {error.message}"
+        )
@@ -0,0 +1,252 @@
+import hashlib
+import json
+import os
+import shutil
+import subprocess
+import time
+
+import toml
+from gi.repository import Gio, GLib
+from loguru import logger
+
+import config.data as data
+from utils.colors import Colors
+
+MATUGEN_CONFIG = os.path.expanduser("~/.config/matugen/config.toml")
+CACHE_DIR = f"{data.CACHE_DIR}/themes"
+MANIFEST = "manifest.json"
+
+# Generated themes kept on disk (a few KB each); the oldest are dropped.
+MAX_ENTRIES = 64
+
+
+def _file_digest(path: str) -> str:
+    digest = hashlib.sha1()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _replace_file(src: str, dst: str):
+    """Copy `src` over `dst` atomically, so readers never see half a file."""
+    os.makedirs(os.path.dirname(dst), exist_ok=True)
+    tmp = f"{dst}.{os.getpid()}.tmp"
+    shutil.copyfile(src, tmp)
+    os.replace(tmp, dst)
+
+
+class ThemeCache:
+    """
+    Cache of matugen's generated files per (source, scheme, configuration).
+
+    The source is the wallpaper's content hash or the hex color. The
+    configuration hash covers matugen's config.toml, every template it
+    renders and the matugen binary itself, so editing any of them regenerates.
+    On a hit the cached outputs are swapped into place atomically and the
+    template post-hooks (and the wallpaper command) run as matugen would
+    have run them, without starting matugen. Misses run matugen and
+    snapshot its outputs.
+
+    Only one matugen runs at a time, and nothing else is applied while it
+    does: a switch made meanwhile waits for it (only the latest one is
+    kept) and is applied once it exits. The outputs on disk when matugen
+    exits are therefore always its own, and a later theme is never
+    overwritten by an earlier run finishing late.
+    """
+
+    instance = None
+
+    @staticmethod
+    def get_initial():
+        if ThemeCache.instance is None:
+            ThemeCache.instance = ThemeCache()
+
+        return ThemeCache.instance
+
+    def __init__(self):
+        os.makedirs(CACHE_DIR, exist_ok=True)
+        self._config_key = None
+        self._config = {}
+        self._image_digests: dict[tuple, str] = {}
+        self._running = None
+        # The latest switch requested while matugen was running.
+        self._queued: tuple | None = None
+        self.stats = {"hits": 0, "misses": 0, "hit_ms": [], "miss_ms": []}
+
+    # Keys
+
+    def _load_config(self) -> str:
+        """Parse config.toml and hash everything matugen's output depends on."""
+        digest = hashlib.sha1()
+        try:
+            with open(MATUGEN_CONFIG, "rb") as f:
+                raw = f.read()
+            self._config = toml.loads(raw.decode("utf-8"))
+        except (OSError, ValueError, toml.TomlDecodeError) as e:
+            logger.warning(f"{Colors.WARNING}[Theme] Cannot read matugen config: {e}")
+            raw = b""
+            self._config = {}
+        digest.update(raw)
+        for template in self.templates().values():
+            try:
+                digest.update(_file_digest(os.path.expanduser(template["input_path"])).encode())
+            except (KeyError, OSError):
+                digest.update(b"-")
+        matugen = shutil.which("matugen")
+        if matugen:
+            stat = os.stat(matugen)
+            digest.update(f"{matugen}:{stat.st_size}:{stat.st_mtime_ns}".encode())
+        return digest.hexdigest()
+
+    def templates(self) -> dict[str, dict]:
+        return self._config.get("templates", {})
+
+    def _image_digest(self, path: str) -> str:
+        stat = os.stat(path)
+        key = (path, stat.st_size, stat.st_mtime_ns, stat.st_ino)
+        if key not in self._image_digests:
+            self._image_digests[key] = _file_digest(path)
+        return self._image_digests[key]
+
+    def _key(self, source: str, scheme: str) -> str:
+        # Re-hashed on every switch: it is a few small files, and it means
+        # edits to the config or templates are never served stale.
+        self._config_key = self._load_config()
+        return hashlib.sha1(f"{source}\0{scheme}\0{self._config_key}".encode()).hexdigest()
+
+    # Applying
+
+    def apply_image(self, image_path: str, scheme: str):
+        """Theme from a wallpaper, like `matugen image <path> -t <scheme>`."""
+        try:
+            source = f"image:{self._image_digest(image_path)}"
+        except OSError as e:
+            logger.error(f"{Colors.ERROR}[Theme] Cannot read {image_path}: {e}")
+            return
+        self._apply(source, scheme, ["matugen", "image", image_path, "-t", scheme], image_path)
+
+    def apply_color(self, hex_color: str, scheme: str):
+        """Theme from a color, like `matugen color hex <color> -t <scheme>`."""
+        source = f"color:{hex_color.upper()}"
+        self._apply(source, scheme, ["matugen", "color", "hex", hex_color, "-t", scheme], None)
+
+    def _apply(self, source: str, scheme: str, command: list[str], image_path: str | None):
+        if self._running is not None:
+            self._queued = (source, scheme, command, image_path)
+            return
+        start = time.perf_counter()
+        key = self._key(source, scheme)
+        entry_dir = os.path.join(CACHE_DIR, key)
+        if self._restore(entry_dir):
+            if image_path:
+                self._set_wallpaper(image_path)
+            self._run_post_hooks()
+            self._record("hits", start)
+            return
+        self._run_matugen(command, entry_dir, start)
+
+    def _restore(self, entry_dir: str) -> bool:
+        try:
+            with open(os.path.join(entry_dir, MANIFEST)) as f:
+                outputs = json.load(f)
+        except (OSError, ValueError):
+            return False
+        try:
+            for name, output_path in outputs.items():
+                _replace_file(os.path.join(entry_dir, name), output_path)
+        except OSError as e:
+            logger.warning(f"{Colors.WARNING}[Theme] Broken cache entry {entry_dir}: {e}")
+            shutil.rmtree(entry_dir, ignore_errors=True)
+            return False
+        os.utime(entry_dir)  # Most recently used
+        return True
+
+    def _run_matugen(self, command: list[str], entry_dir: str, start: float):
+        try:
+            process = Gio.Subprocess.new(command, Gio.SubprocessFlags.NONE)
+        except GLib.Error as e:
+            logger.error(f"{Colors.ERROR}[Theme] Failed to run matugen: {e}")
+            return
+        self._running = process
+
+        def on_done(process, result):
+            self._running = None
+            try:
+                if process.wait_check_finish(result):
+                    self._store(entry_dir)
+                    self._record("misses", start)
+            except GLib.Error as e:
+                logger.error(f"{Colors.ERROR}[Theme] matugen failed: {e}")
+            if self._queued is not None:
+                queued, self._queued = self._queued, None
+                self._apply(*queued)
+
+        process.wait_check_async(None, on_done)
+
+    def _store(self, entry_dir: str):
+        """Snapshot the files matugen just wrote."""
+        tmp_dir = f"{entry_dir}.tmp"
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        os.makedirs(tmp_dir)
+        outputs = {}
+        try:
+            for name, template in self.templates().items():
+                output_path = os.path.expanduser(template.get("output_path", ""))
+                if not os.path.isfile(output_path):
+                    continue
+                file_name = hashlib.sha1(name.encode()).hexdigest()[:16]
+                shutil.copyfile(output_path, os.path.join(tmp_dir, file_name))
+                outputs[file_name] = output_path
+            with open(os.path.join(tmp_dir, MANIFEST), "w") as f:
+                json.dump(outputs, f)
+            shutil.rmtree(entry_dir, ignore_errors=True)
+            os.rename(tmp_dir, entry_dir)
+        except OSError as e:
+            logger.warning(f"{Colors.WARNING}[Theme] Failed to cache theme: {e}")
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+            return
+        self._evict()
+
+    def _evict(self):
+        entries = [
+            entry for entry in os.scandir(CACHE_DIR) if entry.is_dir() and not entry.name.endswith(".tmp")
+        ]
+        if len(entries) <= MAX_ENTRIES:
+            return
+        entries.sort(key=lambda entry: entry.stat().st_mtime)
+        for entry in entries[: len(entries) - MAX_ENTRIES]:
+            shutil.rmtree(entry.path, ignore_errors=True)
+
+    def _set_wallpaper(self, image_path: str):
+        wallpaper = self._config.get("config", {}).get("wallpaper", {})
+        if not wallpaper.get("set") or not wallpaper.get("command"):
+            return
+        self._spawn([wallpaper["command"], *wallpaper.get("arguments", []), image_path])
+
+    def _run_post_hooks(self):
+        for template in self.templates().values():
+            if hook := template.get("post_hook"):
+                self._spawn(hook, shell=True)
+
+    @staticmethod
+    def _spawn(command, shell: bool = False):
+        try:
+            subprocess.Popen(command, shell=shell, start_new_session=True)
+        except OSError as e:
+            logger.error(f"{Colors.ERROR}[Theme] Failed to run {command}: {e}")
+
+    # Stats
+
+    def _record(self, outcome: str, start: float):
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        self.stats[outcome] += 1
+        self.stats["hit_ms" if outcome == "hits" else "miss_ms"].append(elapsed_ms)
+        logger.info(
+            f"[Theme] {'Cache hit' if outcome == 'hits' else 'Generated'} in "
+            f"{elapsed_ms:.1f} ms (hit rate {self.hit_rate():.0%})"
+        )
+
+    def hit_rate(self) -> float:
+        total = self.stats["hits"] + self.stats["misses"]
+        return self.stats["hits"] / total if total else 0.0
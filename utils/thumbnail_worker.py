@@ -0,0 +1,129 @@
+"""
+Thumbnail worker process used by `utils.thumbnails.ThumbnailStore`.
+
+Reads one JSON job per line on stdin ({"id", "src", "dst", "size"}), writes a
+square PNG thumbnail of `src` to `dst` and answers with one JSON line on
+stdout, which also carries a color analysis of the image (see `analyze`).
+Runs as a plain script so that starting it imports Pillow and NumPy only,
+not the shell.
+"""
+
+import json
+import os
+import sys
+
+import numpy as np
+from PIL import Image
+
+# Edge length of the downsampled image the analysis runs on.
+ANALYSIS_SIZE = 64
+HUE_BINS = 36
+PALETTE_SIZE = 5
+# Palette colors closer than this (RGB distance) count as the same color.
+PALETTE_MIN_DISTANCE = 48
+
+
+def _hue_histogram(rgb: np.ndarray) -> list[float]:
+    """Hue histogram weighted by saturation and value, so greys don't count."""
+    maxc = rgb.max(axis=1)
+    minc = rgb.min(axis=1)
+    delta = maxc - minc
+    r, g, b = rgb[:, 0], rgb[:, 1], rgb[:, 2]
+    safe = np.where(delta == 0, 1, delta)
+    hue = np.select(
+        [maxc == r, maxc == g],
+        [((g - b) / safe) % 6, (b - r) / safe + 2],
+        (r - g) / safe + 4,
+    )
+    weight = np.where(maxc > 0, delta / np.where(maxc == 0, 1, maxc), 0) * maxc
+    bins = (hue * HUE_BINS / 6).astype(np.int64) % HUE_BINS
+    histogram = np.bincount(bins, weights=weight, minlength=HUE_BINS)
+    total = histogram.sum()
+    if total > 0:
+        histogram /= total
+    return [round(float(v), 3) for v in histogram]
+
+
+def _palette(rgb: np.ndarray) -> list[str]:
+    """Dominant colors: the most populated cells of a 16x16x16 RGB grid."""
+    pixels = (rgb * 255).astype(np.int64)
+    cells = (pixels[:, 0] >> 4) << 8 | (pixels[:, 1] >> 4) << 4 | pixels[:, 2] >> 4
+    counts = np.bincount(cells, minlength=4096)
+    sums = np.stack(
+        [np.bincount(cells, weights=pixels[:, c], minlength=4096) for c in range(3)],
+        axis=1,
+    )
+    palette = []
+    for cell in np.argsort(counts)[::-1]:
+        if counts[cell] == 0 or len(palette) == PALETTE_SIZE:
+            break
+        color = sums[cell] / counts[cell]
+        if all(np.linalg.norm(color - other) >= PALETTE_MIN_DISTANCE for other in palette):
+            palette.append(color)
+    return ["#{:02X}{:02X}{:02X}".format(*(int(c) for c in color)) for color in palette]
+
+
+def _dhash(img: Image.Image) -> str:
+    """64-bit difference hash, for spotting near-duplicate images."""
+    grey = np.asarray(img.convert("L").resize((9, 8), Image.Resampling.BILINEAR), dtype=np.int16)
+    bits = (grey[:, 1:] > grey[:, :-1]).flatten()
+    return f"{int(''.join('1' if bit else '0' for bit in bits), 2):016x}"
+
+
+def analyze(img: Image.Image) -> dict:
+    """Palette, hue histogram and perceptual hash of an (already reduced) image."""
+    small = img.convert("RGB").resize((ANALYSIS_SIZE, ANALYSIS_SIZE), Image.Resampling.BILINEAR)
+    rgb = np.asarray(small, dtype=np.float32).reshape(-1, 3) / 255
+    return {
+        "palette": _palette(rgb),
+        "hues": _hue_histogram(rgb),
+        "dhash": _dhash(small),
+    }
+
+
+def render_thumbnail(src: str, dst: str, size: int) -> dict:
+    with Image.open(src) as img:
+        width, height = img.size
+        side = min(width, height)
+        # Decode at the smallest scale that still covers the thumbnail twice
+        # over: JPEG decodes at 1/2, 1/4 or 1/8 resolution in draft mode,
+        # other formats are reduced by an integer factor right after loading.
+        scale = max(1, side // (size * 2))
+        if img.format == "JPEG":
+            img.draft("RGB", (max(1, width // scale), max(1, height // scale)))
+        else:
+            img.load()
+            if scale > 1:
+                img = img.reduce(scale)
+        analysis = analyze(img)
+        w, h = img.size
+        side = min(w, h)
+        left = (w - side) // 2
+        top = (h - side) // 2
+        thumb = img.crop((left, top, left + side, top + side))
+        thumb = thumb.resize((size, size), Image.Resampling.LANCZOS)
+        if thumb.mode not in ("RGB", "RGBA"):
+            thumb = thumb.convert("RGBA")
+        tmp = f"{dst}.{os.getpid()}.tmp"
+        thumb.save(tmp, "PNG", compress_level=1)
+        os.replace(tmp, dst)
+    return {"width": width, "height": height, **analysis}
+
+
+def main():
+    for line in sys.stdin:
+        try:
+            job = json.loads(line)
+        except ValueError:
+            continue
+        try:
+            result = {"id": job["id"], "ok": True}
+            result.update(render_thumbnail(job["src"], job["dst"], job["size"]))
+        except Exception as e:
+            result = {"id": job.get("id"), "ok": False, "error": str(e)}
+        sys.stdout.write(json.dumps(result) + "\n")
+        sys.stdout.flush()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,362 @@
+import hashlib
+import json
+import os
+import sys
+from collections import deque
+
+from gi.repository import Gio, GLib
+from loguru import logger
+
+from utils.colors import Colors
+
+WORKER_SCRIPT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "thumbnail_worker.py")
+INDEX_FILE = "index.json"
+
+# Index writes are batched while a burst of thumbnails comes in.
+SAVE_DELAY_SECONDS = 2
+
+# Idle workers wait this long for follow-up jobs (scrolling, the analysis
+# queue) before they exit, so a steady trickle does not spawn one per job.
+WORKER_IDLE_SECONDS = 5
+
+# Color analysis the workers compute alongside every thumbnail.
+ANALYSIS_FIELDS = ("palette", "hues", "dhash")
+
+# The part of a job the worker process needs.
+WORKER_FIELDS = ("id", "src", "dst", "size")
+
+
+def thumbnail_key(path: str, size: int, stat: os.stat_result) -> str:
+    """Key of the thumbnail of `path` at `size` as the file is right now."""
+    raw = f"{path}\0{size}\0{stat.st_mtime_ns}\0{stat.st_ino}"
+    return hashlib.sha1(raw.encode("utf-8")).hexdigest()
+
+
+class _ThumbnailWorker:
+    """One `thumbnail_worker.py` child, fed one job at a time over its stdin."""
+
+    def __init__(self, store: "ThumbnailStore"):
+        self.store = store
+        self.job = None
+        self._process = Gio.Subprocess.new(
+            [sys.executable, WORKER_SCRIPT],
+            Gio.SubprocessFlags.STDIN_PIPE | Gio.SubprocessFlags.STDOUT_PIPE,
+        )
+        self._stdin = self._process.get_stdin_pipe()
+        self._stdout = Gio.DataInputStream.new(self._process.get_stdout_pipe())
+        self._cancellable = Gio.Cancellable()
+        self._read_next_line()
+
+    def send(self, job: dict):
+        self.job = job
+        payload = {field: job[field] for field in WORKER_FIELDS}
+        self._stdin.write_all((json.dumps(payload) + "\n").encode("utf-8"), None)
+        self._stdin.flush(None)
+
+    def close(self):
+        # The worker exits once its stdin is closed.
+        self._cancellable.cancel()
+        try:
+            self._stdin.close(None)
+        except GLib.Error:
+            pass
+
+    def _read_next_line(self):
+        self._stdout.read_line_async(
+            GLib.PRIORITY_LOW, self._cancellable, self._on_line
+        )
+
+    def _on_line(self, stream, result):
+        try:
+            line, _ = stream.read_line_finish_utf8(result)
+        except GLib.Error as e:
+            if not e.matches(Gio.io_error_quark(), Gio.IOErrorEnum.CANCELLED):
+                logger.error(f"{Colors.ERROR}[Thumbnails] Worker stream failed: {e}")
+                self.store._on_worker_exited(self)
+            return
+        if line is None:
+            self.store._on_worker_exited(self)
+            return
+        try:
+            result = json.loads(line)
+        except ValueError:
+            result = {"id": None, "ok": False, "error": line}
+        job, self.job = self.job, None
+        self._read_next_line()
+        self.store._on_result(self, job, result)
+
+
+class ThumbnailStore:
+    """
+    Content-addressed thumbnail cache.
+
+    A thumbnail is stored as `<key>.png`, where the key hashes the source
+    path, the thumbnail size, and the file's mtime and inode, so an edited
+    or replaced file never serves a stale thumbnail. `index.json` maps keys
+    back to their source (its pixel dimensions and color analysis: palette,
+    hue histogram and difference hash) and lets `collect_garbage` drop
+    thumbnails of files that changed or disappeared.
+
+    Missing thumbnails are rendered by a small pool of worker processes
+    (see `utils/thumbnail_worker.py`) that decode JPEGs in draft mode and
+    reduce other formats before resampling, keeping the GIL and the shell's
+    own heap out of the decoding. Background requests only get a worker
+    when no foreground (on-screen) request is waiting.
+    """
+
+    def __init__(self, cache_dir: str, workers: int | None = None):
+        self.cache_dir = cache_dir
+        self.index_path = os.path.join(cache_dir, INDEX_FILE)
+        self.max_workers = workers or max(1, min(4, (os.cpu_count() or 2) // 2))
+        os.makedirs(cache_dir, exist_ok=True)
+
+        self.index: dict[str, dict] = self._load_index()
+        # (path, size) -> key of its newest thumbnail
+        self._latest: dict[tuple[str, int], str] = {
+            (entry.get("path"), entry.get("size")): key
+            for key, entry in self.index.items()
+        }
+        self._queue: deque[dict] = deque()
+        self._background: deque[dict] = deque()
+        self._jobs: dict[str, dict] = {}
+        self._pending: dict[str, list] = {}
+        self._workers: list[_ThumbnailWorker] = []
+        self._save_id = None
+        self._idle_close_id = None
+
+    def _load_index(self) -> dict:
+        try:
+            with open(self.index_path) as f:
+                index = json.load(f)
+            return index if isinstance(index, dict) else {}
+        except FileNotFoundError:
+            return {}
+        except (OSError, ValueError) as e:
+            logger.warning(f"{Colors.WARNING}[Thumbnails] Ignoring unreadable index: {e}")
+            return {}
+
+    def _schedule_save(self):
+        if self._save_id is None:
+            self._save_id = GLib.timeout_add_seconds(SAVE_DELAY_SECONDS, self._save)
+
+    def _save(self):
+        self._save_id = None
+        tmp_path = f"{self.index_path}.tmp"
+        try:
+            with open(tmp_path, "w") as f:
+                json.dump(self.index, f)
+            os.replace(tmp_path, self.index_path)
+        except OSError as e:
+            logger.warning(f"{Colors.WARNING}[Thumbnails] Failed to save index: {e}")
+        return False
+
+    def thumb_path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, f"{key}.png")
+
+    def key_for(self, path: str, size: int) -> str | None:
+        try:
+            return thumbnail_key(path, size, os.stat(path))
+        except OSError:
+            return None
+
+    def lookup(self, path: str, size: int) -> str | None:
+        """Path of an up-to-date thumbnail of `path`, or None if there is none."""
+        key = self.key_for(path, size)
+        if key is None or key not in self.index:
+            return None
+        return self.thumb_path(key)
+
+    def entry(self, path: str, size: int) -> dict | None:
+        """Index entry of the current thumbnail of `path` (with its dimensions)."""
+        key = self.key_for(path, size)
+        return self.index.get(key) if key else None
+
+    def request(self, path: str, size: int, callback, background: bool = False):
+        """
+        Call `callback(path, thumb_path)` on the main loop once a thumbnail
+        of `path` (and its analysis) exists; `thumb_path` is None if it could
+        not be made.
+        """
+        try:
+            stat = os.stat(path)
+        except OSError:
+            GLib.idle_add(callback, path, None)
+            return
+        key = thumbnail_key(path, size, stat)
+        entry = self.index.get(key)
+        if entry is not None and all(field in entry for field in ANALYSIS_FIELDS):
+            GLib.idle_add(callback, path, self.thumb_path(key))
+            return
+        if key in self._pending:
+            self._pending[key].append(callback)
+            job = self._jobs[key]
+            if not background and job["background"] and not job["sent"]:
+                # Came on screen while waiting in the background queue.
+                job["background"] = False
+                self._queue.append(job)
+                self._dispatch()
+            return
+        self._pending[key] = [callback]
+        job = {
+            "id": key,
+            "src": path,
+            "dst": self.thumb_path(key),
+            "size": size,
+            "mtime": stat.st_mtime_ns,
+            "inode": stat.st_ino,
+            "background": background,
+            "sent": False,
+        }
+        self._jobs[key] = job
+        (self._background if background else self._queue).append(job)
+        self._dispatch()
+
+    def _next_job(self) -> dict | None:
+        for queue in (self._queue, self._background):
+            while queue:
+                job = queue.popleft()
+                # Promoted background jobs sit in both queues.
+                if not job["sent"]:
+                    return job
+        return None
+
+    def forget(self, path: str):
+        """Remove every thumbnail of `path`, e.g. after it was deleted."""
+        stale = [key for key, entry in self.index.items() if entry.get("path") == path]
+        for key in stale:
+            self._remove(key)
+        if stale:
+            self._schedule_save()
+
+    def _remove(self, key: str):
+        entry = self.index.pop(key, None)
+        if entry is not None:
+            source = (entry.get("path"), entry.get("size"))
+            if self._latest.get(source) == key:
+                del self._latest[source]
+        try:
+            os.remove(self.thumb_path(key))
+        except FileNotFoundError:
+            pass
+        except OSError as e:
+            logger.warning(f"{Colors.WARNING}[Thumbnails] Failed to remove {key}: {e}")
+
+    def collect_garbage(self, live_paths):
+        """
+        Drop index entries whose source is gone or changed since, and any
+        PNG in the cache directory the index does not reference.
+        """
+        live_paths = set(live_paths)
+        removed = 0
+        for key, entry in list(self.index.items()):
+            path = entry.get("path")
+            if path not in live_paths or self.key_for(path, entry.get("size", 0)) != key:
+                self._remove(key)
+                removed += 1
+
+        with os.scandir(self.cache_dir) as entries:
+            for dir_entry in entries:
+                name = dir_entry.name
+                if not name.endswith((".png", ".tmp")):
+                    continue
+                # `<key>.png`, or `<key>.png.<pid>.tmp` while a worker writes it.
+                key = name.split(".", 1)[0]
+                if key in self._pending or name == f"{key}.png" and key in self.index:
+                    continue
+                try:
+                    os.remove(dir_entry.path)
+                    removed += 1
+                except OSError:
+                    pass
+
+        if removed:
+            logger.info(f"[Thumbnails] Removed {removed} orphaned thumbnails")
+            self._schedule_save()
+        return removed
+
+    # Workers
+
+    def _dispatch(self):
+        idle = [worker for worker in self._workers if worker.job is None]
+        while self._queue or self._background:
+            if idle:
+                worker = idle.pop()
+            elif len(self._workers) < self.max_workers:
+                try:
+                    worker = _ThumbnailWorker(self)
+                except GLib.Error as e:
+                    logger.error(f"{Colors.ERROR}[Thumbnails] Failed to start worker: {e}")
+                    break
+                self._workers.append(worker)
+            else:
+                break
+            job = self._next_job()
+            if job is None:
+                idle.append(worker)
+                break
+            job["sent"] = True
+            worker.send(job)
+
+        # Nothing left to hand out: idle workers exit once nothing new
+        # came in for a while.
+        if not self._queue and not self._background and idle:
+            if self._idle_close_id is not None:
+                GLib.source_remove(self._idle_close_id)
+            self._idle_close_id = GLib.timeout_add_seconds(
+                WORKER_IDLE_SECONDS, self._close_idle_workers
+            )
+
+    def _close_idle_workers(self):
+        self._idle_close_id = None
+        if self._queue or self._background:
+            return False
+        for worker in [worker for worker in self._workers if worker.job is None]:
+            worker.close()
+            self._workers.remove(worker)
+        return False
+
+    def _on_result(self, worker, job, result):
+        if job is None:
+            return
+        key = job["id"]
+        self._jobs.pop(key, None)
+        callbacks = self._pending.pop(key, [])
+        thumb_path = None
+        if result.get("ok"):
+            # The new thumbnail supersedes the one of the previous version.
+            old_key = self._latest.get((job["src"], job["size"]))
+            if old_key is not None and old_key != key:
+                self._remove(old_key)
+            self._latest[(job["src"], job["size"])] = key
+            self.index[key] = {
+                "path": job["src"],
+                "size": job["size"],
+                "mtime": job["mtime"],
+                "inode": job["inode"],
+                "width": result.get("width"),
+                "height": result.get("height"),
+            }
+            for field in ANALYSIS_FIELDS:
+                self.index[key][field] = result.get(field)
+            self._schedule_save()
+            thumb_path = job["dst"]
+        else:
+            logger.warning(
+                f"{Colors.WARNING}[Thumbnails] Failed to thumbnail {job['src']}: "
+                f"{result.get('error')}"
+            )
+        # Callbacks often request the next thumbnail; let them queue it
+        # before deciding whether this worker has anything left to do.
+        for callback in callbacks:
+            callback(job["src"], thumb_path)
+        self._dispatch()
+
+    def _on_worker_exited(self, worker):
+        if worker in self._workers:
+            self._workers.remove(worker)
+        job, worker.job = worker.job, None
+        if job is not None:
+            # Crashed mid-job (e.g. a decoder bug): report it as failed.
+            self._on_result(worker, job, {"ok": False, "error": "worker exited"})
+        elif self._queue or self._background:
+            self._dispatch()
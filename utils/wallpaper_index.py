@@ -0,0 +1,211 @@
+import bisect
+import json
+import os
+
+from gi.repository import GLib
+from loguru import logger
+
+from utils.colors import Colors
+
+INDEX_VERSION = 1
+IMAGE_EXTENSIONS = (".png", ".jpg", ".jpeg", ".bmp", ".gif", ".webp")
+
+# Monitor events tend to come in bursts (copying a folder of wallpapers).
+SAVE_DELAY_SECONDS = 2
+
+
+def is_image(file_name: str) -> bool:
+    return file_name.lower().endswith(IMAGE_EXTENSIONS)
+
+
+def normalized_name(file_name: str) -> str:
+    """Wallpapers are kept lowercase, with hyphens instead of spaces."""
+    return file_name.lower().replace(" ", "-")
+
+
+def sort_key(file_name: str) -> tuple[str, str]:
+    return (file_name.casefold(), file_name)
+
+
+class WallpaperIndex:
+    """
+    Persistent, always-sorted index of the images in the wallpaper directory.
+
+    Every entry stores the file's path, mtime, pixel dimensions, current
+    thumbnail key and a casefolded search key. The index is restored from
+    disk on start (only files whose mtime changed lose their metadata) and
+    updated one file at a time from file-monitor events, inserting with
+    `bisect` so the name order never needs a full re-sort.
+    """
+
+    def __init__(self, directory: str, cache_path: str):
+        self.directory = directory
+        self.cache_path = cache_path
+        self.entries: dict[str, dict] = {}
+        self.names: list[str] = []
+        self._keys: list[tuple[str, str]] = []
+        self._save_id = None
+
+    def __contains__(self, file_name: str) -> bool:
+        return file_name in self.entries
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    def path(self, file_name: str) -> str:
+        return os.path.join(self.directory, file_name)
+
+    def get(self, file_name: str) -> dict | None:
+        return self.entries.get(file_name)
+
+    def _load_cache(self) -> dict:
+        try:
+            with open(self.cache_path) as f:
+                cache = json.load(f)
+        except FileNotFoundError:
+            return {}
+        except (OSError, ValueError) as e:
+            logger.warning(f"{Colors.WARNING}[Wallpapers] Ignoring unreadable index: {e}")
+            return {}
+        if cache.get("version") != INDEX_VERSION or cache.get("directory") != self.directory:
+            return {}
+        return cache.get("entries", {})
+
+    def scan(self):
+        """
+        Build the index from the directory, normalizing file names on the way
+        and reusing the cached metadata of every file that did not change.
+        """
+        cached = self._load_cache()
+        entries = {}
+        with os.scandir(self.directory) as dir_entries:
+            for dir_entry in dir_entries:
+                name = dir_entry.name
+                if not is_image(name) or not dir_entry.is_file():
+                    continue
+                new_name = normalized_name(name)
+                if new_name != name:
+                    name = self._rename(name, new_name)
+                try:
+                    mtime = os.stat(self.path(name)).st_mtime_ns
+                except OSError:
+                    continue
+                entry = cached.get(name)
+                if entry is None or entry.get("mtime") != mtime:
+                    entry = self._new_entry(name, mtime)
+                entries[name] = entry
+
+        self.entries = entries
+        self.names = sorted(entries, key=sort_key)
+        self._keys = [sort_key(name) for name in self.names]
+        if entries != cached:
+            self._schedule_save()
+
+    def _rename(self, name: str, new_name: str) -> str:
+        full_path = self.path(name)
+        new_full_path = self.path(new_name)
+        try:
+            os.rename(full_path, new_full_path)
+            print(f"Renamed wallpaper '{full_path}' to '{new_full_path}'")
+            return new_name
+        except Exception as e:
+            print(f"Error renaming file {full_path}: {e}")
+            return name
+
+    def _new_entry(self, name: str, mtime: int) -> dict:
+        return {
+            "name": name,
+            "path": self.path(name),
+            "key": name.casefold(),
+            "mtime": mtime,
+            "width": None,
+            "height": None,
+            "thumb": None,
+        }
+
+    def add(self, file_name: str) -> str | None:
+        """
+        Index a new file, renaming it first if needed. Returns the name it
+        is indexed under, or None if it is not an image or already gone.
+        """
+        if not is_image(file_name):
+            return None
+        new_name = normalized_name(file_name)
+        if new_name != file_name:
+            file_name = self._rename(file_name, new_name)
+        try:
+            mtime = os.stat(self.path(file_name)).st_mtime_ns
+        except OSError:
+            return None
+        if file_name not in self.entries:
+            key = sort_key(file_name)
+            position = bisect.bisect_left(self._keys, key)
+            self._keys.insert(position, key)
+            self.names.insert(position, file_name)
+        self.entries[file_name] = self._new_entry(file_name, mtime)
+        self._schedule_save()
+        return file_name
+
+    def remove(self, file_name: str) -> bool:
+        if self.entries.pop(file_name, None) is None:
+            return False
+        position = bisect.bisect_left(self._keys, sort_key(file_name))
+        del self._keys[position]
+        del self.names[position]
+        self._schedule_save()
+        return True
+
+    def touch(self, file_name: str) -> bool:
+        """Refresh the entry of a file that was modified in place."""
+        entry = self.entries.get(file_name)
+        if entry is None:
+            return False
+        try:
+            mtime = os.stat(entry["path"]).st_mtime_ns
+        except OSError:
+            return False
+        if mtime == entry["mtime"]:
+            return False
+        self.entries[file_name] = self._new_entry(file_name, mtime)
+        self._schedule_save()
+        return True
+
+    def set_thumbnail(self, file_name: str, thumb_key: str, width=None, height=None):
+        entry = self.entries.get(file_name)
+        if entry is None:
+            return
+        if (entry["thumb"], entry["width"], entry["height"]) == (thumb_key, width, height):
+            return
+        entry["thumb"] = thumb_key
+        entry["width"] = width
+        entry["height"] = height
+        self._schedule_save()
+
+    def search(self, query: str = "") -> list[str]:
+        """Names containing `query` (case-insensitively), in index order."""
+        needle = query.casefold()
+        if not needle:
+            return list(self.names)
+        return [name for key, name in self._keys if needle in key]
+
+    def _schedule_save(self):
+        if self._save_id is None:
+            self._save_id = GLib.timeout_add_seconds(SAVE_DELAY_SECONDS, self._save)
+
+    def _save(self):
+        self._save_id = None
+        tmp_path = f"{self.cache_path}.tmp"
+        try:
+            with open(tmp_path, "w") as f:
+                json.dump(
+                    {
+                        "version": INDEX_VERSION,
+                        "directory": self.directory,
+                        "entries": self.entries,
+                    },
+                    f,
+                )
+            os.replace(tmp_path, self.cache_path)
+        except OSError as e:
+            logger.warning(f"{Colors.WARNING}[Wallpapers] Failed to save index: {e}")
+        return False
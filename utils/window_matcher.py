@@ -0,0 +1,224 @@
+import json
+
+# Window classes often carry a packaging suffix the desktop entry does not.
+CLASS_SUFFIXES = (".bin", ".exe", ".so", "-bin", "-gtk")
+
+# Identifiers shorter than this are too ambiguous to match inside a class.
+MIN_SUBSTRING_LENGTH = 3
+
+PIN_KEYS = ("window_class", "executable", "command_line", "name", "display_name")
+
+
+def normalize_window_class(class_name: str) -> str:
+    if not class_name:
+        return ""
+    normalized = class_name.lower()
+    for suffix in CLASS_SUFFIXES:
+        if normalized.endswith(suffix):
+            normalized = normalized[: -len(suffix)]
+    return normalized
+
+
+def app_data(app) -> dict:
+    """The dict a pinned app is stored as in dock.json."""
+    return {
+        "name": app.name,
+        "display_name": app.display_name,
+        "window_class": app.window_class,
+        "executable": app.executable,
+        "command_line": app.command_line,
+    }
+
+
+def window_id(client: dict) -> str:
+    """The key a window is grouped under: its class, or a guess from its title."""
+    if class_name := client.get("initialClass", "").lower():
+        return class_name
+    if class_name := client.get("class", "").lower():
+        return class_name
+    if title := client.get("title", "").lower():
+        possible_name = title.split(" - ")[0].strip()
+        return possible_name if possible_name and len(possible_name) > 1 else title
+    return "unknown-app"
+
+
+class WindowMatcher:
+    """
+    Maps running windows to pinned apps and desktop entries for the dock.
+
+    Everything that depends only on the pins and the desktop catalog (the
+    identifiers of each pin, exact lookup tables) is compiled once per
+    pin/catalog change. Lookups that depend on a window class are memoized
+    per class, so an update with the same windows does no string scanning.
+    """
+
+    def __init__(self, catalog):
+        self.catalog = catalog
+        self._pins_signature = None
+        self.invalidate()
+
+    def invalidate(self):
+        """Forget everything derived from the catalog (and the pins)."""
+        self._pins_signature = None
+        self.pins: list[tuple] = []
+        self._exact: dict[str, list[int]] = {}
+        self._substrings: list[tuple[str, int]] = []
+        self._class_substrings: dict[str, list[int]] = {}
+        self._key_apps: dict[str, object] = {}
+        self._class_apps: dict[str, object] = {}
+
+    # Desktop entries
+
+    def find_app_by_key(self, key_value):
+        if not key_value:
+            return None
+        normalized_id = str(key_value).lower()
+        if normalized_id in self._key_apps:
+            return self._key_apps[normalized_id]
+        app = self.catalog.identifiers.get(normalized_id)
+        if app is None:
+            for candidate in self.catalog.get_apps():
+                if any(
+                    value and normalized_id in value.lower()
+                    for value in (
+                        candidate.name,
+                        candidate.display_name,
+                        candidate.window_class,
+                        candidate.executable,
+                        candidate.command_line,
+                    )
+                ):
+                    app = candidate
+                    break
+        self._key_apps[normalized_id] = app
+        return app
+
+    def find_app(self, app_identifier):
+        if not app_identifier:
+            return None
+        if isinstance(app_identifier, dict):
+            for key in PIN_KEYS:
+                if app_identifier.get(key):
+                    app = self.find_app_by_key(app_identifier[key])
+                    if app:
+                        return app
+            return None
+        return self.find_app_by_key(app_identifier)
+
+    def app_for_class(self, class_name: str, title: str = ""):
+        """Desktop entry of an unpinned window."""
+        if class_name in self._class_apps:
+            app = self._class_apps[class_name]
+        else:
+            identifiers = self.catalog.identifiers
+            app = (
+                identifiers.get(class_name)
+                or identifiers.get(normalize_window_class(class_name))
+                or self.find_app_by_key(class_name)
+            )
+            self._class_apps[class_name] = app
+        if not app and title:
+            potential_name = title.split(" - ")[0].strip()
+            if len(potential_name) > 2:
+                app = self.find_app_by_key(potential_name)
+        return app
+
+    # Pins
+
+    def compile(self, pinned: list):
+        """Precompute the identifiers every pin can match a window class by."""
+        signature = json.dumps(pinned, sort_keys=True)
+        if signature == self._pins_signature:
+            return
+        self._pins_signature = signature
+        self.pins = []
+        self._exact = {}
+        self._substrings = []
+        self._class_substrings = {}
+
+        for index, item in enumerate(pinned):
+            app = self.find_app(item)
+            identifiers = []
+            if isinstance(item, dict):
+                identifiers += [item[key].lower() for key in PIN_KEYS if item.get(key)]
+            elif isinstance(item, str):
+                identifiers.append(item.lower())
+            if app:
+                if app.window_class:
+                    identifiers.append(app.window_class.lower())
+                if app.executable:
+                    identifiers.append(app.executable.split("/")[-1].lower())
+                if app.command_line and app.command_line.split():
+                    identifiers.append(
+                        app.command_line.split()[0].split("/")[-1].lower()
+                    )
+                if app.name:
+                    identifiers.append(app.name.lower())
+                if app.display_name:
+                    identifiers.append(app.display_name.lower())
+            identifiers = list(dict.fromkeys(identifiers))
+            self.pins.append((item, app, identifiers))
+
+            for identifier in identifiers:
+                for key in (identifier, normalize_window_class(identifier)):
+                    indexes = self._exact.setdefault(key, [])
+                    if index not in indexes:
+                        indexes.append(index)
+                if len(identifier) >= MIN_SUBSTRING_LENGTH:
+                    self._substrings.append((identifier, index))
+
+    def _pins_in_class(self, class_name: str) -> list[int]:
+        pins = self._class_substrings.get(class_name)
+        if pins is None:
+            pins = sorted(
+                {
+                    index
+                    for identifier, index in self._substrings
+                    if identifier in class_name
+                }
+            )
+            self._class_substrings[class_name] = pins
+        return pins
+
+    def match(self, clients: list[dict]):
+        """
+        Group `clients` by window class and assign the groups to pins.
+
+        Returns `(pinned, unpinned)`: one `(item, app, instances)` per pin, in
+        pin order, and one `(class_name, instances)` per window class that
+        no pin claimed.
+        """
+        running: dict[str, list[dict]] = {}
+        for client in clients:
+            class_name = window_id(client)
+            running.setdefault(class_name, []).append(client)
+            normalized = normalize_window_class(class_name)
+            if normalized != class_name:
+                running.setdefault(normalized, []).append(client)
+
+        # Which pins each running class belongs to: exact identifiers first,
+        # then identifiers found inside the class name.
+        exact: dict[int, str] = {}
+        contained: dict[int, str] = {}
+        for class_name in running:
+            for index in self._exact.get(class_name, ()):
+                exact.setdefault(index, class_name)
+            for index in self._pins_in_class(class_name):
+                contained.setdefault(index, class_name)
+
+        pinned = []
+        used = set()
+        for index, (item, app, _) in enumerate(self.pins):
+            class_name = exact.get(index) or contained.get(index)
+            instances = running.get(class_name, []) if class_name else []
+            if class_name:
+                used.add(class_name)
+                used.add(normalize_window_class(class_name))
+            pinned.append((item, app, instances))
+
+        unpinned = [
+            (class_name, instances)
+            for class_name, instances in running.items()
+            if class_name not in used
+        ]
+        return pinned, unpinned